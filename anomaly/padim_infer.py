@@ -1,4 +1,255 @@
-# padim_infer.py - Simple placeholder for PaDiM-based anomaly detection
-def detect_anomalies(image):
-    # Dummy result for integration testing
-    return {"anomaly_score": 0.15, "is_anomaly": False}
\ No newline at end of file
+# padim_infer.py - PaDiM anomaly detection: per-patch Gaussians over local features
+"""PaDiM (Defard et al., 2020) for good/not-good inspection without defect labels.
+
+Every image becomes a grid of patch feature vectors (H' x W' x d). Training fits
+one multivariate Gaussian per grid position over the "good" images; at inference
+the Mahalanobis distance of each patch to its Gaussian is the anomaly map, and
+its maximum the image score.
+
+* Training streams: PatchGaussians merges each batch into running means and
+  centred second moments (batched Welford), so memory is N*d*d for the statistics
+  and B*N*d for one batch, never n_images*N*d for a feature bank.
+* Inference is one batched matmul per call against precomputed inverse
+  covariances (float32), then an upsample and Gaussian blur of the map.
+
+Features come from PatchFeatures (multi-scale colour/gradient statistics, numpy
+and OpenCV only) or OnnxBackbone (feature maps of a CNN exported to ONNX, e.g.
+ResNet-18 layer1..3, with a random channel subset as in the paper).
+"""
+from __future__ import annotations
+import json, os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.getenv("EDGEKIT_PADIM_MODEL", "models/padim.npz")
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+class PatchFeatures:
+    """Multi-scale local statistics on a `stride`-pixel grid (no learned weights).
+
+    Base channels are B, G, R, gray, |d/dx|, |d/dy| and |Laplacian|; each gets a
+    local mean and standard deviation over windows of stride * `scales`, giving
+    7 * 2 * len(scales) features per patch.
+    """
+
+    def __init__(self, size: int = 256, stride: int = 8, scales: Sequence[int] = (1, 2, 4)):
+        self.size = int(size)
+        self.stride = int(stride)
+        self.scales = tuple(int(s) for s in scales)
+        self.grid = (self.size // self.stride, self.size // self.stride)
+        self.dim = 7 * 2 * len(self.scales)
+
+    def config(self) -> Dict[str, Any]:
+        return {"kind": "patch", "size": self.size, "stride": self.stride, "scales": list(self.scales)}
+
+    def __call__(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        return np.stack([self._one(img) for img in images])
+
+    def _one(self, img: np.ndarray) -> np.ndarray:
+        img = cv2.resize(img, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        base = np.dstack([img, gray, np.abs(cv2.Sobel(gray, cv2.CV_32F, 1, 0)),
+                          np.abs(cv2.Sobel(gray, cv2.CV_32F, 0, 1)), np.abs(cv2.Laplacian(gray, cv2.CV_32F))])
+        sq = base * base
+        gh, gw = self.grid
+        out = []
+        for s in self.scales:
+            k = self.stride * s
+            mean, mean_sq = (cv2.blur(base, (k, k)), cv2.blur(sq, (k, k))) if s > 1 else (base, sq)
+            # average-pool to the grid: at scale 1 this is exactly the stride x stride window
+            mean = cv2.resize(mean, (gw, gh), interpolation=cv2.INTER_AREA)
+            mean_sq = cv2.resize(mean_sq, (gw, gh), interpolation=cv2.INTER_AREA)
+            out += [mean, np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))]
+        return np.concatenate(out, axis=2)
+
+
+class OnnxBackbone:
+    """Feature maps of an ONNX CNN, upsampled to the first map's grid and concatenated.
+
+    `outputs` names the feature-map outputs (default: all of them); `dim` keeps a
+    fixed random subset of the channels (seeded, stored with the model).
+    """
+
+    def __init__(self, model_path: str, size: int = 224, outputs: Optional[Sequence[str]] = None,
+                 dim: Optional[int] = 100, seed: int = 0, channels: Optional[Sequence[int]] = None):
+        from vision_runtime.session_cache import get_session
+        self.model_path = model_path
+        self.size = int(size)
+        self.sess = get_session(model_path)
+        self.input = self.sess.get_inputs()[0].name
+        self.outputs = list(outputs) if outputs else [o.name for o in self.sess.get_outputs()]
+        probe = self._maps(np.zeros((1, 3, self.size, self.size), dtype=np.float32))
+        self.grid = probe.shape[1:3]
+        total = probe.shape[3]
+        if channels is None:
+            channels = (np.sort(np.random.default_rng(seed).choice(total, dim, replace=False))
+                        if dim and dim < total else np.arange(total))
+        self.channels = np.asarray(channels, dtype=np.int64)
+        self.dim = len(self.channels)
+
+    def config(self) -> Dict[str, Any]:
+        return {"kind": "onnx", "model_path": self.model_path, "size": self.size, "outputs": self.outputs,
+                "channels": self.channels.tolist()}
+
+    def _maps(self, blob: np.ndarray) -> np.ndarray:
+        maps = self.sess.run(self.outputs, {self.input: blob})
+        gh, gw = maps[0].shape[2:]
+        up = [m if m.shape[2:] == (gh, gw) else m.repeat(gh // m.shape[2], 2).repeat(gw // m.shape[3], 3)
+              for m in maps]
+        return np.concatenate(up, axis=1).transpose(0, 2, 3, 1)
+
+    def __call__(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        blob = np.stack([((cv2.cvtColor(cv2.resize(img, (self.size, self.size)), cv2.COLOR_BGR2RGB)
+                           .astype(np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD).transpose(2, 0, 1)
+                         for img in images])
+        return np.ascontiguousarray(self._maps(blob)[..., self.channels])
+
+
+def make_extractor(config: Dict[str, Any]):
+    cfg = dict(config)
+    kind = cfg.pop("kind", "patch")
+    if kind == "onnx":
+        return OnnxBackbone(cfg["model_path"], cfg.get("size", 224), cfg.get("outputs"), channels=cfg.get("channels"))
+    return PatchFeatures(**cfg)
+
+
+class PatchGaussians:
+    """Streaming mean/covariance of N independent d-dim variables (one per patch).
+
+    update() folds a batch (B, N, d) in with a batched Welford step, so the result
+    equals np.cov over all samples without keeping them.
+    """
+
+    def __init__(self, n: int, d: int):
+        self.count = 0
+        self.mean = np.zeros((n, d), dtype=np.float64)
+        self.m2 = np.zeros((n, d, d), dtype=np.float64)
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64)
+        nb = x.shape[0]
+        if not nb:
+            return
+        self.count += nb
+        before = (x - self.mean).transpose(1, 2, 0)               # (N, d, B), deviations from the old mean
+        self.mean += before.sum(axis=2) / self.count
+        after = (x - self.mean).transpose(1, 0, 2)                # (N, B, d), from the new mean
+        # batched Welford step: M2 += sum_i (x_i - mean_old)(x_i - mean_new)^T
+        self.m2 += np.matmul(before, after)
+
+    def covariance(self, eps: float = 0.01, inplace: bool = False) -> np.ndarray:
+        """Unbiased covariance + eps*I; `inplace` reuses the M2 buffer (the accumulator is spent)."""
+        if self.count < 2:
+            raise ValueError("need at least two training images")
+        cov = self.m2 if inplace else self.m2.copy()
+        cov /= self.count - 1
+        idx = np.arange(cov.shape[1])
+        cov[:, idx, idx] += eps
+        return cov
+
+
+class PadimModel:
+    """fit() on good images, then score()/predict() new ones.
+
+        model = PadimModel().fit(good_images)
+        model.calibrate(more_good_images)        # threshold from held-out good parts
+        res = model.predict(img)                 # {"anomaly_score", "is_anomaly", "anomaly_map"}
+    """
+
+    def __init__(self, extractor=None, eps: float = 0.01, sigma: float = 4.0, threshold: Optional[float] = None):
+        self.extractor = extractor or PatchFeatures()
+        self.eps = float(eps)
+        self.sigma = float(sigma)
+        self.threshold = threshold
+        self.mean: Optional[np.ndarray] = None
+        self.inv_cov: Optional[np.ndarray] = None
+        self.n_train = 0
+
+    @property
+    def grid(self):
+        return tuple(self.extractor.grid)
+
+    def fit(self, images: Iterable[np.ndarray], batch: int = 16) -> "PadimModel":
+        gh, gw = self.grid
+        stats = PatchGaussians(gh * gw, self.extractor.dim)
+        chunk: List[np.ndarray] = []
+        for img in images:
+            chunk.append(img)
+            if len(chunk) == batch:
+                stats.update(self.extractor(chunk).reshape(len(chunk), gh * gw, -1)); chunk = []
+        if chunk:
+            stats.update(self.extractor(chunk).reshape(len(chunk), gh * gw, -1))
+        self.mean = stats.mean.astype(np.float32)
+        self.inv_cov = np.linalg.inv(stats.covariance(self.eps, inplace=True)).astype(np.float32)
+        self.n_train = stats.count
+        return self
+
+    def distances(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Mahalanobis distance per patch, (B, H', W')."""
+        if self.mean is None:
+            raise RuntimeError("PaDiM model is not fitted")
+        gh, gw = self.grid
+        return self.mahalanobis(self.extractor(images).reshape(len(images), gh * gw, -1)).reshape(-1, gh, gw)
+
+    def mahalanobis(self, feats: np.ndarray) -> np.ndarray:
+        """(B, N, d) patch features -> (B, N) distances, one batched matmul over all patches."""
+        diff = (feats - self.mean).transpose(1, 0, 2)                  # (N, B, d)
+        d2 = np.einsum("nbd,nbd->nb", np.matmul(diff, self.inv_cov), diff)
+        return np.sqrt(np.maximum(d2, 0.0)).T
+
+    def anomaly_maps(self, images: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Per-image anomaly map at the image's own resolution (upsampled + blurred)."""
+        maps = []
+        for img, dist in zip(images, self.distances(images)):
+            m = cv2.resize(dist, (img.shape[1], img.shape[0]), interpolation=cv2.INTER_LINEAR)
+            maps.append(cv2.GaussianBlur(m, (0, 0), self.sigma) if self.sigma > 0 else m)
+        return maps
+
+    def score(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        return np.array([m.max() for m in self.anomaly_maps(images)], dtype=np.float32)
+
+    def calibrate(self, good_images: Sequence[np.ndarray], quantile: float = 0.99, margin: float = 1.1) -> float:
+        """Threshold = `margin` x the `quantile` of scores on held-out good images."""
+        self.threshold = float(np.quantile(self.score(good_images), quantile) * margin)
+        return self.threshold
+
+    def predict(self, image: np.ndarray) -> Dict[str, Any]:
+        amap = self.anomaly_maps([image])[0]
+        score = float(amap.max())
+        return {"anomaly_score": score, "is_anomaly": self.threshold is not None and score > self.threshold,
+                "anomaly_map": amap}
+
+    def save(self, path: str) -> None:
+        meta = {"extractor": self.extractor.config(), "eps": self.eps, "sigma": self.sigma,
+                "threshold": self.threshold, "n_train": self.n_train}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, mean=self.mean, inv_cov=self.inv_cov, meta=json.dumps(meta))
+
+    @classmethod
+    def load(cls, path: str) -> "PadimModel":
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            model = cls(make_extractor(meta["extractor"]), meta["eps"], meta["sigma"], meta["threshold"])
+            model.mean, model.inv_cov = z["mean"], z["inv_cov"]
+        model.n_train = meta["n_train"]
+        return model
+
+
+_default: Optional[PadimModel] = None
+
+
+def detect_anomalies(image, model: Optional[PadimModel] = None):
+    """Score one BGR image with `model` (default: the model saved at DEFAULT_MODEL_PATH)."""
+    global _default
+    if model is None:
+        if _default is None:
+            if not os.path.exists(DEFAULT_MODEL_PATH):
+                raise FileNotFoundError(f"no PaDiM model at {DEFAULT_MODEL_PATH}; "
+                                        "fit one with PadimModel().fit(good_images).save(path)")
+            _default = PadimModel.load(DEFAULT_MODEL_PATH)
+        model = _default
+    return model.predict(image)
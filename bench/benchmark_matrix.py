@@ -1,7 +1,41 @@
 
 from __future__ import annotations
-from typing import List, Dict, Any
+import json, sqlite3
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
 from core.db import connect, migrate
+from core.ingest import get_writer, utc_now
+
+# Latency distribution per benchmark run; added to tables created before these existed
+PERCENTILE_COLUMNS = {"p50_ms": "REAL", "p95_ms": "REAL", "p99_ms": "REAL", "n_samples": "INTEGER", "samples_json": "TEXT"}
+# Run configuration (bench/ort_benchmark sweeps); rows differing in these are not comparable
+CONFIG_COLUMNS = {"batch": "INTEGER", "threads": "INTEGER", "graph_opt": "TEXT"}
+# what a row recorded without them was measured with: one frame, ORT's thread default, full optimization
+CONFIG_DEFAULTS = {"batch": 1, "threads": 0, "graph_opt": "all"}
+CONFIG = ", ".join(f"COALESCE({c}, {CONFIG_DEFAULTS[c]!r}) AS {c}" for c in CONFIG_COLUMNS)
+LATENCY_METRICS = ("avg", "p50", "p95", "p99")
+# DbDecisionLog (runtime autotuner) logs its live p95 windows into `benchmarks` with
+# notes {"source": "autotune", ...}; they are not benchmark runs, so the matrix skips them
+MEASURED_ONLY = ("NOT CASE WHEN json_valid(notes) THEN json_extract(notes, '$.source') IS 'autotune' "
+                 "ELSE 0 END")
+
+def _migrate(con):
+    try:
+        migrate(con)
+    except sqlite3.OperationalError:
+        pass  # database predates schema.sql; the benchmarks table is already there
+    cols = {r[1] for r in con.execute("PRAGMA table_info(benchmarks)")}
+    for col, typ in PERCENTILE_COLUMNS.items():
+        if cols and col not in cols:
+            con.execute(f"ALTER TABLE benchmarks ADD COLUMN {col} {typ}")
+    added = [col for col in CONFIG_COLUMNS if cols and col not in cols]
+    for col in added:
+        con.execute(f"ALTER TABLE benchmarks ADD COLUMN {col} {CONFIG_COLUMNS[col]}")
+    if added:
+        # rows recorded before the columns existed kept their configuration in notes
+        con.execute(f"""UPDATE benchmarks SET {", ".join(f"{c} = json_extract(notes, '$.{c}')" for c in added)}
+                        WHERE json_valid(notes) AND json_type(notes) = 'object'""")
+        con.commit()
 
 def _has_column(con, table: str, col: str) -> bool:
     cur = con.execute(f"PRAGMA table_info({table})")
@@ -13,103 +47,128 @@ def _column_safe(row: dict, *names: str, default=None):
             return row[n]
     return default
 
-def run_matrix(sizes: List[str], engines: List[str]) -> List[Dict[str, Any]]:
+def run_matrix(sizes: List[str], engines: List[str], device_id: Optional[str] = None,
+               model: Optional[str] = None, **sweep: Any) -> List[Dict[str, Any]]:
     """Return rows for the Benchmark Matrix page.
-    Tries to read from the DB's `benchmarks` table. Supports both schemas:
+    Reads the DB's `benchmarks` table (only `device_id`'s rows when given), one row per
+    engine x size x run configuration (batch, threads, graph_opt; CONFIG_DEFAULTS for rows
+    recorded without one). p50_ms is the mean of the runs' medians; p95_ms/p99_ms are the worst
+    run's, since those are what trip deadlines (None for rows recorded without samples).
+    Supports both schemas:
       - (ts, device_id, engine, input_hw, input_size, fps, latency_ms, accuracy, notes)
       - (ts, device_id, model,  input_size, fps, latency_ms, accuracy, notes)  # older
-    If the table has no matching rows, returns synthetic rows (so the UI isn't empty).
+    With `model` (a model pack directory or .onnx file), onnxruntime sizes that have no
+    rows yet are measured on this device first (bench/ort_benchmark.run_sweep, `sweep`
+    kwargs passed through). Configurations that were never measured are left out.
     """
-    con = connect(); migrate(con)
+    if model and (not engines or "onnxruntime" in engines):
+        have = {r["size"] for r in _query_matrix(sizes, ["onnxruntime"], device_id)}
+        missing = [s for s in sizes if s not in have]
+        if missing:
+            from bench.ort_benchmark import run_sweep
+            run_sweep(model, sizes=[int(s) for s in missing], device_id=device_id or "local", **sweep)
+    return _query_matrix(sizes, engines, device_id)
+
+def _query_matrix(sizes: List[str], engines: List[str], device_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    con = connect(); _migrate(con)
     # Detect schema
     has_engine = _has_column(con, "benchmarks", "engine")
     has_model  = _has_column(con, "benchmarks", "model")
+    if not (has_engine or has_model) or not sizes:
+        return []
 
-    results: List[Dict[str, Any]] = []
-
-    try:
-        if has_engine or has_model:
-            # Build a dynamic SELECT that aliases engine/model to 'engine' and input_size to 'size'
-            select_engine = "engine" if has_engine else "model AS engine"
-            sql = f"""
-                SELECT {select_engine}, input_size AS size,
-                       ROUND(AVG(fps),2) AS fps,
-                       ROUND(AVG(latency_ms),2) AS latency_ms,
-                       ROUND(AVG(accuracy),3) AS accuracy
-                FROM benchmarks
-                WHERE input_size IN ({",".join("?"*len(sizes))}) 
-            """
-            params = list(sizes)
-            if engines:
-                # Filter on engine/model column depending on schema
-                col = "engine" if has_engine else "model"
-                sql += f" AND {col} IN ({','.join('?'*len(engines))})"
-                params += engines
-            sql += " GROUP BY 1,2 ORDER BY 1,2"
-            rows = [dict(r) for r in con.execute(sql, params).fetchall()]
-            if rows:
-                # Normalize: ensure keys 'engine','size','fps','latency_ms'
-                for r in rows:
-                    r.setdefault("engine", _column_safe(r, "model", default="unknown"))
-                    r.setdefault("size", _column_safe(r, "input_size", "size", default=""))
-                    r["fps"] = float(r.get("fps", 0.0) or 0.0)
-                    r["latency_ms"] = float(r.get("latency_ms", 0.0) or 0.0)
-                return rows
-    except Exception:
-        # Fall through to synthetic generation
-        pass
+    # Build a dynamic SELECT that aliases engine/model to 'engine' and input_size to 'size'
+    select_engine = "engine" if has_engine else "model AS engine"
+    sql = f"""
+        SELECT {select_engine}, input_size AS size, {CONFIG},
+               ROUND(AVG(fps),2) AS fps,
+               ROUND(AVG(latency_ms),2) AS latency_ms,
+               ROUND(AVG(p50_ms),2) AS p50_ms,
+               ROUND(MAX(p95_ms),2) AS p95_ms,
+               ROUND(MAX(p99_ms),2) AS p99_ms,
+               SUM(n_samples) AS n_samples,
+               ROUND(AVG(accuracy),3) AS accuracy
+        FROM benchmarks
+        WHERE input_size IN ({",".join("?"*len(sizes))}) AND {MEASURED_ONLY}
+    """
+    params = list(sizes)
+    if engines:
+        # Filter on engine/model column depending on schema
+        col = "engine" if has_engine else "model"
+        sql += f" AND {col} IN ({','.join('?'*len(engines))})"
+        params += engines
+    if device_id:
+        sql += " AND device_id = ?"
+        params.append(device_id)
+    sql += " GROUP BY 1,2,3,4,5 ORDER BY 1,2,3,4,5"
+    rows = [dict(r) for r in con.execute(sql, params).fetchall()]
+    # Normalize: ensure keys 'engine','size','fps','latency_ms'
+    for r in rows:
+        r.setdefault("engine", _column_safe(r, "model", default="unknown"))
+        r.setdefault("size", _column_safe(r, "input_size", "size", default=""))
+        r["fps"] = float(r.get("fps", 0.0) or 0.0)
+        r["latency_ms"] = float(r.get("latency_ms", 0.0) or 0.0)
+    return rows
 
-    # Synthetic fallback: simple plausible numbers
-    if not engines:
-        engines = ["onnxruntime", "tensorrt"]
-    if not sizes:
-        sizes = ["640","960"]
+# Backwards-compat helpers
+def latency_percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    a = np.asarray(samples_ms, dtype=np.float64)
+    return {f"p{q}_ms": round(float(np.percentile(a, q)), 3) for q in (50, 95, 99)}
 
-    for eng in engines:
-        for sz in sizes:
-            base = 50.0 if eng == "tensorrt" else 35.0
-            scale = 640.0/float(sz)
-            fps = round(base*scale, 1)
-            latency = round(1000.0/max(fps, 1e-6), 1)
-            results.append({
-                "engine": eng,
-                "size": sz,
-                "fps": fps,
-                "latency_ms": latency,
-                "accuracy": 0.90 if eng == "tensorrt" else 0.88
-            })
-    return results
+def record_benchmark(device_id, engine=None, input_hw=None, input_size=None, fps=None, latency_ms=None, accuracy=None, notes="",
+                     samples_ms=None, p50_ms=None, p95_ms=None, p99_ms=None, wait=True,
+                     batch=None, threads=None, graph_opt=None):
+    """Insert a single benchmark row, adapting to either schema (engine or model).
+    batch/threads/graph_opt identify the run configuration the row was measured with.
+    With `samples_ms` (raw per-run latencies) the row also keeps the samples and their
+    p50/p95/p99; explicit percentiles win over computed ones. The row goes through the
+    ingest writer (core.ingest); `wait` returns once it is committed."""
+    con = connect(); _migrate(con)
+    cols = {r[1] for r in con.execute("PRAGMA table_info(benchmarks)")}
+    con.close()
+    pct = {"p50_ms": p50_ms, "p95_ms": p95_ms, "p99_ms": p99_ms}
+    if samples_ms is not None and len(samples_ms):
+        pct = {k: v if v is not None else latency_percentiles(samples_ms)[k] for k, v in pct.items()}
+    row = {"device_id": device_id, "engine": engine, "model": engine or "unknown", "input_hw": input_hw,
+           "input_size": input_size, "fps": fps, "latency_ms": latency_ms, "accuracy": accuracy, "notes": notes,
+           "batch": batch, "threads": threads, "graph_opt": graph_opt,
+           **pct, "n_samples": len(samples_ms) if samples_ms is not None else None,
+           "samples_json": json.dumps([round(float(s), 3) for s in samples_ms]) if samples_ms is not None else None}
+    row = {"ts": utc_now(), **{k: v for k, v in row.items() if k in cols}}
+    writer = get_writer()
+    writer.insert("benchmarks", row)
+    if wait:
+        writer.flush()
 
-# Backwards-compat helpers
-def record_benchmark(device_id, engine=None, input_hw=None, input_size=None, fps=None, latency_ms=None, accuracy=None, notes=""):
-    """Insert a single benchmark row, adapting to either schema (engine or model)."""
-    con = connect(); migrate(con)
-    has_engine = _has_column(con, "benchmarks", "engine")
-    if has_engine:
-        con.execute("INSERT INTO benchmarks(ts, device_id, engine, input_hw, input_size, fps, latency_ms, accuracy, notes) "
-                    "VALUES (CURRENT_TIMESTAMP,?,?,?,?,?,?,?,?)",
-                    (device_id, engine, input_hw, input_size, fps, latency_ms, accuracy, notes))
-    else:
-        model = engine or "unknown"
-        con.execute("INSERT INTO benchmarks(ts, device_id, model, input_size, fps, latency_ms, accuracy, notes) "
-                    "VALUES (CURRENT_TIMESTAMP,?,?,?,?,?,?,?)",
-                    (device_id, model, input_size, fps, latency_ms, accuracy, notes))
-    con.commit()
+def best_engine(device_id, min_accuracy=0.0, max_latency_ms=1e9, metric="avg", deadline_ms=None, batch=1):
+    """Return the best row for a device given constraints, schema-agnostic.
 
-def best_engine(device_id, min_accuracy=0.0, max_latency_ms=1e9):
-    """Return the best row for a device given constraints, schema-agnostic."""
-    con = connect()
+    Candidates are engine x size x run configuration (threads, graph_opt) at `batch`
+    (rows recorded without a batch count as batch 1), judged on the latest run of each
+    configuration only, so an old noisy run does not disqualify it for good.
+    `metric` picks the latency the limit applies to: "avg" (latency_ms, the old
+    behaviour) or a percentile "p50"/"p95"/"p99". `deadline_ms` is an alias
+    for max_latency_ms, e.g. best_engine(dev, metric="p99", deadline_ms=40) for a PLC
+    timeout. Rows without a distribution never satisfy a percentile constraint.
+    """
+    if metric not in LATENCY_METRICS:
+        raise ValueError(f"Unknown latency metric: {metric} (expected one of {LATENCY_METRICS})")
+    con = connect(); _migrate(con)
     has_engine = _has_column(con, "benchmarks", "engine")
-    select_engine = "engine" if has_engine else "model AS engine"
+    engine = "engine" if has_engine else "model"
+    lat = "latency_ms" if metric == "avg" else f"{metric}_ms"
     sql = f"""
-      SELECT {select_engine}, input_size AS size,
-             AVG(latency_ms) AS lat, AVG(accuracy) AS acc, AVG(fps) AS fps
-      FROM benchmarks
-      WHERE device_id = ?
-      GROUP BY 1,2
-      HAVING acc >= ? AND lat <= ?
+      SELECT engine, size, batch, threads, graph_opt, lat, acc, fps, p50_ms, p95_ms, p99_ms FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY engine, size, batch, threads, graph_opt
+                                     ORDER BY ts DESC, rid DESC) AS nth
+        FROM (SELECT {engine} AS engine, input_size AS size, {CONFIG}, {lat} AS lat, accuracy AS acc,
+                     fps, p50_ms, p95_ms, p99_ms, ts, rowid AS rid
+              FROM benchmarks WHERE device_id = ? AND {MEASURED_ONLY})
+        WHERE batch = ?)
+      WHERE nth = 1 AND COALESCE(acc, 0) >= ? AND lat <= ?
       ORDER BY acc DESC, fps DESC, lat ASC
       LIMIT 1
     """
-    row = con.execute(sql, (device_id, min_accuracy, max_latency_ms)).fetchone()
+    limit = deadline_ms if deadline_ms is not None else max_latency_ms
+    row = con.execute(sql, (device_id, int(batch), min_accuracy, limit)).fetchone()
     return dict(row) if row else None
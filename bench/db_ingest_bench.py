@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Event ingest throughput: per-row autocommit INSERTs vs the single-writer ingest queue.
+
+Producer threads each push `--rows` events rows (the gateway bridge's row shape) into
+a scratch database, either each on its own connection with an autocommit INSERT per
+row (what the writers did before core.ingest) or through IngestWriter.
+
+    python bench/db_ingest_bench.py --producers 4 --rows 5000 --batch 500 --delay-ms 50
+"""
+from __future__ import annotations
+import argparse, json, pathlib, sqlite3, sys, tempfile, threading, time
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from core.ingest import IngestWriter, _connect_path, utc_now
+
+SCHEMA = "CREATE TABLE events (ts TEXT, device_id TEXT, severity TEXT, type TEXT, message TEXT, meta_json TEXT)"
+
+
+def _row(p, i):
+    return {"ts": utc_now(), "device_id": f"cam-{p:02d}", "severity": "info", "type": "forward",
+            "message": "inspection_forward", "meta_json": json.dumps({"ack": "ack:ok", "seq": i})}
+
+
+def run_direct(path, producers, rows):
+    lat = [[] for _ in range(producers)]
+
+    def produce(p):
+        con = _connect_path(path)
+        con.execute("PRAGMA busy_timeout=30000;")
+        for i in range(rows):
+            r = _row(p, i)
+            t = time.perf_counter()
+            con.execute(f"INSERT INTO events({', '.join(r)}) VALUES ({', '.join('?' * len(r))})", list(r.values()))
+            lat[p].append((time.perf_counter() - t) * 1000.0)
+        con.close()
+    return _drive(produce, producers), np.concatenate(lat), None
+
+
+def run_ingest(path, producers, rows, batch, delay_ms):
+    w = IngestWriter(path, max_batch=batch, max_delay_ms=delay_ms)
+    lat = [[] for _ in range(producers)]
+
+    def produce(p):
+        for i in range(rows):
+            r = _row(p, i)
+            t = time.perf_counter()
+            w.insert("events", r)
+            lat[p].append((time.perf_counter() - t) * 1000.0)
+    t0 = time.perf_counter()
+    _drive(produce, producers)
+    w.flush()
+    seconds = time.perf_counter() - t0  # until every row is committed, not just queued
+    stats = w.stats()
+    w.close()
+    return seconds, np.concatenate(lat), stats
+
+
+def _drive(produce, producers):
+    threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite ingest throughput benchmark")
+    ap.add_argument("--producers", type=int, default=4)
+    ap.add_argument("--rows", type=int, default=5000, help="Rows per producer")
+    ap.add_argument("--batch", type=int, default=500, help="IngestWriter max_batch")
+    ap.add_argument("--delay-ms", type=float, default=50.0, help="IngestWriter max_delay_ms")
+    ap.add_argument("--dir", default=None, help="Directory for the scratch databases (default: a temp dir)")
+    args = ap.parse_args()
+
+    base = pathlib.Path(args.dir or tempfile.mkdtemp(prefix="ingest_bench_"))
+    base.mkdir(parents=True, exist_ok=True)
+    total = args.producers * args.rows
+    print(f"producers={args.producers} rows={total} db_dir={base}")
+    print(f"{'mode':<8}{'rows/s':>10}{'insert p50':>12}{'insert p99':>12}{'flush p50':>11}{'flush p99':>11}{'max depth':>11}")
+    for mode in ("direct", "ingest"):
+        path = base / f"{mode}.db"
+        path.unlink(missing_ok=True)
+        con = sqlite3.connect(path); con.execute(SCHEMA); con.close()
+        if mode == "direct":
+            seconds, lat, stats = run_direct(path, args.producers, args.rows)
+        else:
+            seconds, lat, stats = run_ingest(path, args.producers, args.rows, args.batch, args.delay_ms)
+        n = sqlite3.connect(path).execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        assert n == total, f"{mode}: {n} of {total} rows written"
+        flush = (f"{stats['flush_p50_ms']:>9.2f}ms{stats['flush_p99_ms']:>9.2f}ms{stats['max_depth']:>11}"
+                 if stats else f"{'-':>11}{'-':>11}{'-':>11}")
+        print(f"{mode:<8}{total / seconds:>10.0f}{np.percentile(lat, 50):>10.3f}ms{np.percentile(lat, 99):>10.3f}ms{flush}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Broker load of detection publishing modes: messages/s and bytes/s per configuration.
+
+Replays a synthetic stream (cameras x fps, a fraction of frames with detections)
+through DetectionPublisher on a simulated clock and counts what would go to the
+broker. The first row is today's format (one JSON message per frame).
+
+    python bench/mqtt_publish_bench.py --cameras 8 --fps 30 --seconds 60 --defect-rate 0.05
+"""
+from __future__ import annotations
+import argparse, pathlib, sys, uuid
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from vision_runtime.det_publisher import DetectionPublisher
+
+
+class _NullClient:
+    def publish(self, topic, payload, qos=0):
+        pass
+
+
+class _Clock:
+    t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+def simulate(encoding, window_ms, empty, cameras, fps, seconds, defect_rate, seed=0):
+    rng = np.random.default_rng(seed)
+    clock = _Clock()
+    pubs = [DetectionPublisher(_NullClient(), "factory/vision/detections", encoding=encoding, window_ms=window_ms,
+                               empty=empty, clock=clock) for _ in range(cameras)]
+    for i in range(int(fps * seconds)):
+        clock.t = _Clock.t + i / fps
+        for cam, pub in enumerate(pubs):
+            n = rng.poisson(1.5) + 1 if rng.random() < defect_rate else 0
+            dets = [{"cls": str(int(rng.integers(0, 4))), "score": float(rng.uniform(0.5, 1.0)),
+                     "bbox": rng.uniform(0, 640, 4).tolist()} for _ in range(n)]
+            fid = f"f_{uuid.UUID(int=int(rng.integers(0, 2**62))).hex[:8]}"
+            pub(f"lineA-cam{cam:02d}", fid, dets, f"/data/media/lineA-cam{cam:02d}/{fid}.jpg" if n else "")
+    clock.t += 1.0
+    for pub in pubs:
+        pub.flush()
+    totals = {k: sum(p.counters[k] for p in pubs) for k in ("messages", "bytes", "frames")}
+    return {"msgs_per_s": totals["messages"] / seconds, "bytes_per_s": totals["bytes"] / seconds}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="MQTT detection publishing load benchmark")
+    ap.add_argument("--cameras", type=int, default=8)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--seconds", type=float, default=60.0)
+    ap.add_argument("--defect-rate", type=float, default=0.05, help="Fraction of frames with detections")
+    ap.add_argument("--window-ms", type=float, default=500.0)
+    args = ap.parse_args()
+
+    modes = [("json", 0.0, "send"), ("json", args.window_ms, "send"), ("json", args.window_ms, "heartbeat"),
+             ("struct", args.window_ms, "send"), ("struct", args.window_ms, "heartbeat"),
+             ("struct", args.window_ms, "drop")]
+    try:
+        import msgpack  # noqa: F401
+        modes.insert(4, ("msgpack", args.window_ms, "heartbeat"))
+    except ImportError:
+        print("(msgpack not installed; skipping msgpack rows)")
+
+    print(f"cameras={args.cameras} fps={args.fps} seconds={args.seconds} defect_rate={args.defect_rate}")
+    print(f"{'encoding':<9}{'window':>8}{'empty':>11}{'msgs/s':>10}{'bytes/s':>12}{'vs today':>10}")
+    base = None
+    for enc, win, empty in modes:
+        r = simulate(enc, win, empty, args.cameras, args.fps, args.seconds, args.defect_rate)
+        base = base or r["bytes_per_s"]
+        print(f"{enc:<9}{win:>6.0f}ms{empty:>11}{r['msgs_per_s']:>10.1f}{r['bytes_per_s']:>12.0f}"
+              f"{r['bytes_per_s'] / base:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Measure a model (pack) with onnxruntime on this device and record it for the Benchmark Matrix.
+
+Sweeps input size x batch x intra-op threads x graph optimization level. Every
+configuration gets `warmup` untimed runs and then `repeats` timed runs; the raw
+per-run latencies and their p50/p95/p99 go to the `benchmarks` table through
+record_benchmark() (samples_json, p50_ms/p95_ms/p99_ms columns).
+
+    python bench/ort_benchmark.py model_packs/defect-detector/1.2.0 \
+        --sizes 480,640,960 --batches 1,4 --threads 1,2,4 --opt basic,all --repeats 50
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, platform, sys, time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from bench.benchmark_matrix import latency_percentiles, record_benchmark
+from vision_runtime.session_cache import GRAPH_OPT_LEVELS, get_session, model_sha256
+
+ENGINE = "onnxruntime"
+
+
+def resolve_model(pack_or_model: str) -> str:
+    """ONNX path for a model pack directory (artifacts.onnx in modelpack.yaml) or a .onnx file."""
+    p = pathlib.Path(pack_or_model)
+    if p.is_dir():
+        from orchestration.model_pack import load_model_pack
+        onnx = (load_model_pack(str(p)).get("artifacts") or {}).get("onnx")
+        if not onnx:
+            raise FileNotFoundError(f"{p}/modelpack.yaml has no artifacts.onnx")
+        p = p / onnx
+    if not p.is_file():
+        raise FileNotFoundError(f"model not found: {p}")
+    return str(p)
+
+
+def input_hw() -> str:
+    return f"cpu:{platform.machine()}:{os.cpu_count()}c"
+
+
+def summarize(samples_ms: Sequence[float], batch: int = 1) -> Dict[str, float]:
+    mean = float(np.mean(samples_ms))
+    return {**latency_percentiles(samples_ms), "mean_ms": round(mean, 3),
+            "fps": round(batch * 1000.0 / mean, 2) if mean > 0 else 0.0}
+
+
+def _input_for(sess, size: int, batch: int) -> Optional[np.ndarray]:
+    """Zero input of [batch, C, size, size]; None when a static model dim rules it out."""
+    shape = list(sess.get_inputs()[0].shape)
+    want = [batch, shape[1] if isinstance(shape[1], int) else 3, size, size]
+    for have, w in zip(shape, want):
+        if isinstance(have, int) and have > 0 and have != w:
+            return None
+    return np.zeros(want, dtype=np.float32)
+
+
+def bench_config(model_path: str, size: int, batch: int, threads: int, graph_opt: str,
+                 warmup: int = 5, repeats: int = 30) -> Optional[List[float]]:
+    """Raw latencies (ms) of `repeats` timed runs, or None if the model can't take this shape."""
+    sess = get_session(model_path, intra_op_threads=threads, graph_opt=graph_opt, warmup_runs=0)
+    blob = _input_for(sess, size, batch)
+    if blob is None:
+        return None
+    feeds = {sess.get_inputs()[0].name: blob}
+    for _ in range(warmup):
+        sess.run(None, feeds)
+    samples = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        sess.run(None, feeds)
+        samples.append((time.perf_counter() - t) * 1000.0)
+    return samples
+
+
+def run_sweep(pack_or_model: str, sizes: Sequence[int] = (640,), batches: Sequence[int] = (1,),
+              threads: Sequence[int] = (0,), graph_opts: Sequence[str] = ("all",), warmup: int = 5,
+              repeats: int = 30, device_id: str = "local", record: bool = True,
+              log=print) -> List[Dict[str, Any]]:
+    """Benchmark every configuration; returns one row per measured configuration."""
+    model_path = resolve_model(pack_or_model)
+    sha = model_sha256(model_path)
+    rows: List[Dict[str, Any]] = []
+    for opt in graph_opts:
+        if opt not in GRAPH_OPT_LEVELS:
+            raise ValueError(f"Unknown graph optimization level: {opt} (expected one of {GRAPH_OPT_LEVELS})")
+        for th in threads:
+            for size in sizes:
+                for batch in batches:
+                    samples = bench_config(model_path, int(size), int(batch), int(th), opt, warmup, repeats)
+                    if samples is None:
+                        log(f"[bench] skip size={size} batch={batch}: model input shape is static")
+                        continue
+                    row = {"engine": ENGINE, "size": str(size), "batch": int(batch), "threads": int(th),
+                           "graph_opt": opt, **summarize(samples, int(batch))}
+                    rows.append(row)
+                    log(f"[bench] size={size} batch={batch} threads={th or 'auto'} opt={opt} "
+                        f"p50={row['p50_ms']:.2f} p95={row['p95_ms']:.2f} p99={row['p99_ms']:.2f} ms fps={row['fps']:.1f}")
+                    if record:
+                        notes = {"model": os.path.basename(model_path), "sha256": sha[:16], "batch": int(batch),
+                                 "threads": int(th), "graph_opt": opt, "warmup": warmup}
+                        record_benchmark(device_id, engine=ENGINE, input_hw=input_hw(), input_size=str(size),
+                                         fps=row["fps"], latency_ms=row["mean_ms"], notes=json.dumps(notes),
+                                         samples_ms=samples, batch=int(batch), threads=int(th), graph_opt=opt)
+    return rows
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="onnxruntime CPU benchmark sweep -> benchmarks table")
+    ap.add_argument("model", help="Model pack directory (modelpack.yaml) or .onnx file")
+    ap.add_argument("--sizes", default="640", help="Comma-separated square input sizes")
+    ap.add_argument("--batches", default="1", help="Comma-separated batch sizes")
+    ap.add_argument("--threads", default="0", help="Comma-separated intra-op thread counts (0 = ORT default)")
+    ap.add_argument("--opt", default="all", help=f"Comma-separated graph optimization levels {GRAPH_OPT_LEVELS}")
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--repeats", type=int, default=30)
+    ap.add_argument("--device-id", default="local")
+    ap.add_argument("--no-record", action="store_true", help="Print only, do not write to the benchmarks table")
+    args = ap.parse_args()
+    rows = run_sweep(args.model, _ints(args.sizes), _ints(args.batches), _ints(args.threads),
+                     [o for o in args.opt.split(",") if o], args.warmup, args.repeats, args.device_id,
+                     record=not args.no_record)
+    if not rows:
+        raise SystemExit("no configuration could be measured (check --sizes/--batches against the model input)")
+
+
+if __name__ == "__main__":
+    main()
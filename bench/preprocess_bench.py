@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: per-frame allocations and latency of letterbox preprocessing.
+
+Compares the original `preprocess_bgr` (examples/vision_inspection/camera_infer.py)
+with `LetterboxPreprocessor`, which reuses its canvas and blob buffers.
+
+    python bench/preprocess_bench.py --src 1920x1080 --size 640 --frames 200
+"""
+from __future__ import annotations
+import argparse, pathlib, sys, time, tracemalloc
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from examples.vision_inspection.camera_infer import preprocess_bgr
+from src.preprocessing.letterbox import LetterboxPreprocessor
+
+
+def _measure(fn, frames, n):
+    fn(frames[0])  # warm-up (first call allocates the reusable buffers)
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(frames[i % len(frames)])
+    ms = (time.perf_counter() - t0) * 1000.0 / n
+
+    # numpy and cv2 output arrays go through the traced allocator
+    samples = min(n, 50)
+    allocated = 0
+    tracemalloc.start()
+    for i in range(samples):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(frames[i % len(frames)])
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return ms, allocated / samples
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Letterbox preprocessing micro-benchmark")
+    ap.add_argument("--src", default="1920x1080", help="Source frame WxH")
+    ap.add_argument("--size", type=int, default=640, help="Square model input size")
+    ap.add_argument("--frames", type=int, default=200, help="Timed iterations")
+    args = ap.parse_args()
+
+    w, h = (int(v) for v in args.src.lower().split("x"))
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (h, w, 3), dtype=np.uint8) for _ in range(4)]
+    size = (args.size, args.size)
+    pre = LetterboxPreprocessor(size)
+
+    ref_blob, ref_scale = preprocess_bgr(frames[1], size)
+    new_blob, new_scale = pre(frames[1])
+    identical = bool(np.array_equal(ref_blob, new_blob)) and ref_scale == new_scale
+
+    rows = [("preprocess_bgr", _measure(lambda f: preprocess_bgr(f, size), frames, args.frames)),
+            ("LetterboxPreprocessor", _measure(pre, frames, args.frames))]
+    print(f"src={w}x{h} input={args.size}x{args.size} frames={args.frames} identical_output={identical}")
+    print(f"{'impl':<24}{'ms/frame':>10}{'peak alloc/frame (MB)':>24}")
+    for name, (ms, alloc) in rows:
+        print(f"{name:<24}{ms:>10.3f}{alloc / 1e6:>24.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Fail a build when a model pack got slower on this device than its accepted baseline.
+
+Each configuration (size x batch x threads x graph optimization) is measured in
+`trials` independent trials of `repeats` timed runs. Per metric (p50/p95/p99) the
+run's value is the median over trials and its noise the standard deviation over
+trials. A configuration regresses when, for any gated metric,
+
+    current - baseline > max(min_rel * baseline, min_abs_ms, k * sqrt(noise_baseline**2 + noise_current**2))
+
+so a noisy box needs a bigger slowdown before it fails, and a quiet one still
+ignores changes below `min_rel` (and below `min_abs_ms` of timer jitter for tiny
+models). Baselines live in the pack's modelpack.yaml under
+bench_baseline[<input_hw>][<config key>] (orchestration.model_pack.persist_bench_result)
+and are only compared on the same hardware string.
+
+    python -m src.cli bench-gate model_packs/defect-detector/1.2.0 --trials 5 --repeats 30
+    python -m src.cli bench-gate model_packs/defect-detector/1.2.0 --accept   # record baseline
+
+Exit status: 0 pass, 1 regression, 2 nothing to compare (no baseline / nothing measurable).
+"""
+from __future__ import annotations
+import json, math, os, pathlib, sys
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from bench.benchmark_matrix import latency_percentiles, record_benchmark
+from bench.ort_benchmark import ENGINE, bench_config, input_hw, resolve_model
+from orchestration.model_pack import bench_config_key, load_bench_baseline, persist_bench_result
+from vision_runtime.session_cache import GRAPH_OPT_LEVELS, model_sha256
+
+METRICS = ("p50", "p95", "p99")
+EXIT_OK, EXIT_REGRESSION, EXIT_NO_BASELINE = 0, 1, 2
+
+
+def trial_stats(trials: Sequence[Sequence[float]]) -> Dict[str, float]:
+    """Median and between-trial standard deviation of each percentile over the trials."""
+    per = [latency_percentiles(t) for t in trials]
+    out: Dict[str, float] = {"trials": len(trials), "repeats": min(len(t) for t in trials)}
+    for m in METRICS:
+        vals = np.array([p[f"{m}_ms"] for p in per])
+        out[f"{m}_ms"] = round(float(np.median(vals)), 3)
+        out[f"{m}_noise_ms"] = round(float(np.std(vals, ddof=1)), 3) if len(vals) > 1 else 0.0
+    return out
+
+
+def compare(base: Dict[str, Any], cur: Dict[str, Any], metrics: Sequence[str] = ("p50", "p99"),
+            k: float = 3.0, min_rel: float = 0.05, min_abs_ms: float = 0.1) -> Dict[str, Any]:
+    """Per-metric delta, allowed margin and verdict; status is the worst over `metrics`."""
+    out: Dict[str, Any] = {"status": "ok", "metrics": {}}
+    for m in metrics:
+        b, c = float(base[f"{m}_ms"]), float(cur[f"{m}_ms"])
+        noise = math.hypot(float(base.get(f"{m}_noise_ms", 0.0)), float(cur.get(f"{m}_noise_ms", 0.0)))
+        margin = max(min_rel * b, min_abs_ms, k * noise)
+        delta = c - b
+        verdict = "regressed" if delta > margin else "improved" if delta < -margin else "ok"
+        out["metrics"][m] = {"baseline_ms": b, "current_ms": c, "delta_ms": round(delta, 3),
+                             "delta_pct": round(100.0 * delta / b, 1) if b > 0 else 0.0,
+                             "margin_ms": round(margin, 3), "verdict": verdict}
+        if verdict == "regressed":
+            out["status"] = "regressed"
+        elif verdict == "improved" and out["status"] == "ok":
+            out["status"] = "improved"
+    return out
+
+
+def format_report(results: List[Dict[str, Any]], hw: str) -> str:
+    lines = [f"[bench-gate] hw={hw}",
+             f"{'config':<34}{'metric':>7}{'base ms':>10}{'now ms':>10}{'delta':>9}{'margin':>9}  verdict"]
+    for r in results:
+        if r["status"] == "new":
+            lines.append(f"{r['key']:<34}{'-':>7}{'-':>10}{r['current']['p50_ms']:>10.2f}{'':>9}{'':>9}  new (no baseline)")
+            continue
+        for i, (m, d) in enumerate(r["metrics"].items()):
+            lines.append(f"{r['key'] if i == 0 else '':<34}{m:>7}{d['baseline_ms']:>10.2f}{d['current_ms']:>10.2f}"
+                         f"{d['delta_pct']:>+8.1f}%{d['margin_ms']:>8.2f}ms  {d['verdict']}")
+    bad = sum(r["status"] == "regressed" for r in results)
+    lines.append(f"[bench-gate] {len(results)} configs, {bad} regressed")
+    return "\n".join(lines)
+
+
+def run_gate(pack_dir: str, sizes: Sequence[int] = (640,), batches: Sequence[int] = (1,),
+             threads: Sequence[int] = (0,), graph_opts: Sequence[str] = ("all",), trials: int = 5,
+             warmup: int = 5, repeats: int = 30, metrics: Sequence[str] = ("p50", "p99"), k: float = 3.0,
+             min_rel: float = 0.05, min_abs_ms: float = 0.1, accept: bool = False, device_id: str = "local",
+             record: bool = True, report: Optional[str] = None, log=print) -> int:
+    """Measure the pack, compare with its baseline for this hardware and return the exit status.
+
+    With `accept`, the measured run becomes the new baseline (after the comparison is reported).
+    """
+    for m in metrics:
+        if m not in METRICS:
+            raise ValueError(f"Unknown metric: {m} (expected one of {METRICS})")
+    model_path = resolve_model(pack_dir)
+    sha, hw = model_sha256(model_path), input_hw()
+    baseline = load_bench_baseline(pack_dir, hw)
+    results: List[Dict[str, Any]] = []
+    for opt in graph_opts:
+        if opt not in GRAPH_OPT_LEVELS:
+            raise ValueError(f"Unknown graph optimization level: {opt} (expected one of {GRAPH_OPT_LEVELS})")
+        for th in threads:
+            for size in sizes:
+                for batch in batches:
+                    runs = []
+                    for _ in range(max(1, int(trials))):
+                        samples = bench_config(model_path, int(size), int(batch), int(th), opt, warmup, repeats)
+                        if samples is None:
+                            break
+                        runs.append(samples)
+                    if not runs:
+                        log(f"[bench-gate] skip size={size} batch={batch}: model input shape is static")
+                        continue
+                    cur = {"batch": int(batch), "threads": int(th), "graph_opt": opt, "sha256": sha[:16],
+                           **trial_stats(runs)}
+                    cur["fps"] = round(int(batch) * 1000.0 / cur["p50_ms"], 2) if cur["p50_ms"] > 0 else 0.0
+                    key = bench_config_key(ENGINE, size, batch, th, opt)
+                    res: Dict[str, Any] = {"key": key, "size": str(size), "current": cur}
+                    if key in baseline:
+                        res.update(compare(baseline[key], cur, metrics, k, min_rel, min_abs_ms), baseline=baseline[key])
+                    else:
+                        res["status"] = "new"
+                    results.append(res)
+                    if record:
+                        notes = {"model": os.path.basename(model_path), "sha256": sha[:16], "batch": int(batch),
+                                 "threads": int(th), "graph_opt": opt, "warmup": warmup, "gate": res["status"]}
+                        samples = [v for r in runs for v in r]
+                        record_benchmark(device_id, engine=ENGINE, input_hw=hw, input_size=str(size), fps=cur["fps"],
+                                         latency_ms=round(float(np.mean(samples)), 3),  # mean, as it always was
+                                         notes=json.dumps(notes), samples_ms=samples, batch=int(batch),
+                                         threads=int(th), graph_opt=opt)
+    if not results:
+        log("[bench-gate] no configuration could be measured (check --sizes/--batches against the model input)")
+        return EXIT_NO_BASELINE
+    log(format_report(results, hw))
+    if report:
+        with open(report, "w", encoding="utf-8") as f:
+            json.dump({"pack": str(pack_dir), "hw": hw, "k": k, "min_rel": min_rel, "min_abs_ms": min_abs_ms, "results": results}, f, indent=2)
+    if accept:
+        for r in results:
+            c = r["current"]
+            persist_bench_result(pack_dir, ENGINE, r["size"], c["fps"], c["p50_ms"], baseline=c, hw=hw)
+        log(f"[bench-gate] accepted {len(results)} configs as the baseline for {hw}")
+        return EXIT_OK
+    if any(r["status"] == "regressed" for r in results):
+        return EXIT_REGRESSION
+    if all(r["status"] == "new" for r in results):
+        log(f"[bench-gate] {pack_dir} has no baseline for {hw}; run with --accept to record one")
+        return EXIT_NO_BASELINE
+    return EXIT_OK
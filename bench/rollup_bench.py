@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Yield trend query cost: GROUP BY date(ts) over inspections vs the core.rollups tiers.
+
+Fills a scratch core.db database with `--rows` inspections spread over `--days`
+days, then times the old dashboard query against yield_series() at day and
+hour resolution, and the per-row insert cost with and without the rollup
+triggers: live rows (after the backfilled range: one minute upsert each), late
+rows (behind the fold watermark: minute, hour and day upserts) and the fold
+that rolls the live minutes up afterwards.
+
+    python bench/rollup_bench.py --rows 500000 --days 90
+"""
+from __future__ import annotations
+import argparse, pathlib, random, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+import core.db
+from core import rollups
+
+LEGACY = """SELECT date(ts) as day, SUM(result='PASS') as pass_cnt, SUM(result='FAIL') as fail_cnt
+            FROM inspections GROUP BY date(ts) ORDER BY day DESC LIMIT 30"""
+
+
+def rows(n, days, seed=0, unit="U", live=False):
+    rng = random.Random(seed)
+    for i in range(n):
+        # live: in arrival order over the hour after the seeded range
+        t = days * 86400 + i * 3600 // n if live else rng.randrange(days * 86400)
+        yield (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(1735689600 + t)),
+               "E1", rng.choice(["ST01", "ST02", "ST03"]), rng.choice(["A", "B", "C"]), f"{unit}{i:08d}",
+               "PASS" if rng.random() < 0.95 else "FAIL", rng.random(), rng.choice(["v1", "v2"]))
+
+
+def insert(con, n, days, unit, live=False):
+    t = time.perf_counter()
+    con.execute("BEGIN")
+    con.executemany("INSERT INTO inspections(ts, device_id, station, shift, unit_id, result, score, model_ver) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows(n, days, 1, unit, live))
+    con.execute("COMMIT")
+    return n / (time.perf_counter() - t)
+
+
+def timed(fn, reps):
+    fn()
+    t = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - t) / reps * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspection rollup benchmark")
+    ap.add_argument("--rows", type=int, default=500000)
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--reps", type=int, default=10)
+    args = ap.parse_args()
+
+    core.db.DB_PATH = pathlib.Path(tempfile.mkdtemp(prefix="rollup_bench_")) / "edge.db"
+    con = core.db.connect()
+    con.executescript(core.db.SCHEMA_FILE.read_text(encoding="utf-8"))
+    plain = insert(con, args.rows, args.days, "U")
+    t = time.perf_counter()
+    rollups.install(con)
+    print(f"rows={args.rows} days={args.days}  backfill {time.perf_counter() - t:.2f}s  "
+          + "  ".join(f"{tier}={con.execute(f'SELECT COUNT(*) FROM {rollups.table(tier)}').fetchone()[0]}"
+                      for tier, _ in rollups.TIERS))
+    live = insert(con, 50000, args.days, "V", live=True)
+    late = insert(con, 50000, args.days, "W")
+    t = time.perf_counter()
+    rollups.fold(con, f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(1735689600 + args.days * 86400 + 3600))}")
+    fold_ms = (time.perf_counter() - t) * 1000.0
+    print(f"insert rows/s: plain {plain:,.0f}  live with triggers {live:,.0f}  late with triggers {late:,.0f}  "
+          f"fold of the live hour {fold_ms:.1f}ms")
+    print(f"{'query':<34}{'ms':>9}")
+    for name, fn in (("GROUP BY date(ts), last 30 days", lambda: con.execute(LEGACY).fetchall()),
+                     ("rollups day, last 30", lambda: rollups.yield_series(con, latest=30)),
+                     ("rollups hour, last 48", lambda: rollups.yield_series(con, resolution="hour", latest=48)),
+                     ("rollups day by station", lambda: rollups.yield_series(con, by=["station"], latest=30))):
+        print(f"{name:<34}{timed(fn, args.reps):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""One sensor_readings table vs core.partitions daily partitions.
+
+Loads `--days` days of history at `--per-day` readings per day into both
+layouts, then times: inserting one more day (Python router and the view's
+INSERT trigger), a one-hour range aggregate, and expiring the oldest week
+(DELETE ... WHERE ts < cutoff vs dropping seven partitions).
+
+    python bench/sensor_partition_bench.py --days 60 --per-day 50000
+"""
+from __future__ import annotations
+import argparse, datetime as dt, pathlib, sqlite3, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from core import partitions
+
+T0 = dt.datetime(2025, 1, 1)
+COLS = ", ".join(partitions.COLUMNS)
+ONE_HOUR = "SELECT sensor_id, AVG(value) FROM ({src}) GROUP BY 1"
+
+
+def readings(day, per_day):
+    step = 86400 / per_day
+    for i in range(per_day):
+        ts = (T0 + dt.timedelta(days=day, seconds=i * step)).isoformat(timespec="milliseconds")
+        yield {"ts": ts, "device_id": f"E{i % 8}", "sensor_id": f"s{i % 16}", "metric": "temp", "value": i % 97,
+               "unit": "C", "quality": "ok", "raw_json": None}
+
+
+def connect(path):
+    con = sqlite3.connect(path, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL"); con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return (time.perf_counter() - t) * 1000.0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Partitioned vs single-table sensor_readings benchmark")
+    ap.add_argument("--days", type=int, default=60)
+    ap.add_argument("--per-day", type=int, default=50000)
+    args = ap.parse_args()
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="partition_bench_"))
+
+    mono = connect(tmp / "mono.db")
+    mono.execute(f"CREATE TABLE sensor_readings (ts TEXT, device_id TEXT, sensor_id TEXT, metric TEXT, value REAL, "
+                 f"unit TEXT, quality TEXT, raw_json TEXT, PRIMARY KEY (ts, device_id, sensor_id, metric))")
+    mono.execute("CREATE INDEX idx_sensor_t ON sensor_readings(ts)")
+    mono.execute("CREATE INDEX idx_sensor_dev ON sensor_readings(device_id, sensor_id)")
+    part = connect(tmp / "part.db")
+    partitions.install(part, period="day")
+
+    def mono_insert(day):
+        mono.execute("BEGIN")
+        mono.executemany(f"INSERT INTO sensor_readings({COLS}) VALUES ({', '.join('?' * 8)})",
+                         [tuple(r.values()) for r in readings(day, args.per_day)])
+        mono.execute("COMMIT")
+
+    def view_insert(con, day):
+        con.execute("BEGIN")
+        con.executemany(f"INSERT INTO sensor_readings({COLS}) VALUES ({', '.join('?' * 8)})",
+                        [tuple(r.values()) for r in readings(day, args.per_day)])
+        con.execute("COMMIT")
+
+    for day in range(args.days):
+        mono_insert(day)
+        partitions.insert_readings(part, list(readings(day, args.per_day)))
+    print(f"days={args.days} per_day={args.per_day} partitions={len(partitions.partitions(part))}")
+
+    last = T0 + dt.timedelta(days=args.days)
+    partitions.ensure(part, [last.date(), (last + dt.timedelta(days=1)).date()])
+    rows = [f"{'insert one more day':<28}", f"{'1h range aggregate':<28}", f"{'expire oldest 7 days':<28}"]
+    ms_mono, _ = timed(lambda: mono_insert(args.days))
+    ms_router, _ = timed(lambda: partitions.insert_readings(part, list(readings(args.days + 1, args.per_day))))
+    ms_view, _ = timed(lambda: view_insert(part, args.days + 2))
+    start = (T0 + dt.timedelta(days=args.days // 2, hours=5)).isoformat()
+    end = (T0 + dt.timedelta(days=args.days // 2, hours=6)).isoformat()
+    q_mono, a = timed(lambda: mono.execute(ONE_HOUR.format(src="SELECT * FROM sensor_readings WHERE ts >= ? AND ts < ?"),
+                                           (start, end)).fetchall())
+    sql, params = partitions.range_sql(part, start, end)
+    q_part, b = timed(lambda: part.execute(ONE_HOUR.format(src=sql), params).fetchall())
+    q_view, _ = timed(lambda: part.execute(ONE_HOUR.format(src="SELECT * FROM sensor_readings WHERE ts >= ? AND ts < ?"),
+                                           (start, end)).fetchall())
+    assert a == b
+    cutoff = (T0 + dt.timedelta(days=7)).isoformat()
+    d_mono, _ = timed(lambda: (mono.execute("DELETE FROM sensor_readings WHERE ts < ?", (cutoff,))))
+    d_part, dropped = timed(lambda: partitions.expire(part, keep_days=args.days + 3 - 7,
+                                                      now=last + dt.timedelta(days=3)))
+    assert len(dropped) == 7, dropped
+    print(f"{'':<28}{'single':>10}{'partitioned':>13}{'via view':>10}")
+    print(f"{rows[0]}{ms_mono:>8.0f}ms{ms_router:>11.0f}ms{ms_view:>8.0f}ms")
+    print(f"{rows[1]}{q_mono:>8.1f}ms{q_part:>11.1f}ms{q_view:>8.1f}ms")
+    print(f"{rows[2]}{d_mono:>8.0f}ms{d_part:>11.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
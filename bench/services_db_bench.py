@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Dashboard query latency under concurrent sessions: connection per query vs the pool.
+
+Each session thread loads a "page" `--reruns` times: build_kpis() plus one page of
+the traceability join. "per-query" is the old services.db behaviour (a new
+sqlite3.connect and PRAGMA for every q_one/q_all and for build_kpis); "pooled" is
+the thread-local read-only pool, whose build_kpis() reads the trigger-maintained
+kpi_counters rows instead of scanning the fact tables. The database is a scratch copy of the
+data/edgekit.db schema filled with `--readings` synthetic readings.
+
+    python bench/services_db_bench.py --sessions 8 --reruns 50 --readings 200000
+"""
+from __future__ import annotations
+import argparse, pathlib, random, sqlite3, sys, tempfile, threading, time
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+import services.db as sdb
+from services import kpi_counters
+from services.kpis import build_kpis
+from services.queries import TRACEABILITY_JOIN
+
+TABLES = ("devices", "sensor_readings", "inference_events", "anomalies", "quality_results")
+
+
+def make_db(path, readings, template="data/edgekit.db"):
+    src = sqlite3.connect(template)
+    ddl = [r[0] for r in src.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name IN (%s)"
+                                     % ",".join("?" * len(TABLES)), TABLES)]
+    src.close()
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=WAL")
+    for sql in ddl:
+        con.execute(sql)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_sensor_t ON sensor_readings(ts)")
+    rng = random.Random(0)
+    devs = [f"dev-{i:03d}" for i in range(20)]
+    con.executemany("INSERT INTO devices(device_id, model, last_seen_ts) VALUES (?, 'x', datetime('now'))",
+                    [(d,) for d in devs])
+    con.executemany("INSERT INTO sensor_readings(ts, device_id, sensor_type, value, unit) "
+                    "VALUES (datetime('now', ?), ?, 'temp', ?, 'C')",
+                    [(f"-{rng.randint(0, 86400 * 7)} seconds", rng.choice(devs), rng.random()) for _ in range(readings)])
+    con.execute("INSERT INTO inference_events(ts, device_id, reading_id, model_name, pred_label, pred_score) "
+                "SELECT ts, device_id, id, 'm', 'ok', 0.9 FROM sensor_readings WHERE id % 2 = 0")
+    con.execute("INSERT INTO quality_results(ts, device_id, reading_id, passed) "
+                "SELECT ts, device_id, id, (id % 10) != 0 FROM sensor_readings WHERE id % 2 = 0")
+    con.execute("INSERT INTO anomalies(ts, device_id, reading_id, severity) "
+                "SELECT ts, device_id, id, 'low' FROM sensor_readings WHERE id % 25 = 0")
+    con.commit()
+    kpi_counters.install(con)  # what `kpi-repair` does on a deployed database
+    con.close()
+
+
+def legacy_q_all(sql, params=()):
+    with sdb.get_conn() as conn:  # the pre-pool helper: new connection + PRAGMAs per call
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def legacy_kpis():
+    conn = sdb.get_conn()
+    cur = conn.cursor()
+    for t in TABLES:
+        cur.execute(f"SELECT COUNT(*) FROM {t}").fetchone()
+    cur.execute("SELECT COUNT(*) FROM devices WHERE last_seen_ts >= datetime('now', '-1 day')").fetchone()
+    cur.execute("SELECT COUNT(*) FROM quality_results WHERE passed=1").fetchone()
+    cur.execute("SELECT MAX(ts) FROM sensor_readings").fetchone()
+    cur.execute("SELECT device_id FROM devices ORDER BY device_id LIMIT 5").fetchall()
+    conn.close()
+
+
+def page(mode):
+    if mode == "per-query":
+        legacy_kpis()
+        legacy_q_all(TRACEABILITY_JOIN, ("-1 day", "", "", 100, 0))
+    else:
+        build_kpis()
+        sdb.q_all(TRACEABILITY_JOIN, ("-1 day", "", "", 100, 0))
+
+
+def run(mode, sessions, reruns):
+    lat = [[] for _ in range(sessions)]
+
+    def session(i):
+        for _ in range(reruns):
+            t = time.perf_counter()
+            page(mode)
+            lat[i].append((time.perf_counter() - t) * 1000.0)
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.concatenate(lat), time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="services.db pooled vs per-query connection benchmark")
+    ap.add_argument("--sessions", type=int, default=8, help="Concurrent dashboard sessions (threads)")
+    ap.add_argument("--reruns", type=int, default=50, help="Page loads per session")
+    ap.add_argument("--readings", type=int, default=200000)
+    args = ap.parse_args()
+
+    path = pathlib.Path(tempfile.mkdtemp(prefix="svc_db_bench_")) / "edgekit.db"
+    make_db(path, args.readings)
+    sdb.DB_PATH = str(path)
+    print(f"sessions={args.sessions} reruns={args.reruns} readings={args.readings}")
+    print(f"{'mode':<10}{'page p50':>10}{'page p95':>10}{'page p99':>10}{'pages/s':>9}")
+    for mode in ("per-query", "pooled"):
+        page(mode)  # warm the OS page cache for both modes
+        lat, secs = run(mode, args.sessions, args.reruns)
+        print(f"{mode:<10}{np.percentile(lat, 50):>8.2f}ms{np.percentile(lat, 95):>8.2f}ms"
+              f"{np.percentile(lat, 99):>8.2f}ms{len(lat) / secs:>9.1f}")
+    print(f"pooled connections opened: {sdb.pool().opened}")
+    for name, fn in (("scan", legacy_kpis), ("counters", build_kpis)):
+        t = time.perf_counter()
+        for _ in range(args.reruns):
+            fn()
+        print(f"kpis via {name:<9}{(time.perf_counter() - t) / args.reruns * 1000:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Startup time of an InferenceSession: no cache vs cold cache vs warm disk cache vs in-process.
+
+    python bench/session_startup_bench.py --model models/defect_detector.onnx --repeats 5
+"""
+from __future__ import annotations
+import argparse, pathlib, shutil, sys, tempfile, time
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from vision_runtime import session_cache
+
+
+TIER_ROWS = {"miss": "cold cache (optimize + save)", "disk": "warm disk cache", "memory": "in-process shared"}
+
+
+def _plain(model, warmup_runs):
+    import onnxruntime as ort
+    t = time.perf_counter()
+    sess = ort.InferenceSession(model, providers=["CPUExecutionProvider"])
+    load = (time.perf_counter() - t) * 1000.0
+    return load, session_cache.warm_up(sess, warmup_runs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Session startup benchmark")
+    ap.add_argument("--model", default="models/defect_detector.onnx")
+    ap.add_argument("--graph-opt", choices=session_cache.GRAPH_OPT_LEVELS, default="all")
+    ap.add_argument("--warmup-runs", type=int, default=1)
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    rows = {"uncached InferenceSession": [], **{label: [] for label in TIER_ROWS.values()}}
+    for _ in range(args.repeats):
+        rows["uncached InferenceSession"].append(_plain(args.model, args.warmup_runs))
+        tmp = pathlib.Path(tempfile.mkdtemp(prefix="ort_cache_"))
+        try:
+            # the first shared call still loads from disk (the memory cache starts empty), so
+            # every sample goes to the row of the tier that actually served it
+            for share in (False, False, True, True):
+                session_cache.get_session(args.model, graph_opt=args.graph_opt, warmup_runs=args.warmup_runs,
+                                          cache_dir=tmp, share=share)
+                info = session_cache.last_load
+                rows[TIER_ROWS[info["tier"]]].append((info["load_ms"], info["warmup_ms"]))
+        finally:
+            session_cache.clear_memory_cache()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"model={args.model} graph_opt={args.graph_opt} warmup_runs={args.warmup_runs} repeats={args.repeats}")
+    print(f"{'path':<32}{'load ms':>10}{'warm-up ms':>12}")
+    for label, samples in rows.items():
+        arr = np.asarray(samples)
+        print(f"{label:<32}{np.median(arr[:, 0]):>10.2f}{np.median(arr[:, 1]):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Benchmark tiled inference: tiles/s and end-to-end latency per image size.
+
+    python bench/tiling_bench.py --model models/defect_detector.onnx \
+        --sizes 1920x1080,3840x2160,8192x1024 --tile 640 --overlap 0.2 --max-batch 8
+"""
+from __future__ import annotations
+import argparse, pathlib, sys, time
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from src.preprocessing.tiler import TileBatcher, run_chunked
+from vision_runtime.postprocess import decode_detections, split_outputs
+
+
+def bench_size(run_model, w, h, tile, overlap, max_batch, repeats):
+    frame = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    tiler = TileBatcher(tile, overlap)
+    run = run_chunked(run_model, max_batch)
+    prep, infer, post = [], [], []
+    n_tiles = 0
+    for i in range(repeats + 1):
+        t0 = time.perf_counter()
+        batch, ctx = tiler(frame)
+        t1 = time.perf_counter()
+        outputs = run("bench", batch)
+        t2 = time.perf_counter()
+        per_tile = split_outputs(outputs, [1] * batch.shape[0])
+        tiler.to_frame([decode_detections(o, m[2]) for o, m in zip(per_tile, ctx[1])], ctx)
+        t3 = time.perf_counter()
+        n_tiles = batch.shape[0]
+        if i == 0:
+            continue  # warm-up: buffer allocation and first session run
+        prep.append(t1 - t0); infer.append(t2 - t1); post.append(t3 - t2)
+    e2e = np.add(np.add(prep, infer), post) * 1000.0
+    return {
+        "size": f"{w}x{h}", "tiles": n_tiles,
+        "prep_ms": np.mean(prep) * 1000.0, "infer_ms": np.mean(infer) * 1000.0, "merge_ms": np.mean(post) * 1000.0,
+        "e2e_p50_ms": float(np.percentile(e2e, 50)), "e2e_p95_ms": float(np.percentile(e2e, 95)),
+        "tiles_per_s": n_tiles / (np.mean(e2e) / 1000.0),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tiled inference benchmark")
+    ap.add_argument("--model", default="models/defect_detector.onnx")
+    ap.add_argument("--sizes", default="1920x1080,3840x2160,8192x1024", help="Comma-separated WxH list")
+    ap.add_argument("--tile", type=int, default=640)
+    ap.add_argument("--overlap", type=float, default=0.2)
+    ap.add_argument("--max-batch", type=int, default=8)
+    ap.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = ORT default)")
+    ap.add_argument("--repeats", type=int, default=10)
+    args = ap.parse_args()
+
+    import onnxruntime as ort
+    so = ort.SessionOptions()
+    if args.threads:
+        so.intra_op_num_threads = args.threads
+    sess = ort.InferenceSession(args.model, so, providers=["CPUExecutionProvider"])
+    input_name = sess.get_inputs()[0].name
+    run_model = lambda frame_id, blob: sess.run(None, {input_name: blob})
+
+    print(f"model={args.model} tile={args.tile} overlap={args.overlap} max_batch={args.max_batch}")
+    print(f"{'size':<12}{'tiles':>6}{'prep ms':>9}{'infer ms':>10}{'merge ms':>10}{'e2e p50':>9}{'e2e p95':>9}{'tiles/s':>9}")
+    for spec in args.sizes.split(","):
+        w, h = (int(v) for v in spec.lower().split("x"))
+        r = bench_size(run_model, w, h, args.tile, args.overlap, args.max_batch, args.repeats)
+        print(f"{r['size']:<12}{r['tiles']:>6}{r['prep_ms']:>9.2f}{r['infer_ms']:>10.2f}{r['merge_ms']:>10.2f}"
+              f"{r['e2e_p50_ms']:>9.2f}{r['e2e_p95_ms']:>9.2f}{r['tiles_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ def connect():
     con.execute("PRAGMA journal_mode=WAL;")
     con.execute("PRAGMA synchronous=NORMAL;")
     con.execute("PRAGMA foreign_keys=ON;")
+    con.execute("PRAGMA recursive_triggers=ON;")  # INSERT OR REPLACE fires delete triggers (core.rollups)
     con.row_factory = sqlite3.Row
     return con
 def migrate(con=None):
@@ -16,7 +17,17 @@ def migrate(con=None):
         con = connect(); close_after = True
     with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
         con.executescript(f.read())
+    from core import partitions, rollups
+    partitions.install(con)
+    rollups.install(con)
     if close_after: con.close()
+def housekeeping(con):
+    # periodic upkeep, run between batches by the long-running ingest owner's writer (gateway/bridge.py)
+    from core import partitions, rollups
+    if rollups.installed(con):
+        rollups.fold(con)
+    if partitions.installed(con):
+        partitions.maintain(con)
 def dicts(rows): return [dict(r) for r in rows]
 def insert_change(con, table, op, pk, row):
     con.execute("INSERT INTO changes(table_name, op, pk, row_json) VALUES (?,?,?,?)",(table,op,pk,json.dumps(row)))
\ No newline at end of file
@@ -0,0 +1,336 @@
+# ingest.py - Single-writer, group-committed row ingest for the edge database
+"""One thread owns the write connection; producers only enqueue rows.
+
+    w = get_writer()
+    w.insert("events", {"ts": utc_now(), "device_id": "cam-01", "type": "forward", ...})
+    w.flush()   # only where the caller needs to read its own write straight away
+
+Rows collect until `max_batch` are pending or the oldest has waited `max_delay_ms`;
+then every pending row goes in one BEGIN IMMEDIATE ... COMMIT, with one executemany
+per (table, columns) group. That turns a per-row transaction (and its WAL sync and
+lock round-trip) into one per batch, and since nothing else in the process writes,
+producers never wait on SQLITE_BUSY. A batch that fails is retried row by row so a
+single bad row is counted and skipped instead of losing its neighbours. Rows for
+a partitioned sensor_readings go through core.partitions.insert_readings(), which
+writes each partition directly and creates missing ones.
+
+The queue is bounded: when the disk falls behind, insert() blocks the producer
+(backpressure) rather than growing without limit or dropping rows.
+
+`housekeeping(con)`, if given, runs on the writer thread every `housekeeping_s`
+between batches; its errors go to last_error and never stop the writer. Only the
+long-running ingest owner (gateway/bridge.py) passes core.db.housekeeping, so
+short-lived producers never run database maintenance.
+
+get_writer() returns the one writer per database; asking for settings that
+differ from the running writer's raises ValueError rather than ignoring them.
+
+If the writer thread cannot open the database or dies, the constructor,
+insert() and flush() raise WriterStopped instead of blocking on a queue nobody
+drains; get_writer() then starts a fresh writer on the next call.
+"""
+from __future__ import annotations
+import atexit, inspect, queue, sqlite3, threading, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from vision_runtime.latency import LatencyHistogram
+
+CONFLICT_MODES = (None, "IGNORE", "REPLACE")
+_FLUSH = object()
+_STOP = object()
+_POLL_S = 0.5  # how often blocked producers check the writer is still alive
+
+
+class WriterStopped(RuntimeError):
+    """The ingest writer thread is gone; rows can no longer be written through it."""
+
+
+def utc_now() -> str:
+    """Timestamp in the format of SQLite's datetime('now') / CURRENT_TIMESTAMP."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+class IngestWriter:
+    """Background writer thread with size/time-triggered group commits."""
+
+    def __init__(self, db_path=None, max_batch: int = 500, max_delay_ms: float = 50.0, max_queue: int = 50000,
+                 connect=None, housekeeping=None, housekeeping_s: float = 60.0):
+        from core import db
+        self._connect = connect or (lambda: db.connect() if db_path is None else _connect_path(db_path))
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay_s = max(0.0, float(max_delay_ms)) / 1000.0
+        self.housekeeping = housekeeping
+        self.housekeeping_s = max(0.0, float(housekeeping_s))
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._flush_hist = LatencyHistogram()
+        self._started = time.perf_counter()
+        self.counters = {"enqueued": 0, "written": 0, "errors": 0, "batches": 0, "max_depth": 0}
+        self.last_error: Optional[str] = None
+        self._failure: Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._failure is not None:
+            raise WriterStopped(f"ingest writer could not start: {self._failure}") from self._failure
+
+    @property
+    def alive(self) -> bool:
+        return self._failure is None and self._thread.is_alive()
+
+    def _check(self) -> None:
+        if not self.alive:
+            raise WriterStopped(f"ingest writer stopped: {self._failure or 'closed'}") from self._failure
+
+    def _put(self, item, timeout: Optional[float] = None) -> None:
+        # bounded waits, so a producer blocked on a full queue notices a dead writer
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._check()
+            wait = _POLL_S if deadline is None else min(_POLL_S, max(0.0, deadline - time.monotonic()))
+            try:
+                self._q.put(item, timeout=wait)
+                return
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def insert(self, table: str, row: Dict[str, Any], on_conflict: Optional[str] = None,
+               timeout: Optional[float] = None) -> None:
+        """Queue one row; blocks while the queue is full (raises queue.Full after `timeout`,
+        WriterStopped if the writer thread is gone)."""
+        if on_conflict not in CONFLICT_MODES:
+            raise ValueError(f"Unknown conflict mode: {on_conflict} (expected one of {CONFLICT_MODES})")
+        self._put((table, tuple(row), tuple(row.values()), on_conflict), timeout=timeout)
+        with self._lock:
+            self.counters["enqueued"] += 1
+            depth = self._q.qsize()
+            if depth > self.counters["max_depth"]:
+                self.counters["max_depth"] = depth
+
+    def insert_many(self, table: str, rows: Sequence[Dict[str, Any]], on_conflict: Optional[str] = None) -> None:
+        for row in rows:
+            self.insert(table, row, on_conflict)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything queued so far; True once it is on disk, False after `timeout`.
+        Raises WriterStopped if the writer dies before that."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        self._put((_FLUSH, done), timeout=timeout)
+        while not done.is_set():
+            wait = _POLL_S if deadline is None else min(_POLL_S, max(0.0, deadline - time.monotonic()))
+            if done.wait(wait):
+                break
+            self._check()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        self._check()  # woken by a failing writer: the rows did not make it
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        if self.alive:
+            self._q.put((_STOP, None))
+            self._thread.join(timeout)
+
+    @property
+    def depth(self) -> int:
+        return self._q.qsize()
+
+    def _run(self) -> None:
+        try:
+            con = self._connect()
+            con.execute("PRAGMA busy_timeout=5000;")  # other processes (dashboard, CLI) may hold the lock briefly
+        except BaseException as e:
+            self._fail(e, [])
+            return
+        self._ready.set()
+        waiters: List[threading.Event] = []
+        try:
+            self._loop(con, waiters)
+        except BaseException as e:
+            self._fail(e, waiters)
+        finally:
+            con.close()
+
+    def _fail(self, exc: BaseException, waiters: List[threading.Event]) -> None:
+        """Mark the writer dead and wake everyone waiting on it (they raise WriterStopped)."""
+        self._failure = exc
+        self.last_error = f"writer: {exc!r}"
+        self._ready.set()
+        while True:  # flushes still in the queue would otherwise wait forever
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] is _FLUSH:
+                waiters.append(item[1])
+        for w in waiters:
+            w.set()
+
+    def _loop(self, con, waiters: List[threading.Event]) -> None:
+        pending: List[tuple] = []
+        deadline = None
+        stop = False
+        chore = None if self.housekeeping is None else time.perf_counter() + self.housekeeping_s
+        while not stop:
+            wake = min((t for t in (deadline, chore) if t is not None), default=None)
+            timeout = None if wake is None else max(0.0, wake - time.perf_counter())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                if item[0] is _STOP:
+                    stop = True
+                elif item[0] is _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    pending.append(item)
+                    if deadline is None:
+                        deadline = time.perf_counter() + self.max_delay_s
+                    # drain whatever is already queued without waiting, up to a batch
+                    while len(pending) < self.max_batch:
+                        try:
+                            nxt = self._q.get_nowait()
+                        except queue.Empty:
+                            break
+                        if nxt[0] is _FLUSH:
+                            waiters.append(nxt[1])
+                        elif nxt[0] is _STOP:
+                            stop = True
+                            break
+                        else:
+                            pending.append(nxt)
+            due = (len(pending) >= self.max_batch or waiters or stop
+                   or (deadline is not None and time.perf_counter() >= deadline))
+            if due:
+                if pending:
+                    self._commit(con, pending)
+                pending, deadline = [], None
+                for w in waiters:
+                    w.set()
+                waiters.clear()
+            if chore is not None and not pending and not stop and time.perf_counter() >= chore:
+                self._housekeep(con)
+                chore = time.perf_counter() + self.housekeeping_s
+
+    def _housekeep(self, con) -> None:
+        try:
+            self.housekeeping(con)
+        except Exception as e:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            self.last_error = f"housekeeping: {e!r}"
+
+    def _commit(self, con, rows: List[tuple]) -> None:
+        t0 = time.perf_counter()
+        groups: Dict[Tuple, List[tuple]] = {}
+        for table, cols, values, conflict in rows:
+            groups.setdefault((table, cols, conflict), []).append(values)
+        written, errors = 0, 0
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            for key, values in groups.items():
+                _write(con, *key, values)
+            con.execute("COMMIT")
+            written = len(rows)
+        except (sqlite3.Error, ValueError):
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            # isolate the bad row(s): one transaction per row for this batch only
+            for table, cols, values, conflict in rows:
+                try:
+                    con.execute("BEGIN IMMEDIATE")
+                    _write(con, table, cols, conflict, [values])
+                    con.execute("COMMIT")
+                    written += 1
+                except (sqlite3.Error, ValueError) as e:  # ValueError: unparseable sensor_readings ts
+                    if con.in_transaction:
+                        con.execute("ROLLBACK")
+                    errors += 1
+                    self.last_error = f"{table}: {e}"
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self._flush_hist.record(ms)
+            self.counters["written"] += written
+            self.counters["errors"] += errors
+            self.counters["batches"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+            flush = self._flush_hist.summary()
+        elapsed = max(1e-9, time.perf_counter() - self._started)
+        c.update(depth=self.depth, rows_per_s=round(c["written"] / elapsed, 1),
+                 rows_per_batch=round(c["written"] / c["batches"], 1) if c["batches"] else 0.0,
+                 flush_p50_ms=flush["p50"], flush_p99_ms=flush["p99"], flush_max_ms=flush["max"])
+        return c
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"[db-ingest] written={s['written']} errors={s['errors']} depth={s['depth']} "
+                f"max_depth={s['max_depth']} rows/s={s['rows_per_s']:.0f} rows/batch={s['rows_per_batch']:.0f} "
+                f"flush p50={s['flush_p50_ms']:.2f}ms p99={s['flush_p99_ms']:.2f}ms")
+
+
+def _sql(table: str, cols: Tuple[str, ...], conflict: Optional[str]) -> str:
+    verb = f"INSERT OR {conflict}" if conflict else "INSERT"
+    return f"{verb} INTO {table}({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+
+
+def _write(con, table: str, cols: Tuple[str, ...], conflict: Optional[str], values: List[tuple]) -> None:
+    from core import partitions
+    if table == partitions.VIEW and set(cols) <= set(partitions.COLUMNS) and partitions.installed(con):
+        partitions.insert_readings(con, [dict(zip(cols, v)) for v in values], conflict)
+    else:
+        con.executemany(_sql(table, cols, conflict), values)
+
+
+def _connect_path(path):
+    con = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("PRAGMA synchronous=NORMAL;")
+    con.execute("PRAGMA recursive_triggers=ON;")
+    con.row_factory = sqlite3.Row
+    return con
+
+
+_writers: Dict[str, IngestWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def _options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    bound = inspect.signature(IngestWriter).bind(**kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def get_writer(**kwargs) -> IngestWriter:
+    """The process-wide writer for the current core.db.DB_PATH (started on first use with `kwargs`).
+
+    Later calls may omit kwargs; ones that contradict the running writer raise ValueError.
+    """
+    from core import db
+    key = str(db.DB_PATH)
+    with _writers_lock:
+        w = _writers.get(key)
+        if w is None or not w.alive:
+            w = _writers[key] = IngestWriter(**kwargs)
+            w.options = _options(kwargs)
+        elif kwargs:
+            conflict = {k: v for k, v in kwargs.items() if _options(kwargs)[k] != w.options.get(k)}
+            if conflict:
+                raise ValueError(f"ingest writer for {key} already running with "
+                                 f"{ {k: w.options.get(k) for k in conflict} }, not {conflict}")
+        return w
+
+
+@atexit.register
+def close_all() -> None:
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for w in writers:
+        w.close()
@@ -0,0 +1,318 @@
+"""Time-partitioned sensor_readings: one table per day (or week) behind a UNION ALL view.
+
+Each partition `sensor_readings_pYYYYMMDD` holds ts in [start, end) and is listed
+in `sensor_partitions`. `sensor_readings` itself is a view over all of them, with
+an INSTEAD OF INSERT trigger routing each row by ts into the ROUTED newest
+partitions, so existing readers and `INSERT [OR ...] INTO sensor_readings`
+writers keep working. Anything else lands in `sensor_readings_default` (still
+visible through the view) until maintain() moves it into its partition.
+
+- insert_readings() routes rows in Python and creates partitions on demand
+  (one executemany per partition instead of a trigger per row); the ingest
+  writer (core.ingest) sends its sensor_readings batches through it;
+- range_sql() unions only the partitions overlapping [start, end);
+- expire() drops whole partitions older than the retention window: a DROP
+  TABLE frees the pages with no per-row delete or index maintenance;
+- maintain() pre-creates the next partitions and drains the default (the gateway
+  bridge's ingest writer runs it every minute, see core.db.housekeeping); it only expires data
+  when given keep_days or EDGEKIT_SENSOR_KEEP_DAYS is set.
+
+At most MAX_PARTITIONS exist at once; past that, days without a partition go
+to the default partition (with a warning) rather than failing the write.
+
+    python -m core.partitions maintain --keep-days 30
+"""
+from __future__ import annotations
+import argparse, datetime as dt, os, sqlite3, sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+VIEW = "sensor_readings"
+DEFAULT = "sensor_readings_default"
+CATALOG = "sensor_partitions"
+COLUMNS = ("ts", "device_id", "sensor_id", "metric", "value", "unit", "quality", "raw_json")
+PERIODS = {"day": 1, "week": 7}
+PERIOD = os.getenv("EDGEKIT_SENSOR_PARTITION", "day")
+ROUTED = 4           # newest partitions the view's INSERT trigger routes to; older rows wait in the default
+MAX_PARTITIONS = 400  # SQLite caps a compound SELECT at 500 terms; use weekly partitions for long retention
+KEEP_DAYS = int(os.getenv("EDGEKIT_SENSOR_KEEP_DAYS", "0"))  # retention is opt-in: 0 keeps everything
+
+
+def _create_table(con, name: str) -> None:
+    # same layout as the pre-partitioning core/schema.sql table; the ts-leading PK serves range scans
+    con.execute(f"CREATE TABLE IF NOT EXISTS {name} (ts TEXT, device_id TEXT, sensor_id TEXT, metric TEXT, value REAL, "
+                f"unit TEXT, quality TEXT, raw_json TEXT, PRIMARY KEY (ts, device_id, sensor_id, metric))")
+    con.execute(f"CREATE INDEX IF NOT EXISTS {name}_dev ON {name}(device_id, sensor_id)")
+
+
+def period_start(ts: str, period: str = PERIOD) -> dt.date:
+    day = dt.date.fromisoformat(ts[:10])
+    return day - dt.timedelta(days=day.weekday()) if period == "week" else day
+
+
+def partition_name(start: dt.date) -> str:
+    return f"sensor_readings_p{start:%Y%m%d}"
+
+
+def _kind(con, name: str) -> Optional[str]:
+    row = con.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def partitions(con) -> List[Tuple[str, str, str]]:
+    """(name, start, end) of every partition, oldest first (the default partition excluded)."""
+    if _kind(con, CATALOG) is None:
+        return []
+    return [tuple(r) for r in con.execute(f'SELECT name, start, "end" FROM {CATALOG} WHERE name != ? ORDER BY start',
+                                          (DEFAULT,))]
+
+
+def _period(con, period: Optional[str]) -> str:
+    row = con.execute(f"SELECT period FROM {CATALOG} ORDER BY start DESC LIMIT 1").fetchone()  # DEFAULT sorts last
+    return row[0] if row else (period or PERIOD)
+
+
+def _rebuild_view(con) -> None:
+    """Recreate the union view and its routing trigger from the catalog (inside the caller's transaction)."""
+    parts = partitions(con)
+    if len(parts) + 1 > MAX_PARTITIONS:  # ensure() never creates past the cap
+        raise ValueError(f"{len(parts)} partitions exceed MAX_PARTITIONS={MAX_PARTITIONS}")
+    cols = ", ".join(COLUMNS)
+    new = ", ".join(f"NEW.{c}" for c in COLUMNS)
+    arms = [f"SELECT {cols} FROM {t}" for t in [DEFAULT] + [p[0] for p in parts]]
+    # the trigger runs one statement per routed partition for every row, so only the newest
+    # (where live traffic lands) are routed; backfills go through insert_readings()
+    hot = parts[-ROUTED:]
+    routes = "".join(f"INSERT INTO {name}({cols}) SELECT {new} WHERE NEW.ts >= '{start}' AND NEW.ts < '{end}';\n"
+                     for name, start, end in reversed(hot))
+    covered = " OR ".join(f"(NEW.ts >= '{start}' AND NEW.ts < '{end}')" for _, start, end in hot) or "0"
+    con.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    con.execute(f"CREATE VIEW {VIEW} AS {' UNION ALL '.join(arms)}")
+    con.execute(f"CREATE TRIGGER {VIEW}_route INSTEAD OF INSERT ON {VIEW} BEGIN\n{routes}"
+                f"INSERT INTO {DEFAULT}({cols}) SELECT {new} WHERE NOT COALESCE({covered}, 0);\nEND")
+
+
+def _create(con, start: dt.date, period: str) -> str:
+    name = partition_name(start)
+    end = start + dt.timedelta(days=PERIODS[period])
+    _create_table(con, name)
+    con.execute(f'INSERT INTO {CATALOG}(name, start, "end", period) VALUES (?, ?, ?, ?)',
+                (name, start.isoformat(), end.isoformat(), period))
+    return name
+
+
+def _begin(con) -> bool:
+    if con.in_transaction:
+        return False
+    con.execute("BEGIN IMMEDIATE")
+    return True
+
+
+def _end(con, owned: bool, ok: bool) -> None:
+    if owned:
+        con.execute("COMMIT" if ok else "ROLLBACK")
+
+
+def _capped(starts: List[dt.date], have: int) -> List[dt.date]:
+    # the newest `starts` that still fit under MAX_PARTITIONS (with the default); the rest stay in the default
+    room = max(0, MAX_PARTITIONS - 1 - have)
+    if len(starts) > room:
+        print(f"[partitions] MAX_PARTITIONS={MAX_PARTITIONS} reached; {len(starts) - room} period(s) from "
+              f"{starts[0]} go to {DEFAULT}: shorten retention or use weekly partitions", file=sys.stderr)
+        starts = starts[len(starts) - room:] if room else []
+    return starts
+
+
+def ensure(con, starts: Iterable[dt.date], period: Optional[str] = None) -> List[str]:
+    """Create the partitions beginning at `starts` that do not exist yet (as many as
+    MAX_PARTITIONS allows, newest first); returns the new names."""
+    owned = _begin(con)
+    try:
+        period = _period(con, period)
+        have = {p[0] for p in partitions(con)}
+        missing = [s for s in sorted(set(starts)) if partition_name(s) not in have]
+        created = [_create(con, s, period) for s in _capped(missing, len(have))]
+        if created:
+            _rebuild_view(con)
+    except BaseException:
+        _end(con, owned, False)
+        raise
+    _end(con, owned, True)
+    return created
+
+
+def installed(con) -> bool:
+    return _kind(con, VIEW) == "view" and _kind(con, CATALOG) == "table"
+
+
+def install(con, period: Optional[str] = None, ahead: int = 2, now: Optional[dt.datetime] = None) -> bool:
+    """Set up the catalog, default partition and view, converting a plain sensor_readings table,
+    with the current and `ahead` upcoming partitions ready for live rows.
+
+    Returns False (and changes nothing) when an existing sensor_readings table has
+    columns outside COLUMNS, e.g. the older id/sensor_type layout.
+    """
+    if installed(con):
+        return True
+    kind = _kind(con, VIEW)
+    if kind == "table":
+        extra = {r[1] for r in con.execute(f"PRAGMA table_info({VIEW})")} - set(COLUMNS)
+        if extra:
+            return False
+    owned = _begin(con)
+    try:
+        con.execute(f'CREATE TABLE IF NOT EXISTS {CATALOG} (name TEXT PRIMARY KEY, start TEXT NOT NULL, '
+                    f'"end" TEXT NOT NULL, period TEXT NOT NULL)')
+        _create_table(con, DEFAULT)
+        con.execute(f'INSERT OR IGNORE INTO {CATALOG}(name, start, "end", period) VALUES (?, ?, ?, ?)',
+                    (DEFAULT, "", "", period or PERIOD))  # remembers the width before the first partition exists
+        if kind == "table":
+            # copy, then drop: a RENAME would rewrite views that read sensor_readings to the old table
+            period = _period(con, period)
+            days = [r[0] for r in con.execute(f"SELECT DISTINCT substr(ts, 1, 10) FROM {VIEW} WHERE ts IS NOT NULL")]
+            for start in _capped(sorted({period_start(d, period) for d in days}), 0):
+                _create(con, start, period)
+            cols = ", ".join(COLUMNS)
+            have = {r[1] for r in con.execute(f"PRAGMA table_info({VIEW})")}
+            src = ", ".join(c if c in have else "NULL" for c in COLUMNS)
+            parts = partitions(con)
+            for name, start, end in parts:
+                con.execute(f"INSERT INTO {name}({cols}) SELECT {src} FROM {VIEW} WHERE ts >= ? AND ts < ?", (start, end))
+            con.execute(f"INSERT INTO {DEFAULT}({cols}) SELECT {src} FROM {VIEW} WHERE ts IS NULL OR ts < ?",
+                        (parts[0][1] if parts else "\uffff",))
+            con.execute(f"DROP TABLE {VIEW}")
+        _rebuild_view(con)
+        ensure(con, _upcoming(con, ahead, now))
+    except BaseException:
+        _end(con, owned, False)
+        raise
+    _end(con, owned, True)
+    return True
+
+
+def insert_readings(con, rows: Sequence[Dict[str, Any]], on_conflict: Optional[str] = None) -> int:
+    """Insert reading dicts straight into their partitions (created as needed) in one transaction."""
+    if not rows:
+        return 0
+    owned = _begin(con)
+    try:
+        period = _period(con, None)
+        by_part: Dict[Optional[dt.date], list] = {}
+        for r in rows:
+            key = period_start(r["ts"], period) if r.get("ts") else None
+            by_part.setdefault(key, []).append(tuple(r.get(c) for c in COLUMNS))
+        ensure(con, [k for k in by_part if k is not None], period)
+        have = {p[0] for p in partitions(con)}
+        verb = f"INSERT OR {on_conflict}" if on_conflict else "INSERT"
+        sql = f"{verb} INTO {{}}({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        for key, values in by_part.items():
+            name = partition_name(key) if key else DEFAULT
+            con.executemany(sql.format(name if name in have else DEFAULT), values)
+    except BaseException:
+        _end(con, owned, False)
+        raise
+    _end(con, owned, True)
+    return len(rows)
+
+
+def range_sql(con, start: Optional[str] = None, end: Optional[str] = None,
+              columns: Sequence[str] = COLUMNS) -> Tuple[str, list]:
+    """A UNION ALL over only the partitions overlapping [start, end), with the ts bounds applied.
+
+    Use it as a subquery: f"SELECT device_id, AVG(value) FROM ({sql}) GROUP BY 1".
+    """
+    cond, bound = [], []
+    if start:
+        cond.append("ts >= ?"); bound.append(start)
+    if end:
+        cond.append("ts < ?"); bound.append(end)
+    where = f" WHERE {' AND '.join(cond)}" if cond else ""
+    names = [DEFAULT] + [name for name, p_start, p_end in partitions(con)
+                         if (not end or p_start < end) and (not start or p_end > start[:10])]
+    cols = ", ".join(columns)
+    return " UNION ALL ".join(f"SELECT {cols} FROM {n}{where}" for n in names), bound * len(names)
+
+
+def expire(con, keep_days: int, now: Optional[dt.datetime] = None) -> List[str]:
+    """Drop every partition that ends before now - keep_days (nothing for keep_days <= 0); returns the dropped names."""
+    if keep_days <= 0:
+        return []
+    cutoff = ((now or dt.datetime.now(dt.timezone.utc)).date() - dt.timedelta(days=keep_days)).isoformat()
+    owned = _begin(con)
+    try:
+        old = [name for name, _, end in partitions(con) if end <= cutoff]
+        if old:
+            con.execute(f"DELETE FROM {CATALOG} WHERE name IN ({', '.join('?' * len(old))})", old)
+            _rebuild_view(con)
+            for name in old:
+                con.execute(f"DROP TABLE {name}")
+        con.execute(f"DELETE FROM {DEFAULT} WHERE ts < ?", (cutoff,))  # stray rows only, normally empty
+    except BaseException:
+        _end(con, owned, False)
+        raise
+    _end(con, owned, True)
+    return old
+
+
+def _upcoming(con, ahead: int, now: Optional[dt.datetime]) -> List[dt.date]:
+    period = _period(con, None)
+    first = period_start((now or dt.datetime.now(dt.timezone.utc)).date().isoformat(), period)
+    return [first + i * dt.timedelta(days=PERIODS[period]) for i in range(ahead + 1)]
+
+
+def maintain(con, keep_days: Optional[int] = None, ahead: int = 2, now: Optional[dt.datetime] = None) -> Dict[str, Any]:
+    """Retention, pre-created upcoming partitions and draining of the default partition.
+
+    `keep_days` defaults to KEEP_DAYS (0: nothing expires). Expiry runs first, so the
+    slots it frees are available to the partitions created next.
+    """
+    now = now or dt.datetime.now(dt.timezone.utc)
+    owned = _begin(con)
+    try:
+        dropped = expire(con, KEEP_DAYS if keep_days is None else keep_days, now)
+        period = _period(con, None)
+        created = ensure(con, _upcoming(con, ahead, now), period)
+        cols = ", ".join(COLUMNS)
+        stray = {period_start(r[0], period) for r in
+                 con.execute(f"SELECT DISTINCT substr(ts, 1, 10) FROM {DEFAULT} WHERE ts IS NOT NULL")}
+        created += [p for p in ensure(con, stray, period) if p not in created]
+        moved = 0
+        for name, start, end in partitions(con):  # rows past MAX_PARTITIONS have none and stay put
+            if dt.date.fromisoformat(start) in stray:
+                moved += con.execute(f"INSERT OR REPLACE INTO {name}({cols}) SELECT {cols} FROM {DEFAULT} "
+                                     f"WHERE ts >= ? AND ts < ?", (start, end)).rowcount
+                con.execute(f"DELETE FROM {DEFAULT} WHERE ts >= ? AND ts < ?", (start, end))
+    except BaseException:
+        _end(con, owned, False)
+        raise
+    _end(con, owned, True)
+    return {"created": created, "moved": moved, "dropped": dropped, "partitions": len(partitions(con))}
+
+
+def main(argv=None):
+    import core.db
+    ap = argparse.ArgumentParser(description="sensor_readings partition maintenance")
+    ap.add_argument("action", choices=["install", "maintain", "list"])
+    ap.add_argument("--db", default=None, help="Database file (default: core.db.DB_PATH)")
+    ap.add_argument("--keep-days", type=int, default=KEEP_DAYS,
+                    help=f"Drop partitions older than this many days (default {KEEP_DAYS}; 0 keeps everything)")
+    ap.add_argument("--ahead", type=int, default=2, help="Upcoming partitions to pre-create")
+    ap.add_argument("--period", choices=list(PERIODS), default=None, help="Partition width for a new catalog")
+    args = ap.parse_args(argv)
+    con = sqlite3.connect(args.db or core.db.DB_PATH, isolation_level=None)
+    try:
+        if not install(con, args.period):
+            print(f"[partitions] {VIEW} has columns outside {COLUMNS}; left as is", file=sys.stderr)
+            return 1
+        if args.action == "maintain":
+            print(f"[partitions] {maintain(con, args.keep_days, args.ahead)}")
+        elif args.action == "list":
+            for name, start, end in partitions(con):
+                n = con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+                print(f"{name}  [{start}, {end})  {n} rows")
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,333 @@
+"""Minute/hour/day rollups of inspections, keyed by station, shift and model version.
+
+Triggers on `inspections` upsert the row's minute bucket as rows arrive (and
+subtract on delete/update), so yield trends read a few hundred pre-aggregated
+rows instead of GROUP BY date(ts) over the whole table, which no index can
+serve. Queries go to the coarsest tier whose buckets line up with the requested
+range and resolution.
+
+Only the minute tier is maintained per row. The hour and day tiers are folded
+up from it by fold() for every bucket before a watermark, the start of the
+newest hour seen. The gateway bridge's ingest writer folds every minute (see
+core.db.housekeeping); elsewhere schedule `python -m core.rollups fold`. Writes
+that land before the watermark (late or corrected rows) still update those
+tiers directly. Queries read the coarse tier up to the watermark and the minute
+tier after it, so results are exact however long ago fold() last ran.
+
+Buckets are ts prefixes with 'T' normalised to ' ': 'YYYY-MM-DD' (day),
+'YYYY-MM-DD HH' (hour), 'YYYY-MM-DD HH:MM' (minute). Missing station/shift/
+model_ver (or columns absent from older schemas) roll up under ''.
+
+INSERT OR REPLACE only fires the delete trigger with PRAGMA recursive_triggers=ON
+(core.db.connect sets it); other writers can be reconciled with a backfill:
+
+    python -m core.rollups backfill [--since 2025-09-01]
+    python -m core.rollups fold
+    python -m core.rollups export --resolution hour --since 2025-09-20 --out yield.csv
+"""
+from __future__ import annotations
+import argparse, csv, sqlite3, sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# coarse -> fine: (tier, bucket prefix length)
+TIERS = (("day", 10), ("hour", 13), ("minute", 16))
+TIER_LEN = dict(TIERS)
+DIMENSIONS = ("station", "shift", "model_ver")
+WATCHED = ("ts", "result", "score") + DIMENSIONS
+LIVE = TIERS[-1][0]
+FOLDED = "inspection_rollup_folded"  # one row: `until`, the minute bucket the coarse tiers are exact before
+
+
+def table(tier: str) -> str:
+    return f"inspection_rollup_{tier}"
+
+
+SCHEMA = "".join(f"""
+CREATE TABLE IF NOT EXISTS {table(tier)} (
+  bucket TEXT NOT NULL,
+  station TEXT NOT NULL,
+  shift TEXT NOT NULL,
+  model_ver TEXT NOT NULL,
+  n INTEGER NOT NULL,
+  pass_cnt INTEGER NOT NULL,
+  fail_cnt INTEGER NOT NULL,
+  score_sum REAL NOT NULL,
+  PRIMARY KEY (bucket, station, shift, model_ver)
+) WITHOUT ROWID;
+""" for tier, _ in TIERS) + f"""
+CREATE TABLE IF NOT EXISTS {FOLDED} (
+  id INTEGER PRIMARY KEY CHECK (id = 0),
+  until TEXT NOT NULL
+);
+"""
+
+
+def _bucket(ts: str, length: int) -> str:
+    return f"COALESCE(replace(substr({ts}, 1, {length}), 'T', ' '), '')"
+
+
+def _exprs(cols: set, r: str) -> Dict[str, str]:
+    """Column expressions for NEW/OLD (r) or a plain table scan (r='')."""
+    ref = (lambda c: f"{r}.{c}") if r else (lambda c: c)
+    out = {d: f"COALESCE({ref(d)}, '')" if d in cols else "''" for d in DIMENSIONS}
+    out["ts"] = ref("ts")
+    out["pass"] = f"COALESCE({ref('result')} = 'PASS', 0)"
+    out["fail"] = f"COALESCE({ref('result')} = 'FAIL', 0)"
+    out["score"] = f"COALESCE({ref('score')}, 0)" if "score" in cols else "0"
+    return out
+
+
+def _upsert(cols: set, r: str, sign: str, tiers=TIERS) -> str:
+    # the coarse tiers only take buckets fold() has already passed
+    e = _exprs(cols, r)
+    return "".join(
+        f"INSERT INTO {table(tier)}(bucket, station, shift, model_ver, n, pass_cnt, fail_cnt, score_sum) "
+        f"SELECT {_bucket(e['ts'], length)}, {e['station']}, {e['shift']}, {e['model_ver']}, "
+        f"{sign}1, {sign}{e['pass']}, {sign}{e['fail']}, {sign}{e['score']} "
+        + ("WHERE 1 " if tier == LIVE else
+           f"WHERE {_bucket(e['ts'], length)} < (SELECT substr(until, 1, {length}) FROM {FOLDED}) ")
+        + "ON CONFLICT(bucket, station, shift, model_ver) DO UPDATE SET n = n + excluded.n, "
+        f"pass_cnt = pass_cnt + excluded.pass_cnt, fail_cnt = fail_cnt + excluded.fail_cnt, "
+        f"score_sum = score_sum + excluded.score_sum;\n"
+        for tier, length in tiers)
+
+
+def trigger_sql(cols: set) -> str:
+    watched = ", ".join(c for c in WATCHED if c in cols)
+    # live inserts pay for one upsert; only late ones (behind the watermark) touch hour/day
+    late = f"{_bucket('NEW.ts', TIER_LEN['hour'])} < (SELECT substr(until, 1, {TIER_LEN['hour']}) FROM {FOLDED})"
+    return (f"CREATE TRIGGER IF NOT EXISTS inspection_rollup_ins AFTER INSERT ON inspections BEGIN\n"
+            f"{_upsert(cols, 'NEW', '', TIERS[-1:])}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS inspection_rollup_ins_late AFTER INSERT ON inspections WHEN {late} BEGIN\n"
+            f"{_upsert(cols, 'NEW', '', TIERS[:-1])}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS inspection_rollup_del AFTER DELETE ON inspections BEGIN\n"
+            f"{_upsert(cols, 'OLD', '-')}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS inspection_rollup_upd AFTER UPDATE OF {watched} ON inspections BEGIN\n"
+            f"{_upsert(cols, 'OLD', '-')}{_upsert(cols, 'NEW', '')}END;\n")
+
+
+def _columns(con) -> set:
+    return {r[1] for r in con.execute("PRAGMA table_info(inspections)")}
+
+
+def installed(con) -> bool:
+    return con.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE (type='trigger' AND name='inspection_rollup_ins') "
+                       f"OR (type='table' AND name='{FOLDED}')").fetchone()[0] == 2
+
+
+def install(con) -> bool:
+    """Create the rollup tables and triggers, backfilling the first time; False without an inspections table."""
+    cols = _columns(con)
+    if not {"ts", "result"} <= cols:
+        return False
+    if installed(con):
+        return True
+    con.executescript(SCHEMA)
+    # replaces the triggers of the older every-tier-per-row layout, if present
+    drop = "".join(f"DROP TRIGGER IF EXISTS inspection_rollup_{op};\n" for op in ("ins", "ins_late", "del", "upd"))
+    con.executescript(f"BEGIN IMMEDIATE;\n{drop}{trigger_sql(cols)}COMMIT;")
+    backfill(con)
+    return True
+
+
+def watermark(con) -> str:
+    """Minute bucket before which the hour/day tiers are complete ('' before the first fold)."""
+    row = con.execute(f"SELECT until FROM {FOLDED}").fetchone()
+    return row[0] if row else ""
+
+
+def _refold(con, lo: str, hi: str) -> None:
+    # rebuild the coarse tiers' buckets in [lo, hi) from the minute tier
+    for tier, length in TIERS[:-1]:
+        con.execute(f"DELETE FROM {table(tier)} WHERE bucket >= ? AND bucket < ?", (lo[:length], hi[:length]))
+        con.execute(f"INSERT INTO {table(tier)}(bucket, station, shift, model_ver, n, pass_cnt, fail_cnt, score_sum) "
+                    f"SELECT substr(bucket, 1, {length}), station, shift, model_ver, SUM(n), SUM(pass_cnt), "
+                    f"SUM(fail_cnt), SUM(score_sum) FROM {table(LIVE)} WHERE bucket >= ? AND bucket < ? "
+                    f"GROUP BY 1, 2, 3, 4", (lo[:length], hi[:length]))
+    con.execute(f"INSERT INTO {FOLDED}(id, until) VALUES (0, ?) ON CONFLICT(id) DO UPDATE SET until = excluded.until",
+                (hi,))
+
+
+def _newest_hour(con) -> str:
+    newest = con.execute(f"SELECT MAX(bucket) FROM {table(LIVE)}").fetchone()[0]
+    return f"{newest[:13]}:00" if newest else ""
+
+
+def fold(con, until: Optional[str] = None) -> str:
+    """Roll the minute tier up into hour/day up to `until` (default: the newest hour seen,
+    which is still filling); returns the watermark. Cheap when nothing new has completed."""
+    con.executescript(SCHEMA)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        lo = watermark(con)
+        hi = _norm(until)[:16] if until else _newest_hour(con)
+        if hi > lo:
+            _refold(con, lo, hi)
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return max(lo, hi)
+
+
+def backfill(con, since: Optional[str] = None) -> Dict[str, int]:
+    """Rebuild every tier from inspections, whole days from `since` on (all of them by default).
+
+    Runs under BEGIN IMMEDIATE, so inserts arriving meanwhile wait and are then
+    counted by the triggers exactly once. Returns rows per tier afterwards.
+    """
+    con.executescript(SCHEMA)
+    e = _exprs(_columns(con), "")
+    day = since.replace("T", " ")[:10] if since else ""
+    length = TIER_LEN[LIVE]
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute(f"DELETE FROM {table(LIVE)} WHERE bucket >= ?", (day,))
+        con.execute(f"INSERT INTO {table(LIVE)}(bucket, station, shift, model_ver, n, pass_cnt, fail_cnt, score_sum) "
+                    f"SELECT {_bucket(e['ts'], length)}, {e['station']}, {e['shift']}, {e['model_ver']}, "
+                    f"COUNT(*), SUM({e['pass']}), SUM({e['fail']}), SUM({e['score']}) FROM inspections"
+                    + (" WHERE ts >= ?" if day else "") + " GROUP BY 1, 2, 3, 4", (day,) if day else ())
+        # also covers anything between the old watermark and `since` that was never folded
+        _refold(con, min(day, watermark(con)), _newest_hour(con))
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return {tier: con.execute(f"SELECT COUNT(*) FROM {table(tier)}").fetchone()[0] for tier, _ in TIERS}
+
+
+def _norm(ts: Optional[str]) -> Optional[str]:
+    return ts.replace("T", " ") if ts else None
+
+
+def _aligned(bound: Optional[str], length: int) -> bool:
+    return bound is None or set(bound[length:]) <= set("0: .")
+
+
+def pick_tier(start: Optional[str] = None, end: Optional[str] = None, resolution: str = "day") -> str:
+    """Coarsest tier no coarser than `resolution` whose buckets start and end the range exactly.
+
+    When no tier lines up (a bound inside a minute) the minute tier is used and the
+    bound rounds down to its minute.
+    """
+    start, end = _norm(start), _norm(end)
+    for tier, length in TIERS:
+        if length >= TIER_LEN[resolution] and _aligned(start, length) and _aligned(end, length):
+            return tier
+    return TIERS[-1][0]
+
+
+def _source(con, tier: str) -> Tuple[str, List[str]]:
+    # a coarse tier is only complete before the watermark; the rest comes from the minute tier
+    if tier == LIVE:
+        return table(tier), []
+    length = TIER_LEN[tier]
+    cut = watermark(con)[:length]
+    return (f"(SELECT bucket, station, shift, model_ver, n, pass_cnt, fail_cnt, score_sum FROM {table(tier)} "
+            f"WHERE bucket < ? UNION ALL SELECT substr(bucket, 1, {length}), station, shift, model_ver, n, "
+            f"pass_cnt, fail_cnt, score_sum FROM {table(LIVE)} WHERE bucket >= ?)"), [cut, cut]
+
+
+def yield_series(con, start: Optional[str] = None, end: Optional[str] = None, resolution: str = "day",
+                 by: Sequence[str] = (), latest: Optional[int] = None,
+                 **filters: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    """Pass/fail counts per `resolution` bucket in [start, end), optionally split by dimensions.
+
+    `filters` map a dimension to the values to keep (station=["ST01"]); `latest`
+    keeps only the newest N buckets. Rows come back oldest first with
+    bucket, *by, n, pass_cnt, fail_cnt, yield_pct and mean_score.
+    """
+    if resolution not in TIER_LEN:
+        raise ValueError(f"Unknown resolution: {resolution} (expected one of {tuple(TIER_LEN)})")
+    for dim in (*by, *filters):
+        if dim not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dim} (expected one of {DIMENSIONS})")
+    tier = pick_tier(start, end, resolution)
+    length = TIER_LEN[tier]
+    where, params = ["n != 0"], []
+    if start:
+        where.append("bucket >= ?"); params.append(_norm(start)[:length])
+    if end:
+        where.append("bucket < ?"); params.append(_norm(end)[:length])
+    for dim, values in filters.items():
+        if values:
+            where.append(f"{dim} IN ({', '.join('?' * len(values))})"); params.extend(values)
+    # at the tier's own resolution `bucket` is the primary key prefix, so "newest N" walks the index
+    col = "bucket" if tier == resolution else f"substr(bucket, 1, {TIER_LEN[resolution]})"
+    cond = " AND ".join(where)
+    src, src_params = _source(con, tier)
+    if latest:
+        cond += (f" AND {col} >= (SELECT MIN(b) FROM (SELECT DISTINCT {col} AS b FROM {src} "
+                 f"WHERE {cond} ORDER BY 1 DESC LIMIT {int(latest)}))")
+        params = params + src_params + params
+    params = src_params + params
+    keys = ", ".join(("b",) + tuple(by))
+    sql = (f"SELECT {col} AS b{''.join(', ' + d for d in by)}, SUM(n), SUM(pass_cnt), SUM(fail_cnt), "
+           f"SUM(score_sum) FROM {src} WHERE {cond} GROUP BY {keys}")
+    rows = []
+    for r in con.execute(sql + f" ORDER BY {keys}", params):
+        n, passed, failed, score = r[-4:]
+        row = dict(zip(("bucket",) + tuple(by), r[:-4]))
+        row.update(n=n, pass_cnt=passed, fail_cnt=failed,
+                   yield_pct=passed / max(passed + failed, 1) * 100.0, mean_score=score / n if n else None)
+        rows.append(row)
+    return rows
+
+
+def dimension_values(con, dim: str) -> List[str]:
+    """Distinct values of a dimension (from the day tier, the smallest, plus the unfolded minutes)."""
+    if dim not in DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {dim} (expected one of {DIMENSIONS})")
+    src, params = _source(con, "day")
+    return [r[0] for r in con.execute(f"SELECT DISTINCT {dim} FROM {src} WHERE n != 0 ORDER BY 1", params)]
+
+
+def export_csv(con, out, **query) -> int:
+    """Write yield_series(con, **query) to a CSV file or stream; returns the row count."""
+    rows = yield_series(con, **query)
+    fields = list(rows[0]) if rows else ["bucket", "n", "pass_cnt", "fail_cnt", "yield_pct", "mean_score"]
+    fh = open(out, "w", newline="", encoding="utf-8") if isinstance(out, str) else out
+    try:
+        w = csv.DictWriter(fh, fieldnames=fields)
+        w.writeheader()
+        w.writerows(rows)
+    finally:
+        if fh is not out:
+            fh.close()
+    return len(rows)
+
+
+def main(argv=None):
+    import core.db
+    ap = argparse.ArgumentParser(description="Inspection rollup maintenance and export")
+    ap.add_argument("action", choices=["backfill", "fold", "export"])
+    ap.add_argument("--db", default=None, help="Database file (default: core.db.DB_PATH)")
+    ap.add_argument("--since", default=None, help="Backfill/export from this timestamp or date")
+    ap.add_argument("--until", default=None, help="Export up to (not including) this timestamp or date")
+    ap.add_argument("--resolution", choices=list(TIER_LEN), default="day")
+    ap.add_argument("--by", default="", help="Comma-separated dimensions to split by (station,shift,model_ver)")
+    ap.add_argument("--out", default=None, help="CSV path (default: stdout)")
+    args = ap.parse_args(argv)
+    con = sqlite3.connect(args.db or core.db.DB_PATH, isolation_level=None)
+    con.execute("PRAGMA recursive_triggers=ON;")
+    try:
+        if not install(con):
+            print("[rollups] no inspections table", file=sys.stderr)
+            return 1
+        if args.action == "backfill":
+            print(f"[rollups] backfilled: {backfill(con, args.since)}")
+        elif args.action == "fold":
+            print(f"[rollups] hour/day folded up to {fold(con, args.until) or '(nothing yet)'}")
+        else:
+            by = [d for d in args.by.split(",") if d]
+            n = export_csv(con, args.out or sys.stdout, start=args.since, end=args.until,
+                           resolution=args.resolution, by=by)
+            print(f"[rollups] {n} rows from the {pick_tier(args.since, args.until, args.resolution)} tier",
+                  file=sys.stderr)
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
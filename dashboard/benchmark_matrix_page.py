@@ -1,13 +1,32 @@
 import streamlit as st, pandas as pd
-from bench.benchmark_matrix import run_matrix
+from bench.benchmark_matrix import run_matrix, best_engine
 from orchestration.model_pack import persist_bench_result
 def render_benchmark_matrix():
     st.subheader("📊 Benchmark Matrix")
     sizes=st.multiselect("Input sizes",["320","480","640","960"], default=["640","960"])
     engines=st.multiselect("Engines",["onnxruntime","openvino","tensorrt"], default=["onnxruntime","tensorrt"])
     pack_dir=st.text_input("Persist into Model Pack", "model_packs/defect-detector/1.2.0")
+    device_id=st.text_input("Device (empty = all devices)", "")
+    model=st.text_input("Benchmark missing onnxruntime sizes with (model pack dir or .onnx, empty = DB only)", "")
+    deadline=st.number_input("p99 deadline (ms)", min_value=0.0, value=0.0, help="e.g. the PLC timeout; 0 = don't check")
     if st.button("Run Matrix"):
-        data=run_matrix(sizes, engines); df=pd.DataFrame(data); st.dataframe(df, width='stretch')
-        if st.checkbox("Save to pack"):
-            for r in data: persist_bench_result(pack_dir, r["engine"], r["size"], r["fps"], r["latency_ms"])
-            st.success("Saved.")
+        with st.spinner("Benchmarking on this device..." if model else "Loading benchmarks..."):
+            st.session_state["bench_matrix"]=run_matrix(sizes, engines, device_id=device_id or None, model=model or None)
+    if "bench_matrix" not in st.session_state:
+        return  # widgets rerun the page; the last matrix stays until Run Matrix is pressed again
+    data=st.session_state["bench_matrix"]
+    if not data:
+        st.info("No measurements for these sizes/engines yet. Give a model above or run `python bench/ort_benchmark.py <pack>`.")
+        return
+    df=pd.DataFrame(data); st.dataframe(df, width='stretch')
+    if deadline and device_id:
+        best=best_engine(device_id, metric="p99", deadline_ms=deadline)
+        if best: st.success(f"Best under p99 ≤ {deadline:.0f} ms: {best['engine']} @ {best['size']} "
+                            f"(threads {best['threads'] or 'auto'}, opt {best['graph_opt'] or '-'}; "
+                            f"p99 {best['p99_ms']:.1f} ms, {best['fps']:.1f} fps)")
+        else: st.warning(f"No engine/size on {device_id} meets p99 ≤ {deadline:.0f} ms.")
+    if st.checkbox("Save to pack"):
+        for r in data:
+            if r.get("batch") in (None, 1):  # the pack's numbers are per-frame latencies
+                persist_bench_result(pack_dir, r["engine"], r["size"], r["fps"], r["latency_ms"])
+        st.success("Saved.")
@@ -1,6 +1,8 @@
 import streamlit as st, yaml
 from pathlib import Path
 
+from multi_camera_support.multi_cam_streamer import latest_frames
+
 def render_multi_cam():
     st.title("📷 Multi-Cam Feeds")
     cfg = Path("config/cameras.yaml")
@@ -10,9 +12,14 @@ def render_multi_cam():
     if not cams:
         st.info("No cameras defined. Add them in `config/cameras.yaml`.")
         return
+    frames = latest_frames([c.get("id", "cam") for c in cams])
     cols = st.columns(3)
     for i, cam in enumerate(cams):
         with cols[i % 3].container(border=True):
             st.subheader(cam.get("id","cam"))
             st.code(cam.get("url",""))
-            st.write("Preview here (placeholder).")
+            if cam.get("id", "cam") in frames:
+                _, ts, frame = frames[cam.get("id", "cam")]
+                st.image(frame[:, :, ::-1], caption=f"grabbed {ts:.0f}")
+            else:
+                st.write("No grabber running (start multi_camera_support GrabberPool).")
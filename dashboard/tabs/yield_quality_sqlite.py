@@ -1,16 +1,27 @@
 import pandas as pd, streamlit as st
+from core import rollups
 from core.db import connect
 
+LATEST = {'day': 30, 'hour': 48, 'minute': 120}
+
 def render_yield_quality_sqlite():
     st.header('Yield & Quality', anchor=False)
     con = connect()
-    df = pd.read_sql_query("""SELECT date(ts) as day,
-             SUM(result='PASS') as pass_cnt,
-             SUM(result='FAIL') as fail_cnt
-      FROM inspections GROUP BY date(ts) ORDER BY day DESC LIMIT 30""", con)
-    if df.empty:
+    if not rollups.installed(con):  # read-only here: installing backfills under a write lock
+        st.info('Inspection rollups are not set up yet. Run `python -m src.cli rollup-backfill` '
+                '(or `core.db.migrate()`) once.')
+        return
+    with st.expander('Filters'):
+        resolution = st.radio('Resolution', list(LATEST), horizontal=True)
+        filters = {d: st.multiselect(d.replace('_', ' ').title(), rollups.dimension_values(con, d))
+                   for d in rollups.DIMENSIONS}
+    rows = rollups.yield_series(con, resolution=resolution, latest=LATEST[resolution], **filters)
+    if not rows:
         st.info('No inspection data yet.')
         return
-    df['yield_%'] = (df['pass_cnt'] / (df['pass_cnt'] + df['fail_cnt']).clip(lower=1))*100
-    st.line_chart(df.set_index('day')[['yield_%']])
-    st.dataframe(df, width='stretch')
+    raw = pd.DataFrame(rows)
+    df = raw.rename(columns={'bucket': resolution, 'yield_pct': 'yield_%'})
+    st.line_chart(df.set_index(resolution)[['yield_%']])
+    st.dataframe(df.iloc[::-1], width='stretch')
+    # same columns as rollups.export_csv, without querying again
+    st.download_button('Download CSV', raw.to_csv(index=False), file_name=f'yield_{resolution}.csv')
@@ -1,9 +1,28 @@
 #!/usr/bin/env python3
-import argparse, time, json, uuid, pathlib
+import argparse, time, uuid, pathlib, sys
 import numpy as np
 import cv2
 import paho.mqtt.client as mqtt
-import onnxruntime as ort
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from vision_runtime.stages import StagedPipeline, DROP_POLICIES, DROP_OLDEST
+from vision_runtime.batch_server import BatchClient, parse_address
+from src.preprocessing.letterbox import LetterboxPreprocessor
+from src.preprocessing.motion_detector import MotionGate
+from src.preprocessing.roi_cropper import ROIBatcher, load_rois
+from src.preprocessing.tiler import TileBatcher, run_chunked
+from vision_runtime.postprocess import decode_detections, split_outputs
+from vision_runtime.event_writer import EventFrameWriter, FORMATS, OVERLOAD_POLICIES
+from vision_runtime.det_publisher import DetectionPublisher, ENCODINGS, EMPTY_POLICIES
+from vision_runtime.latency import StageTimer
+from modules.runtime_autotuner.autotuner import LatencyAutotuner, DbDecisionLog
+from pipeline.pipeline_builder import postprocess_settings
+from ota.model_switcher import HotSwapModel
+from vision_runtime import session_cache
+from vision_runtime.session_cache import get_session
+from multi_camera_support.frame_ring import RingCapture
 
 MQTT_HOST, MQTT_PORT = "localhost", 1883
 TOPIC_DET = "factory/vision/detections"
@@ -19,78 +38,366 @@ def preprocess_bgr(img, size=(640,640)):
     return blob, scale
 
 def dummy_postprocess(outputs, scale, conf_th=0.5):
-    out = outputs[0] if isinstance(outputs, (list, tuple)) else outputs
-    dets = []
-    if out is None: return dets
-    out = np.array(out)
-    for row in out:
-        if row.shape[-1] < 6: continue
-        x,y,w,h,score,cls = row[:6]
-        if score < conf_th: continue
-        dets.append({
-            "cls": str(int(cls)),
-            "score": float(score),
-            "bbox": [float(x/scale), float(y/scale), float(w/scale), float(h/scale)]
-        })
-    return dets
+    # Row-order, no-NMS decode kept for callers of the original helper
+    return decode_detections(outputs, scale, conf_th=conf_th, nms_enabled=False, topk=None)
+
+def make_postprocess(args, post=None):
+    post = post or postprocess_settings(path=args.recipe)
+    def postprocess(outputs, scale):
+        return decode_detections(outputs, scale, conf_th=args.conf, nms_enabled=post["nms"],
+                                 iou_th=post["iou"], topk=post["topk"])
+    return postprocess
+
+def make_frame_codec(args, pool=1):
+    """(prepare, finish): prepare(frame) -> (blob, ctx) and finish(outputs, ctx) -> detections
+    in frame coordinates. Full-frame letterbox by default, one batched crop per ROI with --rois,
+    overlapping native-resolution tiles merged by cross-tile NMS with --tiles."""
+    post = postprocess_settings(path=args.recipe)
+    postprocess = make_postprocess(args, post)
+    if args.tiles:
+        tiler = TileBatcher(args.tile_size, args.tile_overlap, pool=pool)
+        def finish_tiles(outputs, ctx):
+            per_tile = split_outputs(outputs, [1] * len(ctx[1]))
+            dets = [postprocess(o, m[2]) for o, m in zip(per_tile, ctx[1])]
+            return tiler.to_frame(dets, ctx, iou_th=post["iou"], topk=post["topk"])
+        return tiler, finish_tiles
+    if not args.rois:
+        return LetterboxPreprocessor(pool=pool), postprocess
+    rois = load_rois(args.name, args.cameras, args.recipe)
+    if not rois:
+        raise RuntimeError(f"--rois set but no ROIs configured for {args.name} in {args.cameras} or {args.recipe}")
+    batcher = ROIBatcher(rois, (args.roi_size, args.roi_size), pool=pool)
+    def finish(outputs, meta):
+        per_roi = split_outputs(outputs, [1] * len(meta))
+        return batcher.to_frame([postprocess(o, m[2]) for o, m in zip(per_roi, meta)], meta)
+    return batcher, finish
+
+def new_frame_id():
+    return f"f_{uuid.uuid4().hex[:8]}"
+
+def save_event_frame(frame, dets, frame_id, media_dir):
+    img_path = ""
+    if dets:
+        img_path = str((media_dir / f"{frame_id}.jpg").resolve())
+        cv2.imwrite(img_path, frame)
+    return img_path
+
+def make_frame_saver(args, media_dir):
+    """save(frame, dets, frame_id) -> image path; async through EventFrameWriter unless --writer-workers 0."""
+    if args.writer_workers <= 0:
+        return (lambda frame, dets, frame_id: save_event_frame(frame, dets, frame_id, media_dir)), None
+    writer = EventFrameWriter(media_dir, fmt=args.image_format, quality=args.image_quality,
+                              workers=args.writer_workers, max_queue=args.writer_queue,
+                              overload=args.writer_overload)
+    return (lambda frame, dets, frame_id: writer.submit(frame, frame_id) if dets else ""), writer
+
+def make_publisher(args, cli):
+    """publish(source, frame_id, dets, img_path); the defaults keep one JSON message per frame."""
+    return DetectionPublisher(cli, TOPIC_DET, encoding=args.mqtt_encoding, window_ms=args.mqtt_window_ms,
+                              max_frames=args.mqtt_max_frames, empty=args.mqtt_empty,
+                              heartbeat_s=args.mqtt_heartbeat).start()
+
+class FpsLimiter:
+    def __init__(self, fps_limit):
+        self.min_dt = 1.0/fps_limit if fps_limit > 0 else 0.0
+        self.last = time.time()
+
+    def wait(self):
+        if self.min_dt <= 0: return
+        dt = time.time() - self.last
+        if dt < self.min_dt:
+            time.sleep(self.min_dt - dt)
+        self.last = time.time()
+
+class LocalRunner:
+    """run_model(frame_id, blob) backed by a cached, warmed-up InferenceSession.
+    set_threads() switches to a session with another intra-op pool (cached as well)."""
+
+    def __init__(self, model_path, intra_op_threads=0, warmup_runs=1):
+        self.model_path, self.warmup_runs = model_path, warmup_runs
+        self.set_threads(intra_op_threads)
+        info = session_cache.last_load
+        print(f"[session] {model_path} cache={info['tier']} load={info['load_ms']:.1f}ms warmup={info['warmup_ms']:.1f}ms")
+
+    def set_threads(self, intra_op_threads):
+        sess = get_session(self.model_path, intra_op_threads=intra_op_threads, warmup_runs=self.warmup_runs)
+        self.input_name = sess.get_inputs()[0].name
+        self.input_shape = sess.get_inputs()[0].shape
+        self.threads, self.sess = intra_op_threads, sess
+
+    def __call__(self, frame_id, blob):
+        return self.sess.run(None, {self.input_name: blob})
+
+def _int_list(text):
+    return [int(v) for v in str(text).split(",") if v.strip()]
+
+def make_autotuner(args, codec, runner):
+    """LatencyAutotuner for --latency-budget, with the knobs this run can actually turn."""
+    if args.latency_budget <= 0: return None
+    prepare = codec[0]
+    resolutions = _int_list(args.autotune_resolutions) or [640]
+    if not isinstance(prepare, LetterboxPreprocessor):
+        resolutions = [args.tile_size if args.tiles else args.roi_size]
+        print("[autotune] resolution pinned: --rois/--tiles crops have a fixed size")
+    elif isinstance(runner, LocalRunner) and all(isinstance(d, int) for d in runner.input_shape[2:]):
+        resolutions = [runner.input_shape[2]]
+        print(f"[autotune] resolution pinned to {resolutions[0]}: model input H/W are static")
+    threads = _int_list(args.autotune_threads) or [args.threads]
+    if not isinstance(runner, LocalRunner) and len(threads) > 1:
+        threads = [args.threads]
+        print("[autotune] threads pinned: no local session (--infer-server / --watch-ota)")
+
+    def apply(state):
+        if isinstance(prepare, LetterboxPreprocessor):
+            prepare.size = (state.resolution, state.resolution)
+        if isinstance(runner, LocalRunner) and state.threads != runner.threads:
+            runner.set_threads(state.threads)
+
+    tuner = LatencyAutotuner(args.latency_budget, resolutions=resolutions, threads=threads,
+                             strides=_int_list(args.autotune_strides) or [1], window=args.autotune_window,
+                             apply=apply, log=DbDecisionLog(device_id=args.name))
+    apply(tuner.state)
+    print(tuner.format_state())
+    return tuner
+
+def make_motion_gate(args):
+    if not args.motion_gate: return None
+    return MotionGate(min_area=args.motion_area, pixel_threshold=args.motion_threshold,
+                      keepalive_s=args.motion_keepalive)
+
+def run_serial(args, cap, run_model, publish, save_frame, gate=None, timer=None, codec=None, tuner=None):
+    timer = timer or StageTimer()
+    limiter = FpsLimiter(args.fps_limit)
+    prepare, finish = codec or make_frame_codec(args)
+    next_report = time.monotonic() + args.stats_every
+    is_valid = getattr(cap, "is_valid", lambda: True)  # RingCapture views can be lapped by the grabber
+    ring = hasattr(cap, "is_valid") and not getattr(cap, "copy", True)
+    index, torn = -1, 0
+    while True:
+        frame_id = new_frame_id()
+        t = t0 = timer.start()
+        ok, frame = cap.read()
+        if not ok: break
+        t = timer.lap("decode", t, frame_id)
+        index += 1
+        if tuner is not None and not tuner.should_process(index):
+            timer.drop_frame(frame_id); continue
+        if gate is not None:
+            moving = gate(frame)
+            t = timer.lap("motion", t, frame_id)
+            if not moving:
+                timer.drop_frame(frame_id); continue
+
+        blob, ctx = prepare(frame)
+        t = timer.lap("preprocess", t, frame_id)
+        outputs = run_model(frame_id, blob)
+        t = timer.lap("infer", t, frame_id)
+        dets = finish(outputs, ctx)
+        t = timer.lap("postprocess", t, frame_id)
+        if dets and ring:
+            frame = frame.copy()  # the view can still be overwritten after the check below
+        if not is_valid():
+            # a zero-copy ring frame was overwritten while we worked on it: the detections
+            # may not match the pixels, so neither save nor publish them
+            torn += 1
+            timer.drop_frame(frame_id); continue
+
+        img_path = save_frame(frame, dets, frame_id)
+        t = timer.lap("save", t, frame_id)
+        publish(args.name, frame_id, dets, img_path)
+        t = timer.lap("publish", t, frame_id)
+        timer.lap("e2e", t0, frame_id)
+        timer.end_frame(frame_id)
+        if tuner is not None:
+            tuner.observe((t - t0) * 1000.0)
+        if args.stats_every > 0 and time.monotonic() >= next_report:
+            line = timer.format_window()
+            line = line if gate is None else f"{line} {gate.format_stats()}"
+            line = f"{line} torn={torn}" if torn else line
+            print(line if tuner is None else f"{line}\n{tuner.format_state()}")
+            next_report += args.stats_every
+        limiter.wait()
+
+def run_pipelined(args, cap, run_model, publish, save_frame, gate=None, timer=None, codec=None, tuner=None):
+    """Capture, preprocess, infer and output on separate threads so decode and
+    JPEG encoding never stall sess.run while frames are waiting."""
+    timer = timer or StageTimer()
+    limiter = FpsLimiter(args.fps_limit)
+    # One buffer set per frame that can be in flight between preprocess and infer
+    prepare, finish = codec or make_frame_codec(args, pool=args.queue_size + 2)
+    index = [-1]
+
+    def capture():
+        while True:
+            frame_id = new_frame_id()
+            t = t0 = timer.start()
+            ok, frame = cap.read()
+            if not ok: return None
+            t = timer.lap("decode", t, frame_id)
+            index[0] += 1
+            if tuner is not None and not tuner.should_process(index[0]):
+                timer.drop_frame(frame_id); continue
+            if gate is None: break
+            moving = gate(frame)
+            timer.lap("motion", t, frame_id)
+            if moving: break
+            timer.drop_frame(frame_id)
+        limiter.wait()
+        return {"frame_id": frame_id, "frame": frame, "t0": t0}
+
+    def preprocess(item):
+        t = timer.start()
+        item["blob"], item["ctx"] = prepare(item["frame"])
+        timer.lap("preprocess", t, item["frame_id"])
+        return item
+
+    def infer(item):
+        t = timer.start()
+        outputs = run_model(item["frame_id"], item.pop("blob"))
+        t = timer.lap("infer", t, item["frame_id"])
+        item["dets"] = finish(outputs, item["ctx"])
+        timer.lap("postprocess", t, item["frame_id"])
+        return item
+
+    def output(item):
+        frame_id = item["frame_id"]
+        t = timer.start()
+        img_path = save_frame(item["frame"], item["dets"], frame_id)
+        t = timer.lap("save", t, frame_id)
+        publish(args.name, frame_id, item["dets"], img_path)
+        t = timer.lap("publish", t, frame_id)
+        timer.lap("e2e", item["t0"], frame_id)  # includes time spent waiting in stage queues
+        timer.end_frame(frame_id)
+        if tuner is not None:
+            tuner.observe((t - item["t0"]) * 1000.0)
+
+    pipe = StagedPipeline(capture, [("preprocess", preprocess), ("infer", infer), ("output", output)],
+                          queue_size=args.queue_size, drop_policy=args.drop_policy,
+                          on_drop=lambda item: timer.drop_frame(item["frame_id"]))
+    def report(line):
+        line = f"{line}\n{timer.format_window()}"
+        line = line if gate is None else f"{line} {gate.format_stats()}"
+        print(line if tuner is None else f"{line}\n{tuner.format_state()}")
+    pipe.run(report_every=args.stats_every, report=report)
 
 def main():
     ap = argparse.ArgumentParser()
     src = ap.add_mutually_exclusive_group(required=True)
     src.add_argument("--camera", type=int, help="OpenCV camera index")
     src.add_argument("--video", type=str, help="Video file path")
-    ap.add_argument("--model", required=True, help="ONNX model path")
+    src.add_argument("--ring", type=str, metavar="CAMERA_ID", help="Read frames from a multi_camera_support grabber's shared-memory ring")
+    ap.add_argument("--ring-timeout", type=float, default=60.0,
+                    help="With --ring: seconds to wait for the grabber to create the ring before giving up")
+    ap.add_argument("--model", help="ONNX model path (required unless --infer-server is used)")
+    ap.add_argument("--watch-ota", action="store_true", help="Load the model named in --ota-config and hot-swap it when the file changes")
+    ap.add_argument("--ota-config", default="ota/update_control.json", help="OTA control file (onnx_model_path, version)")
+    ap.add_argument("--infer-server", help="host:port of a shared vision_runtime/batch_server.py instead of a local session")
+    ap.add_argument("--threads", type=int, default=0, help="ORT intra-op threads (0 = runtime default)")
+    ap.add_argument("--warmup-runs", type=int, default=1, help="Zero-input runs before the first frame")
     ap.add_argument("--name", default="lineA-cam01", help="Source camera name")
     ap.add_argument("--media-dir", default="data/media/lineA-cam01", help="Where to store event frames")
     ap.add_argument("--conf", type=float, default=0.5, help="Confidence threshold")
+    ap.add_argument("--recipe", default="recipes/pipeline.yaml", help="Pipeline recipe providing postprocess.nms/topk/iou")
+    ap.add_argument("--rois", action="store_true", help="Infer on the configured ROI crops (one batched call) instead of the full frame")
+    ap.add_argument("--cameras", default="config/cameras.yaml", help="Camera config; an entry whose id matches --name may list rois")
+    ap.add_argument("--roi-size", type=int, default=640, help="Square model input size per ROI crop")
+    ap.add_argument("--tiles", action="store_true", help="Infer on overlapping native-resolution tiles (4K / line-scan frames)")
+    ap.add_argument("--tile-size", type=int, default=640, help="Square tile size (model input size)")
+    ap.add_argument("--tile-overlap", type=float, default=0.2, help="Fraction of a tile shared with its neighbour")
+    ap.add_argument("--tile-batch", type=int, default=8, help="Max tiles per session call (0 = all tiles at once)")
     ap.add_argument("--fps-limit", type=float, default=0.0, help="Max FPS (0 = unlimited)")
+    ap.add_argument("--motion-gate", action="store_true", help="Skip inference on frames with no scene change")
+    ap.add_argument("--motion-area", type=float, default=0.005, help="Fraction of changed pixels that counts as motion")
+    ap.add_argument("--motion-threshold", type=int, default=25, help="Per-pixel grey-level change that counts as changed")
+    ap.add_argument("--motion-keepalive", type=float, default=2.0, help="Infer at least once every N seconds on a still scene (0 = never)")
+    ap.add_argument("--writer-workers", type=int, default=2, help="Background event-frame writer threads (0 = write inline)")
+    ap.add_argument("--writer-queue", type=int, default=32, help="Max event frames waiting to be written")
+    ap.add_argument("--writer-overload", choices=OVERLOAD_POLICIES, default="downsample",
+                    help="When the writer queue backs up: drop frames or halve them before encoding")
+    ap.add_argument("--image-format", choices=tuple(FORMATS), default="jpg", help="Event frame format")
+    ap.add_argument("--image-quality", type=int, default=90, help="JPEG/WebP quality (0-100)")
+    ap.add_argument("--mqtt-encoding", choices=ENCODINGS, default="json",
+                    help="Detection message encoding; msgpack/struct are always batched")
+    ap.add_argument("--mqtt-window-ms", type=float, default=0.0,
+                    help="Coalesce detections for N ms into one message on <topic>/batch/<encoding> (0 = per frame)")
+    ap.add_argument("--mqtt-max-frames", type=int, default=64, help="Publish a batch early once it holds N frames")
+    ap.add_argument("--mqtt-empty", choices=EMPTY_POLICIES, default="send",
+                    help="Frames without detections: send them, drop them, or only count them in heartbeat batches")
+    ap.add_argument("--mqtt-heartbeat", type=float, default=5.0, help="Seconds between heartbeat batches with --mqtt-empty heartbeat")
+    ap.add_argument("--pipeline", action="store_true", help="Run capture/preprocess/infer/output on separate threads")
+    ap.add_argument("--queue-size", type=int, default=4, help="Bounded queue size between pipeline stages")
+    ap.add_argument("--drop-policy", choices=DROP_POLICIES, default=DROP_OLDEST,
+                    help="What a full stage queue does: drop the oldest frame or block the producer")
+    ap.add_argument("--stats-every", type=float, default=10.0, help="Print per-stage latency (and pipeline queue) stats every N seconds (0 = off)")
+    ap.add_argument("--latency-budget", type=float, default=0.0,
+                    help="p95 end-to-end latency budget in ms; autotune resolution/threads/stride to hold it (0 = off)")
+    ap.add_argument("--autotune-resolutions", default="960,640,480", help="Input sizes the autotuner may use (needs a dynamic-size model)")
+    ap.add_argument("--autotune-threads", default="", help="Intra-op thread counts the autotuner may use, e.g. 2,4 (default: --threads only)")
+    ap.add_argument("--autotune-strides", default="1,2,3", help="Frame strides the autotuner may use (process every Nth frame)")
+    ap.add_argument("--autotune-window", type=int, default=60, help="Processed frames per autotune decision")
+    ap.add_argument("--trace-file", help="Append one JSON line of per-stage timings per frame_id to this file")
+    ap.add_argument("--trace-every", type=int, default=1, help="Trace only every Nth frame")
     args = ap.parse_args()
+    if not args.model and not args.infer_server and not args.watch_ota:
+        ap.error("--model, --watch-ota or --infer-server is required")
+    if args.tiles and args.rois:
+        ap.error("--tiles and --rois are mutually exclusive")
 
     media_dir = pathlib.Path(args.media_dir); media_dir.mkdir(parents=True, exist_ok=True)
-    sess = ort.InferenceSession(args.model, providers=["CPUExecutionProvider"])
-    input_name = sess.get_inputs()[0].name
+    save_frame, writer = make_frame_saver(args, media_dir)
+    gate = make_motion_gate(args)
+    hot_model = None
+    if args.infer_server:
+        client = BatchClient(parse_address(args.infer_server))
+        run_model = client.infer
+    elif args.watch_ota:
+        hot_model = run_model = HotSwapModel(
+            args.ota_config, session_factory=lambda path: get_session(path, intra_op_threads=args.threads,
+                                                                      warmup_runs=args.warmup_runs)).start()
+        print(f"[ota] serving {hot_model.version} ({hot_model.model_path})")
+    else:
+        run_model = LocalRunner(args.model, args.threads, args.warmup_runs)
+    runner = run_model
+    if args.tiles:
+        run_model = run_chunked(run_model, args.tile_batch)
 
     cli = mqtt.Client(); cli.connect(MQTT_HOST, MQTT_PORT, 60); cli.loop_start()
+    publish = make_publisher(args, cli)
 
-    cap = cv2.VideoCapture(args.camera if args.camera is not None else args.video)
+    if args.ring:
+        # Threaded stages hold frames across several grabs, so they need their own copy.
+        # Waits (up to --ring-timeout) for the grabber and rides out its reconnects/restarts;
+        # ends with the stream.
+        cap = RingCapture.open(args.ring, attach_timeout=args.ring_timeout, copy=args.pipeline)
+    else:
+        cap = cv2.VideoCapture(args.camera if args.camera is not None else args.video)
     if not cap.isOpened():
         raise RuntimeError("Unable to open camera/video source")
 
+    timer = StageTimer(args.trace_file, args.trace_every)
+    # One buffer set per frame that can be in flight between preprocess and infer
+    codec = make_frame_codec(args, pool=args.queue_size + 2 if args.pipeline else 1)
+    tuner = make_autotuner(args, codec, runner)
     try:
-        last = time.time()
-        while True:
-            ok, frame = cap.read()
-            if not ok: break
-
-            blob, scale = preprocess_bgr(frame)
-            outputs = sess.run(None, {input_name: blob})
-            dets = dummy_postprocess(outputs, scale, conf_th=args.conf)
-
-            frame_id = f"f_{uuid.uuid4().hex[:8]}"
-            img_path = ""
-            if dets:
-                img_path = str((media_dir / f"{frame_id}.jpg").resolve())
-                cv2.imwrite(img_path, frame)
-
-            payload = {
-                "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                "source": args.name,
-                "frame_id": frame_id,
-                "detections": dets,
-                "image_path": f"file://{img_path}" if img_path else ""
-            }
-            cli.publish(TOPIC_DET, json.dumps(payload), qos=0)
-
-            if args.fps_limit > 0:
-                dt = time.time() - last
-                min_dt = 1.0/args.fps_limit
-                if dt < min_dt:
-                    time.sleep(min_dt - dt)
-                last = time.time()
+        if args.pipeline:
+            run_pipelined(args, cap, run_model, publish, save_frame, gate, timer, codec, tuner)
+        else:
+            run_serial(args, cap, run_model, publish, save_frame, gate, timer, codec, tuner)
     except KeyboardInterrupt:
         pass
     finally:
-        cap.release(); cli.loop_stop()
+        cap.release()
+        if hot_model is not None:
+            hot_model.stop()
+        if gate is not None:
+            print(gate.format_stats())
+        if writer is not None:
+            writer.close(); print(writer.format_stats())
+        publish.close(); print(publish.format_stats())
+        timer.close(); print(timer.format_stats())
+        if tuner is not None:
+            print(tuner.format_state())
+        cli.loop_stop()
 
 if __name__ == "__main__":
     main()
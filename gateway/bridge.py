@@ -1,17 +1,22 @@
 import json, paho.mqtt.client as mqtt
-from core.db import connect
+from core.db import housekeeping
+from core.ingest import get_writer, utc_now
 LOCAL_BROKER='localhost'; LOCAL_TOPIC='edge/+/inspection'
 
 def send_to_cloud(payload: dict) -> str: return 'ack:ok'  # TODO
 
 def on_message(client, userdata, msg):
-    con = userdata['con']; payload = json.loads(msg.payload.decode()); ack = send_to_cloud(payload)
-    con.execute("""INSERT INTO events(ts, device_id, severity, type, message, meta_json)
-                 VALUES (datetime('now'), ?, 'info', 'forward', ?, json(?))""",
-                (payload.get('device_id','local'), 'inspection_forward', json.dumps({'ack': ack})))
+    # enqueue only: the ingest writer group-commits, so a burst never blocks the MQTT loop on SQLite
+    writer = userdata['writer']; payload = json.loads(msg.payload.decode()); ack = send_to_cloud(payload)
+    writer.insert('events', {'ts': utc_now(), 'device_id': payload.get('device_id','local'), 'severity': 'info',
+                             'type': 'forward', 'message': 'inspection_forward',
+                             'meta_json': json.dumps({'ack': ack}, separators=(',', ':'))})
 
 def run():
-    con = connect(); cli = mqtt.Client(userdata={'con': con}); cli.on_message = on_message
-    cli.connect(LOCAL_BROKER,1883,60); cli.subscribe(LOCAL_TOPIC,1); cli.loop_forever()
+    # the long-running ingest owner: its writer also folds rollups and maintains partitions
+    writer = get_writer(housekeeping=housekeeping); cli = mqtt.Client(userdata={'writer': writer}); cli.on_message = on_message
+    cli.connect(LOCAL_BROKER,1883,60); cli.subscribe(LOCAL_TOPIC,1)
+    try: cli.loop_forever()
+    finally: writer.close(); print(writer.format_stats())
 
 if __name__=='__main__': run()
@@ -0,0 +1,188 @@
+# autotuner.py - Hold a per-line latency budget by trading resolution, threads and frame stride
+"""Latency-budget controller for the vision loop.
+
+The loop reports the latency of every processed frame (observe()); once per window
+the controller compares the window's p95 with the budget:
+
+  over budget          -> one step down the ladder:
+                          more intra-op threads, then a smaller input resolution,
+                          then a larger frame stride (process every Nth frame)
+  under headroom*budget for `patience` windows
+                       -> one step back up, in reverse order
+
+A step up that is followed straight away by a step down doubles the patience before
+that step is tried again, so the controller does not oscillate around the budget.
+Every decision goes to the `events` table (type 'autotune') and the measured window
+to `benchmarks`, so the trade-off can be audited later.
+"""
+from __future__ import annotations
+import json, sqlite3
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from vision_runtime.latency import LatencyHistogram
+
+
+@dataclass
+class TuneState:
+    resolution: int
+    threads: int
+    stride: int = 1
+
+
+@dataclass
+class Decision:
+    action: str          # "degrade" | "upgrade"
+    knob: str            # "threads" | "resolution" | "stride"
+    before: TuneState
+    after: TuneState
+    p95_ms: float
+    budget_ms: float
+    frames: int
+
+
+class LatencyAutotuner:
+    """Step through resolution / thread / stride ladders to keep p95 latency under `budget_ms`.
+
+    `apply(state)` is called with the new TuneState after every decision and must make
+    it take effect (e.g. resize the letterbox, swap the session); `log(decision)` is
+    called afterwards (see DbDecisionLog).
+    """
+
+    def __init__(self, budget_ms: float, resolutions: Sequence[int] = (640,), threads: Sequence[int] = (0,),
+                 strides: Sequence[int] = (1, 2, 3, 4), window: int = 60, headroom: float = 0.7,
+                 patience: int = 3, settle: int = 5, apply: Optional[Callable[[TuneState], None]] = None,
+                 log: Optional[Callable[[Decision], None]] = None):
+        if budget_ms <= 0:
+            raise ValueError("latency budget must be > 0 ms")
+        self.budget_ms = float(budget_ms)
+        self.resolutions = sorted({int(r) for r in resolutions}, reverse=True)  # best quality first
+        self.threads = sorted({int(t) for t in threads})                        # cheapest first
+        self.strides = sorted({max(1, int(s)) for s in strides})
+        self.window = max(1, int(window))
+        self.headroom = float(headroom)
+        self.patience = max(1, int(patience))
+        self.settle = max(0, int(settle))
+        self.apply = apply
+        self.log = log
+        self._idx = {"resolution": 0, "threads": 0, "stride": 0}
+        self._hist = LatencyHistogram()
+        self._skip = 0
+        self._calm = 0
+        self._patience: Dict[str, int] = {}
+        self._last: Optional[Decision] = None
+        self.decisions: List[Decision] = []
+
+    @property
+    def state(self) -> TuneState:
+        return TuneState(self.resolutions[self._idx["resolution"]], self.threads[self._idx["threads"]],
+                         self.strides[self._idx["stride"]])
+
+    def should_process(self, frame_index: int) -> bool:
+        """Frame-stride gate for the capture loop."""
+        return frame_index % self.state.stride == 0
+
+    def observe(self, latency_ms: float) -> Optional[Decision]:
+        """Feed one processed frame's latency; returns a Decision when the state changed."""
+        if self._skip:
+            self._skip -= 1  # frames in flight from before the last change
+            return None
+        self._hist.record(latency_ms)
+        if self._hist.count < self.window:
+            return None
+        p95, n = self._hist.percentile(95), self._hist.count
+        self._hist = LatencyHistogram()
+        if p95 > self.budget_ms:
+            self._calm = 0
+            return self._step(-1, p95, n)
+        if p95 < self.headroom * self.budget_ms:
+            self._calm += 1
+            knob = self._next_knob(+1)
+            if knob is not None and self._calm >= self._patience.get(knob, self.patience):
+                self._calm = 0
+                return self._step(+1, p95, n)
+        else:
+            self._calm = 0
+        return None
+
+    # Degrade: add threads (no quality cost), then shrink the input, then skip frames.
+    _DOWN = (("threads", +1), ("resolution", +1), ("stride", +1))
+    # Upgrade in reverse: restore every frame, then resolution, then give threads back.
+    _UP = (("stride", -1), ("resolution", -1), ("threads", -1))
+
+    def _ladder(self, knob):
+        return {"resolution": self.resolutions, "threads": self.threads, "stride": self.strides}[knob]
+
+    def _next_knob(self, direction):
+        for knob, delta in (self._DOWN if direction < 0 else self._UP):
+            if 0 <= self._idx[knob] + delta < len(self._ladder(knob)):
+                return knob
+        return None
+
+    def _step(self, direction, p95, n):
+        knob = self._next_knob(direction)
+        if knob is None:
+            return None  # already at the end of every ladder
+        before = self.state
+        self._idx[knob] += dict(self._DOWN if direction < 0 else self._UP)[knob]
+        decision = Decision("degrade" if direction < 0 else "upgrade", knob, before, self.state,
+                            round(p95, 2), self.budget_ms, n)
+        if direction < 0 and self._last is not None and self._last.action == "upgrade":
+            # the last upgrade broke the budget straight away: wait longer before retrying it
+            k = self._last.knob
+            self._patience[k] = 2 * self._patience.get(k, self.patience)
+        self._last = decision
+        self._skip = self.settle
+        self.decisions.append(decision)
+        if self.apply is not None:
+            self.apply(self.state)
+        if self.log is not None:
+            self.log(decision)
+        return decision
+
+    def format_state(self) -> str:
+        s = self.state
+        return (f"[autotune] budget={self.budget_ms:.0f}ms res={s.resolution} threads={s.threads or 'auto'} "
+                f"stride={s.stride} decisions={len(self.decisions)}")
+
+
+class DbDecisionLog:
+    """log(decision) -> one `events` row (type 'autotune') and one `benchmarks` row per decision.
+
+    The benchmarks rows carry notes {"source": "autotune", ...}; the Benchmark Matrix
+    and best_engine() leave them out of their aggregates. Rows are queued on the ingest
+    writer (core.ingest), so a decision never waits on SQLite in the frame loop.
+    """
+
+    def __init__(self, device_id: str = "local", engine: str = "onnxruntime"):
+        from core.db import connect, migrate
+        from core.ingest import get_writer
+        from bench.ort_benchmark import input_hw
+        self.device_id = device_id
+        self.input_hw = input_hw()
+        self.engine = engine
+        con = connect()
+        try:
+            migrate(con)
+        except sqlite3.Error:
+            pass  # older database layout; the tables we write to already exist
+        # benchmarks has had an `engine`/`input_hw` and an older `model` layout; write what exists
+        self._bench_cols = {r[1] for r in con.execute("PRAGMA table_info(benchmarks)")}
+        con.close()
+        self.writer = get_writer()
+
+    def __call__(self, d: Decision) -> None:
+        from core.ingest import utc_now
+        meta = {"knob": d.knob, "before": asdict(d.before), "after": asdict(d.after),
+                "p95_ms": d.p95_ms, "budget_ms": d.budget_ms, "frames": d.frames}
+        severity = "warning" if d.action == "degrade" else "info"
+        message = (f"{d.action} {d.knob}: {getattr(d.before, d.knob)} -> {getattr(d.after, d.knob)} "
+                   f"(p95 {d.p95_ms:.1f} ms, budget {d.budget_ms:.0f} ms)")
+        ts = utc_now()
+        self.writer.insert("events", {"ts": ts, "device_id": self.device_id, "severity": severity, "type": "autotune",
+                                      "message": message, "meta_json": json.dumps(meta)})
+        # the window that triggered the decision, measured with the `before` settings
+        row = {"device_id": self.device_id, "engine": self.engine, "model": self.engine, "input_hw": self.input_hw,
+               "input_size": str(d.before.resolution), "fps": round(1000.0 / d.p95_ms, 2) if d.p95_ms > 0 else None,
+               "latency_ms": d.p95_ms, "notes": json.dumps({"source": "autotune", **asdict(d.before)})}
+        self.writer.insert("benchmarks", {"ts": ts, **{k: v for k, v in row.items() if k in self._bench_cols}})
@@ -0,0 +1,278 @@
+# camera_manager.py - Supervise one grabber + inference worker per camera (reconnect backoff, CPU pinning, counters)
+"""Run every camera in config/cameras.yaml as its own worker process.
+
+    python -m multi_camera_support.camera_manager --cameras config/cameras.yaml --pin auto --stats-every 5
+
+Each worker runs frame_grabber_interface.grab_loop: it decodes its stream into the
+shared-memory ring `edgekit_<id>` (read it with camera_infer.py --ring <id>) and
+reconnects dropped live streams with exponential backoff. The manager restarts
+workers that crash, again with backoff, and reads the per-camera fps / drop /
+reconnect counters the workers keep in shared memory.
+
+Cameras with inference settings (an `infer` entry, or --infer-args for all of
+them) also get a camera_infer.py --ring <id> process, pinned and restarted the
+same way. It keeps reading across grabber reconnects and restarts and exits
+when the stream ends.
+
+    python -m multi_camera_support.camera_manager --pin auto --infer-args "--model models/yolov8n.onnx --pipeline"
+
+Per-camera keys in cameras.yaml (all optional besides id/url):
+    cpu: 3                 # pin this worker to core 3 (or a list of cores)
+    infer: "--model m.onnx"  # camera_infer.py arguments for this camera (overrides --infer-args)
+    infer_cpu: [4, 5]      # pin its inference worker (default with --pin auto: next cores round-robin)
+    reconnect: true        # default: true for live sources, false for local files
+    backoff_s / backoff_max_s, width / height, ring_slots
+"""
+from __future__ import annotations
+import argparse, os, pathlib, shlex, subprocess, sys, time
+import multiprocessing as mp
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from multi_camera_support.frame_grabber_interface import (CAMERAS_YAML, DROPS, FPS, FRAMES, LAST_TS, N_COUNTERS,
+                                                          RECONNECTS, Backoff, grab_loop, load_cameras,
+                                                          should_reconnect)
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+CAMERA_INFER = ROOT / "examples" / "vision_inspection" / "camera_infer.py"
+
+
+def assign_cores(cameras, pin=None, key="cpu", start=0):
+    """{camera_id: [cores]} from explicit `key` entries, plus round-robin over the
+    available cores (from the `start`-th one) for the rest when pin == "auto".
+    Without pinning -> {}."""
+    cores = available_cores()
+    plan, i = {}, start
+    for cam in cameras:
+        if cam.get(key) is not None:
+            cpu = cam[key]
+            plan[cam["id"]] = list(cpu) if isinstance(cpu, (list, tuple)) else [int(cpu)]
+        elif pin == "auto":
+            plan[cam["id"]] = [cores[i % len(cores)]]
+            i += 1
+    return plan
+
+
+def infer_command(cam, infer_args=None):
+    """camera_infer.py argv reading `cam`'s ring, or None when the camera has no
+    inference settings (`infer` in cameras.yaml, else the manager's infer_args)."""
+    extra = cam.get("infer", infer_args)
+    if extra is None:
+        return None
+    if isinstance(extra, str):
+        extra = shlex.split(extra)
+    cid = str(cam["id"])
+    return [sys.executable, str(CAMERA_INFER), "--ring", cid, "--name", cid,
+            "--media-dir", f"data/media/{cid}", *[str(a) for a in extra]]
+
+
+def _worker(cam, slots, stop, counters, cores):
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    grab_loop(cam, slots=slots, stop=stop, counters=counters)
+
+
+class CameraManager:
+    """Supervisor for per-camera grabber processes and their inference workers.
+
+    `infer_cmd(cam)` gives the inference worker's argv (None: grabber only); it
+    defaults to camera_infer.py with `infer_args` / the camera's `infer` entry.
+    """
+
+    def __init__(self, cameras=None, cameras_path=CAMERAS_YAML, slots=4, pin=None,
+                 restart_backoff_s=1.0, restart_backoff_max_s=60.0, log=print,
+                 infer_args=None, infer_cmd=None):
+        self.cameras = {c["id"]: c for c in (cameras if cameras is not None else load_cameras(cameras_path))}
+        self.slots = slots
+        self.cores = assign_cores(self.cameras.values(), pin)
+        infer_cmd = infer_cmd or (lambda cam: infer_command(cam, infer_args))
+        self.infer_cmds = {cid: cmd for cid, cmd in ((cid, infer_cmd(c)) for cid, c in self.cameras.items())
+                           if cmd is not None}
+        self.infer_cores = assign_cores([c for cid, c in self.cameras.items() if cid in self.infer_cmds],
+                                        pin, key="infer_cpu", start=len(self.cores))
+        self.log = log
+        self._ctx = mp.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._counters = {cid: self._ctx.RawArray("d", N_COUNTERS) for cid in self.cameras}
+        self._backoff = {cid: Backoff(restart_backoff_s, restart_backoff_max_s) for cid in self.cameras}
+        self._procs = {}
+        self._restart_at = {}
+        self.restarts = {cid: 0 for cid in self.cameras}
+        self.finished = set()
+        self._infer = {}
+        self._infer_backoff = {cid: Backoff(restart_backoff_s, restart_backoff_max_s) for cid in self.infer_cmds}
+        self._infer_restart_at = {}
+        self.infer_restarts = {cid: 0 for cid in self.infer_cmds}
+        self.infer_finished = set()
+
+    def _spawn(self, cid):
+        p = self._ctx.Process(target=_worker, name=f"camera-{cid}", daemon=True,
+                              args=(self.cameras[cid], self.slots, self._stop, self._counters[cid],
+                                    self.cores.get(cid)))
+        p.start()
+        self._procs[cid] = p
+
+    def _spawn_infer(self, cid):
+        p = subprocess.Popen(self.infer_cmds[cid])
+        cores = self.infer_cores.get(cid)
+        if cores and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(p.pid, cores)  # before the model session spins up its threads
+            except ProcessLookupError:
+                pass  # already gone; poll() restarts it
+        self._infer[cid] = p
+
+    def start(self):
+        if (self.cores or self.infer_cores) and not hasattr(os, "sched_setaffinity"):
+            self.log("[cameras] CPU pinning is not supported on this platform; ignoring cpu settings")
+        for cid in self.cameras:
+            self._spawn(cid)
+        for cid in self.infer_cmds:
+            self._spawn_infer(cid)
+        return self
+
+    def poll(self, now=None):
+        """Restart workers that died; call periodically (run() does)."""
+        if self._stop.is_set():
+            return
+        now = time.monotonic() if now is None else now
+        for cid, p in list(self._procs.items()):
+            if cid in self.finished:
+                continue
+            if cid in self._restart_at:
+                if now >= self._restart_at[cid]:
+                    del self._restart_at[cid]
+                    self.restarts[cid] += 1
+                    self._spawn(cid)
+                continue
+            if p.is_alive():
+                if time.time() - self._counters[cid][LAST_TS] < 5.0:
+                    self._backoff[cid].reset()  # streaming again
+                continue
+            if p.exitcode == 0 and not should_reconnect(self.cameras[cid]):
+                self.finished.add(cid)  # file source played to the end
+                self.log(f"[cameras] {cid}: stream ended")
+                continue
+            delay = self._backoff[cid].next()
+            self._restart_at[cid] = now + delay
+            self.log(f"[cameras] {cid}: worker exited ({p.exitcode}); restarting in {delay:.1f}s")
+        self._poll_infer(now)
+
+    def _poll_infer(self, now):
+        for cid, p in list(self._infer.items()):
+            if cid in self.infer_finished:
+                continue
+            if cid in self._infer_restart_at:
+                if cid in self.finished:  # the grabber ended the stream meanwhile: nothing left to read
+                    del self._infer_restart_at[cid]
+                    self.infer_finished.add(cid)
+                    continue
+                if now >= self._infer_restart_at[cid]:
+                    del self._infer_restart_at[cid]
+                    self.infer_restarts[cid] += 1
+                    self._spawn_infer(cid)
+                continue
+            code = p.poll()
+            if code is None:
+                if time.time() - self._counters[cid][LAST_TS] < 5.0:
+                    self._infer_backoff[cid].reset()
+                continue
+            grabber = self._procs.get(cid)
+            if code == 0 and (cid in self.finished or not should_reconnect(self.cameras[cid])
+                              or (grabber is not None and grabber.exitcode == 0)):
+                self.infer_finished.add(cid)  # read the ring to its end (often before the grabber is reaped)
+                continue
+            delay = self._infer_backoff[cid].next()
+            self._infer_restart_at[cid] = now + delay
+            self.log(f"[cameras] {cid}: inference worker exited ({code}); restarting in {delay:.1f}s")
+
+    def alive(self):
+        return (any(p.is_alive() for p in self._procs.values()) or bool(self._restart_at)
+                or any(p.poll() is None for p in self._infer.values()) or bool(self._infer_restart_at))
+
+    def stats(self):
+        out = {}
+        for cid, c in self._counters.items():
+            p = self._procs.get(cid)
+            out[cid] = {"fps": round(c[FPS], 2), "frames": int(c[FRAMES]), "drops": int(c[DROPS]),
+                        "reconnects": int(c[RECONNECTS]), "restarts": self.restarts[cid],
+                        "alive": bool(p is not None and p.is_alive()), "cpu": self.cores.get(cid)}
+            if cid in self.infer_cmds:
+                ip = self._infer.get(cid)
+                out[cid].update({"infer_alive": bool(ip is not None and ip.poll() is None),
+                                 "infer_restarts": self.infer_restarts[cid],
+                                 "infer_cpu": self.infer_cores.get(cid)})
+        return out
+
+    def format_stats(self):
+        parts = []
+        for cid, s in self.stats().items():
+            state = "up" if s["alive"] else ("done" if cid in self.finished else "down")
+            line = (f"{cid}[{state}] fps={s['fps']:.1f} frames={s['frames']} drops={s['drops']} "
+                    f"reconnects={s['reconnects']} restarts={s['restarts']}")
+            if "infer_alive" in s:
+                istate = "up" if s["infer_alive"] else ("done" if cid in self.infer_finished else "down")
+                line += f" infer[{istate}] restarts={s['infer_restarts']}"
+            parts.append(line)
+        return " | ".join(parts)
+
+    def run(self, stats_every=5.0, report=print, poll_s=0.5):
+        """Supervise until every worker finished or KeyboardInterrupt."""
+        next_report = time.monotonic() + stats_every
+        try:
+            while self.alive():
+                time.sleep(poll_s)
+                self.poll()
+                if stats_every and time.monotonic() >= next_report:
+                    report(self.format_stats())
+                    next_report += stats_every
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self, timeout=5.0):
+        # Grabbers mark their rings ended on the way out, so inference workers drain and exit
+        self._stop.set()
+        for p in self._procs.values():
+            p.join(timeout)
+            if p.is_alive(): p.terminate()
+        for p in self._infer.values():
+            try:
+                p.wait(timeout)
+            except subprocess.TimeoutExpired:
+                p.terminate(); p.wait(timeout)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a grabber worker per camera with reconnects and CPU pinning")
+    ap.add_argument("--cameras", default=CAMERAS_YAML, help="Camera config (cameras: [{id, url, ...}])")
+    ap.add_argument("--slots", type=int, default=4, help="Frame ring slots per camera")
+    ap.add_argument("--pin", choices=["auto"], help="Pin workers without a `cpu` entry round-robin to cores")
+    ap.add_argument("--restart-backoff", type=float, default=1.0, help="Initial worker restart delay (s)")
+    ap.add_argument("--restart-backoff-max", type=float, default=60.0, help="Maximum worker restart delay (s)")
+    ap.add_argument("--stats-every", type=float, default=5.0, help="Seconds between counter lines (0 = off)")
+    ap.add_argument("--infer-args", help="camera_infer.py arguments: run an inference worker per camera "
+                                         "(cameras with their own `infer` entry use that instead)")
+    args = ap.parse_args()
+
+    mgr = CameraManager(cameras_path=args.cameras, slots=args.slots, pin=args.pin,
+                        restart_backoff_s=args.restart_backoff, restart_backoff_max_s=args.restart_backoff_max,
+                        infer_args=args.infer_args)
+    if not mgr.cameras:
+        raise SystemExit(f"No cameras defined in {args.cameras}")
+    pinning = {**mgr.cores, **{f"{cid}/infer": cores for cid, cores in mgr.infer_cores.items()}}
+    print(f"[cameras] starting {len(mgr.cameras)} worker(s) + {len(mgr.infer_cmds)} inference worker(s); "
+          f"pinning: {pinning or 'off'}")
+    mgr.start().run(stats_every=args.stats_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,141 @@
-# Placeholder for frame_grabber_interface.py
+# frame_grabber_interface.py - One grabber process per camera writing into a shared-memory FrameRing
+import multiprocessing as mp
+import time
+from pathlib import Path
+
+import cv2
+import yaml
+
+from multi_camera_support.frame_ring import FrameRing, ring_name
+
+CAMERAS_YAML = "config/cameras.yaml"
+
+
+def load_cameras(path=CAMERAS_YAML):
+    p = Path(path)
+    if not p.exists(): return []
+    return (yaml.safe_load(p.read_text()) or {}).get("cameras", []) or []
+
+
+def open_source(url):
+    """OpenCV source for a camera url: digits are device indices, anything else a URL/path."""
+    return int(url) if str(url).isdigit() else url
+
+
+class Backoff:
+    """Exponential reconnect delay: initial, initial*factor, ... capped at max_s."""
+
+    def __init__(self, initial_s=0.5, max_s=30.0, factor=2.0):
+        self.initial_s, self.max_s, self.factor = float(initial_s), float(max_s), float(factor)
+        self.attempt = 0
+
+    def next(self):
+        delay = min(self.max_s, self.initial_s * self.factor ** self.attempt)
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+# Layout of the optional shared counters array passed to grab_loop
+FRAMES, DROPS, RECONNECTS, FPS, LAST_TS = range(5)
+N_COUNTERS = 5
+
+
+def should_reconnect(cam):
+    """Live sources (RTSP/HTTP, device indices) reconnect by default; local files end."""
+    if "reconnect" in cam:
+        return bool(cam["reconnect"])
+    return not Path(str(cam.get("url", 0))).is_file()
+
+
+def grab_loop(cam, slots=4, stop=None, max_frames=0, counters=None, backoff=None):
+    """Decode frames from `cam` and publish them into ring `edgekit_<id>` until the stream
+    ends, `stop` is set or `max_frames` were written. Returns the number of frames written.
+
+    The ring is sized from the first frame unless the camera entry sets width/height,
+    in which case every frame is resized to that. When the camera reconnects (see
+    should_reconnect) a failed read closes the capture and reopens it after an
+    exponential backoff; the ring stays up so readers keep their attachment.
+    `counters` is an optional shared array indexed by FRAMES/DROPS/RECONNECTS/FPS/LAST_TS.
+    """
+    reconnect = should_reconnect(cam)
+    backoff = backoff or Backoff(cam.get("backoff_s", 0.5), cam.get("backoff_max_s", 30.0))
+    cap = cv2.VideoCapture(open_source(cam.get("url", 0)))
+    ring, written, ended = None, 0, False
+    size = (int(cam["width"]), int(cam["height"])) if cam.get("width") and cam.get("height") else None
+    last = None
+    try:
+        while stop is None or not stop.is_set():
+            ok, frame = cap.read()
+            if not ok:
+                if not reconnect: break
+                if counters is not None:
+                    counters[DROPS] += 1; counters[FPS] = 0.0
+                cap.release()
+                delay = backoff.next()
+                if stop is not None:
+                    if stop.wait(delay): break
+                else:
+                    time.sleep(delay)
+                cap = cv2.VideoCapture(open_source(cam.get("url", 0)))
+                if counters is not None:
+                    counters[RECONNECTS] += 1
+                last = None
+                continue
+            backoff.reset()
+            ts = time.time()
+            if size is not None and (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size)
+            if ring is None:
+                ring = FrameRing.create(ring_name(cam["id"]), frame.shape, slots=int(cam.get("ring_slots", slots)))
+            elif frame.shape != ring.shape:
+                frame = cv2.resize(frame, (ring.shape[1], ring.shape[0]))
+            ring.write(frame, ts)
+            written += 1
+            if counters is not None:
+                if last is not None and ts > last:
+                    fps = 1.0 / (ts - last)
+                    counters[FPS] = fps if counters[FPS] == 0.0 else 0.9 * counters[FPS] + 0.1 * fps
+                counters[FRAMES] += 1; counters[LAST_TS] = ts
+            last = ts
+            if max_frames and written >= max_frames: break
+        ended = True  # not an exception: readers should stop rather than wait for a restart
+    finally:
+        cap.release()
+        if ring is not None:
+            if ended:
+                ring.mark_ended()
+            # Give readers a moment to finish with the last views before unlinking
+            time.sleep(float(cam.get("linger_s", 0.0)))
+            ring.close()
+    return written
+
+
+class GrabberPool:
+    """Spawn one grabber process per camera in config/cameras.yaml."""
+
+    def __init__(self, cameras=None, slots=4, cameras_path=CAMERAS_YAML):
+        self.cameras = cameras if cameras is not None else load_cameras(cameras_path)
+        self.slots = slots
+        self._ctx = mp.get_context("spawn")  # no forked OpenCV/threads state in children
+        self._stop = self._ctx.Event()
+        self.procs = {}
+
+    def start(self):
+        for cam in self.cameras:
+            p = self._ctx.Process(target=grab_loop, args=(cam, self.slots, self._stop),
+                                  name=f"grabber-{cam['id']}", daemon=True)
+            p.start(); self.procs[cam["id"]] = p
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for p in self.procs.values():
+            p.join(timeout)
+            if p.is_alive(): p.terminate()
+
+    def rings(self, timeout=5.0):
+        """Attach to every camera's ring (waits for the first frame of each)."""
+        return {cid: FrameRing.attach(ring_name(cid), timeout=timeout) for cid in self.procs}
@@ -0,0 +1,243 @@
+# frame_ring.py - Shared-memory ring buffer of decoded frames (one writer, many readers)
+"""Zero-copy frame hand-off between a grabber process and its consumers.
+
+Layout of the shared block (all little-endian int64 / float64, then pixels):
+    header  [magic, slots, height, width, channels, write_seq, generation, ended]
+    seqs    [slots]  sequence number held by each slot (0 while being written)
+    stamps  [slots]  capture time (time.time()) per slot
+    pixels  [slots, height, width, channels] uint8
+
+Readers get NumPy views straight onto `pixels`; nothing is pickled. A view stays
+valid until the writer wraps around to that slot again (`slots - 1` frames later);
+`is_valid(seq)` tells a reader whether the frame it used was overwritten meanwhile.
+
+A restarted grabber unlinks the old block and creates a new one under the same
+name with a new `generation`; readers that still map the old block detect that
+and reattach (RingCapture does). `ended` is set when the stream finished for good.
+"""
+from __future__ import annotations
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+MAGIC = 0x45444745  # "EDGE"
+_HDR = 8
+_SEQ, _GEN, _ENDED = 5, 6, 7
+
+
+def ring_name(camera_id: str) -> str:
+    return f"edgekit_{camera_id}"
+
+
+def _untrack(shm) -> None:
+    # Attaching processes must not unlink the block on exit (bpo-39959)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        hdr = np.ndarray((_HDR,), dtype=np.int64, buffer=shm.buf)
+        if hdr[0] != MAGIC:
+            raise ValueError(f"{shm.name} is not a frame ring")
+        self.slots, h, w, c = (int(v) for v in hdr[1:5])
+        self.shape = (h, w, c)
+        self._hdr = hdr
+        off = _HDR * 8
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=off); off += self.slots * 8
+        self._stamps = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=off); off += self.slots * 8
+        self._pixels = np.ndarray((self.slots, h, w, c), dtype=np.uint8, buffer=shm.buf, offset=off)
+
+    @staticmethod
+    def _nbytes(shape, slots):
+        return (_HDR + 2 * slots) * 8 + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, name: str, shape: Tuple[int, int, int], slots: int = 4) -> "FrameRing":
+        shape = tuple(int(v) for v in shape)
+        if len(shape) == 2:
+            shape = shape + (1,)
+        try:  # a crashed grabber can leave a stale block behind
+            stale = shared_memory.SharedMemory(name=name); stale.close(); stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._nbytes(shape, slots))
+        hdr = np.ndarray((_HDR,), dtype=np.int64, buffer=shm.buf)
+        hdr[:] = [MAGIC, slots, shape[0], shape[1], shape[2], 0, time.time_ns(), 0]
+        np.ndarray((2 * slots,), dtype=np.int64, buffer=shm.buf, offset=_HDR * 8)[:] = 0
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, timeout: Optional[float] = 0.0) -> "FrameRing":
+        """Open an existing ring, waiting up to `timeout` seconds (None: forever) for its grabber to create it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+                break
+            except FileNotFoundError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+        _untrack(shm)
+        return cls(shm, owner=False)
+
+    # ---- writer ----
+    def write(self, frame: np.ndarray, ts: Optional[float] = None) -> int:
+        """Copy one decoded frame into the next slot and publish it; returns its sequence number."""
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        seq = int(self._hdr[_SEQ]) + 1
+        slot = seq % self.slots
+        self._seqs[slot] = 0  # readers treat the slot as in-flight
+        np.copyto(self._pixels[slot], frame, casting="unsafe")
+        self._stamps[slot] = time.time() if ts is None else ts
+        self._seqs[slot] = seq
+        self._hdr[_SEQ] = seq
+        return seq
+
+    def mark_ended(self) -> None:
+        """Tell readers no more frames will come (the stream finished, not a reconnect)."""
+        self._hdr[_ENDED] = 1
+
+    # ---- readers ----
+    @property
+    def last_seq(self) -> int:
+        return int(self._hdr[_SEQ])
+
+    @property
+    def generation(self) -> int:
+        return int(self._hdr[_GEN])
+
+    @property
+    def ended(self) -> bool:
+        return bool(self._hdr[_ENDED])
+
+    def get(self, seq: int) -> Optional[Tuple[int, float, np.ndarray]]:
+        """(seq, ts, view) for `seq`, or None if that frame is no longer in the ring."""
+        slot = seq % self.slots
+        if seq <= 0 or self._seqs[slot] != seq:
+            return None
+        return seq, float(self._stamps[slot]), self._pixels[slot]
+
+    def latest(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        return self.get(self.last_seq)
+
+    def is_valid(self, seq: int) -> bool:
+        return seq > 0 and self._seqs[seq % self.slots] == seq
+
+    def wait_next(self, after_seq: int, timeout: float = 1.0, poll_s: float = 0.001):
+        """Block until a frame newer than `after_seq` is published; returns latest() or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.last_seq > after_seq:
+                got = self.latest()
+                if got is not None:  # None: the writer lapped us mid-read, try the newer one
+                    return got
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_s)
+
+    def dropped_since(self, after_seq: int) -> int:
+        """Frames the reader skipped over between `after_seq` and the latest one."""
+        return max(0, self.last_seq - after_seq - 1)
+
+    def close(self) -> None:
+        # Views into the block must be released before the mapping can close
+        self._hdr = self._seqs = self._stamps = self._pixels = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a consumer still holds a view; the mapping goes away with it
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class RingCapture:
+    """cv2.VideoCapture-style reader over a FrameRing (read() -> (ok, frame)).
+
+    Frames are views into shared memory unless `copy=True`; copy when the frame
+    outlives the next `slots - 1` grabs (e.g. queued in a threaded pipeline).
+    A copy is checked against the ring afterwards, so it is never torn.
+
+    read() rides out camera outages: it keeps waiting while the grabber
+    reconnects, and when a restarted grabber recreates the ring it reattaches
+    (checked every `reattach_s` without frames). It returns (False, None) only
+    once the ring is marked ended, or after `timeout` seconds without a frame
+    when a timeout is given.
+    """
+
+    def __init__(self, ring: FrameRing, copy: bool = False, timeout: Optional[float] = None,
+                 reattach_s: float = 1.0):
+        self.ring = ring
+        self.copy = copy
+        self.timeout = timeout
+        self.reattach_s = reattach_s
+        self.seq = ring.last_seq - 1 if ring.last_seq else 0
+        self.skipped = 0
+        self.reattached = 0
+
+    @classmethod
+    def open(cls, camera_id: str, timeout: Optional[float] = None, attach_timeout: Optional[float] = None,
+             **kwargs) -> "RingCapture":
+        """Attach to a camera's ring, waiting up to `attach_timeout` (default `timeout`; None:
+        forever) for its grabber; raises FileNotFoundError when it never shows up."""
+        wait = timeout if attach_timeout is None else attach_timeout
+        return cls(FrameRing.attach(ring_name(camera_id), timeout=wait), timeout=timeout, **kwargs)
+
+    def isOpened(self) -> bool:
+        return self.ring is not None
+
+    def is_valid(self) -> bool:
+        """False once the writer has reused the slot of the last frame read() returned."""
+        return self.ring is not None and self.ring.is_valid(self.seq)
+
+    def _reattach(self) -> bool:
+        try:
+            ring = FrameRing.attach(self.ring.name)
+        except (FileNotFoundError, ValueError):
+            return False  # grabber down (or mid-create): keep waiting
+        if ring.generation == self.ring.generation:
+            ring.close()
+            return False
+        self.ring.close()
+        self.ring, self.seq = ring, 0
+        self.reattached += 1
+        return True
+
+    def read(self):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            wait = self.reattach_s if deadline is None else min(self.reattach_s, max(0.0, deadline - time.monotonic()))
+            got = self.ring.wait_next(self.seq, wait)
+            if got is None:
+                if self._reattach():
+                    continue
+                if self.ring.ended or (deadline is not None and time.monotonic() >= deadline):
+                    return False, None
+                continue
+            seq, _, view = got
+            frame = view[:, :, 0] if view.shape[2] == 1 else view
+            if self.copy:
+                frame = frame.copy()
+                if not self.ring.is_valid(seq):
+                    continue  # the grabber lapped the slot mid-copy (torn frame): take the newer one
+            break
+        self.skipped += self.ring.dropped_since(self.seq) if self.seq else 0
+        self.seq = seq
+        return True, frame
+
+    def release(self) -> None:
+        if self.ring is not None:
+            self.ring.close(); self.ring = None
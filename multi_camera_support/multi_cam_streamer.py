@@ -1,9 +1,31 @@
 import os
 
+from multi_camera_support.frame_ring import FrameRing, ring_name
+
 def get_mock_camera_feeds():
     base_dir = os.path.join("logs", "feeds")
     return [
         os.path.join(base_dir, "cam1_feed.jpg"),
         os.path.join(base_dir, "cam2_feed.jpg"),
         os.path.join(base_dir, "cam3_feed.jpg"),
-    ]
\ No newline at end of file
+    ]
+
+def latest_frames(camera_ids):
+    """{camera_id: (seq, ts, frame)} for every camera whose grabber ring is live.
+    Frames are copied (and re-checked against the ring) because preview callers
+    keep them longer than the ring keeps a slot."""
+    out = {}
+    for cid in camera_ids:
+        try:
+            ring = FrameRing.attach(ring_name(cid))
+        except FileNotFoundError:
+            continue
+        for _ in range(3):
+            got = ring.latest()
+            if got is None: continue
+            frame = got[2].copy()
+            if ring.is_valid(got[0]):
+                out[cid] = (got[0], got[1], frame); break
+        got = None  # drop the view so the mapping can close
+        ring.close()
+    return out
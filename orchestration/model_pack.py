@@ -40,11 +40,21 @@ def select_engine(pack, hw_caps):
     if accel in ("gpu","cuda","jetson"): return "tensorrt"
     if accel in ("intel","xpu","igpu"): return "openvino"
     return "onnxruntime"
-def persist_bench_result(pack_dir, engine, size, fps, latency_ms):
+def bench_config_key(engine, size, batch=1, threads=0, graph_opt="all"):
+    return f"{engine}/{size}/b{int(batch)}/t{int(threads)}/{graph_opt}"
+def persist_bench_result(pack_dir, engine, size, fps, latency_ms, baseline=None, hw="default"):
+    # baseline: stats of an accepted gate run (batch/threads/graph_opt, pXX_ms, pXX_noise_ms...) ->
+    # bench_baseline[hw][config key], which bench/regression_gate.py compares later runs against
     pack=load_model_pack(pack_dir); pack.setdefault("benchmarks",{})
     today=time.strftime("%Y-%m-%d"); pack["benchmarks"].setdefault(today,{})
     pack["benchmarks"][today][engine]={"fps":float(fps),"latency_ms":float(latency_ms),"size":str(size)}
+    if baseline is not None:
+        b=dict(baseline); key=bench_config_key(engine,size,b.get("batch",1),b.get("threads",0),b.get("graph_opt","all"))
+        b.update(engine=engine, size=str(size), fps=float(fps), latency_ms=float(latency_ms), accepted=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        pack.setdefault("bench_baseline",{}).setdefault(hw,{})[key]=b
     save_model_pack(pack_dir, pack)
+def load_bench_baseline(pack_dir, hw="default"):
+    return dict((load_model_pack(pack_dir).get("bench_baseline") or {}).get(hw) or {})
 def deploy_pack(pack_dir, device_id):
     pack=load_model_pack(pack_dir); os.makedirs("deployments", exist_ok=True)
     with open(os.path.join("deployments",f"{device_id}.json"),"w",encoding="utf-8") as f:
@@ -1,7 +1,149 @@
 # model_switcher.py - Reads OTA JSON to switch ONNX model path
-import json
+import json, os, threading, time
+
+import numpy as np
 
 def get_model_path_from_ota(ota_config="ota/update_control.json"):
     with open(ota_config, 'r') as f:
         cfg = json.load(f)
-    return cfg.get("onnx_model_path", "models/defect_detector.onnx")
\ No newline at end of file
+    return cfg.get("onnx_model_path", "models/defect_detector.onnx")
+
+def read_ota(ota_config="ota/update_control.json"):
+    with open(ota_config, 'r') as f:
+        cfg = json.load(f)
+    return {"version": str(cfg.get("version", "")), "path": cfg.get("onnx_model_path", "models/defect_detector.onnx"),
+            "input_size": int(cfg.get("input_size") or 0)}
+
+def ort_session(model_path):
+    from vision_runtime.session_cache import get_session
+    return get_session(model_path)
+
+class _Runner:
+    def __init__(self, sess, path, version):
+        self.sess, self.path, self.version = sess, path, version
+        self.input_name = sess.get_inputs()[0].name
+
+    def __call__(self, blob):
+        return self.sess.run(None, {self.input_name: blob})
+
+    def sample_input(self, shape=None, size=640):
+        """Zeros shaped like live traffic, else like the model input with dynamic
+        N/C/H/W filled in as 1/3/size/size (a 1x1 image breaks most detectors)."""
+        if shape is None:
+            fill = [1, 3, size, size]
+            shape = [d if isinstance(d, int) and d > 0 else (fill[i] if i < 4 else 1)
+                     for i, d in enumerate(self.sess.get_inputs()[0].shape)]
+        return np.zeros(shape, dtype=np.float32)
+
+    def latency_ms(self, blob, runs):
+        samples = []
+        for _ in range(runs):
+            t = time.perf_counter(); self(blob); samples.append((time.perf_counter() - t) * 1000.0)
+        return float(np.median(samples))
+
+class HotSwapModel:
+    """run_model(frame_id, blob) that follows ota/update_control.json without a restart.
+
+    A watcher thread polls the control file; when `onnx_model_path`/`version` change it
+    builds the new session off the inference thread, warms it up on a blob shaped like
+    live traffic and compares its median latency with the current model. Only if that
+    passes is the runner reference swapped, which takes effect on the next frame; a
+    model that fails to load, errors during warm-up or is too slow is rejected and the
+    current one keeps serving. Before the first frame the warm-up blob uses the
+    control file's `input_size`, else `input_size`, for dynamic H/W.
+    """
+
+    def __init__(self, ota_config="ota/update_control.json", session_factory=ort_session, poll_s=2.0,
+                 warmup_runs=5, latency_slack=1.5, max_latency_ms=0.0, min_regression_ms=1.0, input_size=640,
+                 log=print):
+        self.ota_config = ota_config
+        self.session_factory = session_factory
+        self.poll_s = poll_s
+        self.warmup_runs = max(1, int(warmup_runs))
+        self.latency_slack = latency_slack
+        self.max_latency_ms = max_latency_ms
+        self.min_regression_ms = min_regression_ms  # below this, latency differences are timer noise
+        self.input_size = int(input_size)
+        self.log = log
+        cfg = read_ota(ota_config)
+        self._runner = _Runner(session_factory(cfg["path"]), cfg["path"], cfg["version"])
+        self._seen = (cfg["path"], cfg["version"])
+        self._mtime = self._stat()
+        self._last_shape = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.swaps = 0
+        self.rejected = []
+
+    @property
+    def version(self):
+        return self._runner.version
+
+    @property
+    def model_path(self):
+        return self._runner.path
+
+    def __call__(self, frame_id, blob):
+        self._last_shape = blob.shape
+        return self._runner(blob)
+
+    def _stat(self):
+        try:
+            return os.stat(self.ota_config).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, name="ota-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_s):
+            self.check()
+
+    def check(self):
+        """Poll once; returns True if a new model was swapped in."""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            cfg = read_ota(self.ota_config)
+        except (OSError, ValueError) as e:
+            self.log(f"[ota] unreadable control file ({e}); keeping {self.version}")
+            return False
+        if (cfg["path"], cfg["version"]) == self._seen:
+            return False
+        self._seen = (cfg["path"], cfg["version"])
+        return self._try_swap(cfg)
+
+    def _try_swap(self, cfg):
+        old = self._runner
+        try:
+            new = _Runner(self.session_factory(cfg["path"]), cfg["path"], cfg["version"])
+            blob = new.sample_input(self._last_shape, cfg["input_size"] or self.input_size)
+            for _ in range(self.warmup_runs):
+                new(blob)
+            new_ms = new.latency_ms(blob, self.warmup_runs)
+            old_ms = old.latency_ms(blob, self.warmup_runs)
+        except Exception as e:
+            return self._reject(cfg, f"warm-up failed: {e}")
+        if self.max_latency_ms and new_ms > self.max_latency_ms:
+            return self._reject(cfg, f"latency {new_ms:.1f} ms > budget {self.max_latency_ms:.1f} ms")
+        if old_ms > 0 and new_ms > old_ms * self.latency_slack and new_ms - old_ms > self.min_regression_ms:
+            return self._reject(cfg, f"latency {new_ms:.1f} ms > {self.latency_slack}x current {old_ms:.1f} ms")
+        self._runner = new  # atomic reference swap; in-flight calls finish on the old session
+        self.swaps += 1
+        self.log(f"[ota] swapped model {old.version} -> {new.version} ({cfg['path']}, {new_ms:.1f} ms)")
+        return True
+
+    def _reject(self, cfg, reason):
+        self.rejected.append({"version": cfg["version"], "path": cfg["path"], "reason": reason})
+        self.log(f"[ota] rejected {cfg['version']} ({cfg['path']}): {reason}; keeping {self.version}")
+        return False
@@ -1,8 +1,20 @@
 import os, yaml
 
 DEFAULT_STEPS=[{"op":"resize","params":{"w":640,"h":640}}, {"op":"infer","params":{"engine":"onnx"}}]
+DEFAULT_POSTPROCESS={"nms":True,"topk":100,"iou":0.45}
 
 def export_pipeline(steps=DEFAULT_STEPS, out_path="recipes/pipeline.yaml"):
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     with open(out_path,"w") as f: yaml.safe_dump({"steps":steps}, f)
     return out_path
+
+def load_pipeline(path="recipes/pipeline.yaml"):
+    if not os.path.exists(path): return {}
+    with open(path,"r",encoding="utf-8") as f: return yaml.safe_load(f) or {}
+
+def postprocess_settings(cfg=None, path="recipes/pipeline.yaml"):
+    """`postprocess` block of an exported pipeline (nms/topk/iou), with defaults filled in."""
+    cfg=load_pipeline(path) if cfg is None else cfg
+    post=dict(DEFAULT_POSTPROCESS); post.update((cfg or {}).get("postprocess") or {})
+    post["nms"]=bool(post["nms"]); post["topk"]=int(post["topk"]) if post.get("topk") else None; post["iou"]=float(post["iou"])
+    return post
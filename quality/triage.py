@@ -3,9 +3,12 @@ from __future__ import annotations
 from pathlib import Path
 import json, os, glob, hashlib, random, time
 from typing import List, Dict, Any
+from core import db
 from core.db import connect, migrate
+from core.ingest import get_writer, utc_now
 
 TRIAGE_STATE = Path("logs/triage_queue.json")
+_migrated: set = set()  # DB paths whose schema add_triage_item has already applied
 
 def _hash_path(p: str) -> str:
     return hashlib.sha1(p.encode("utf-8")).hexdigest()[:10]
@@ -41,8 +44,12 @@ def save_queue(queue: List[Dict[str, Any]]) -> None:
     with TRIAGE_STATE.open("w", encoding="utf-8") as f:
         json.dump(queue, f, ensure_ascii=False, indent=2)
 
-def add_triage_item(unit_id, score, defect_label, assignee=None, sla_hours=24, note=""):
-    con = connect(); migrate(con)
+def add_triage_item(unit_id, score, defect_label, assignee=None, sla_hours=24, note="", wait=True):
+    """Queue a triage event on the ingest writer; `wait` returns only once it is committed
+    (the dashboard reads it back straight away), bulk callers pass wait=False."""
+    if str(db.DB_PATH) not in _migrated:
+        con = connect(); migrate(con); con.close()
+        _migrated.add(str(db.DB_PATH))
     meta = {
         "score": score,
         "label": defect_label,
@@ -50,9 +57,8 @@ def add_triage_item(unit_id, score, defect_label, assignee=None, sla_hours=24, n
         "sla_h": sla_hours,
         "note": note,
     }
-    con.execute(
-        "INSERT INTO events(ts, device_id, severity, type, message, meta_json) "
-        "VALUES (datetime('now'), 'local', 'info', 'triage_add', ?, json(?))",
-        (f"unit:{unit_id}", json.dumps(meta))
-    )
-    con.commit()
+    writer = get_writer()
+    writer.insert("events", {"ts": utc_now(), "device_id": "local", "severity": "info", "type": "triage_add",
+                             "message": f"unit:{unit_id}", "meta_json": json.dumps(meta, separators=(",", ":"))})
+    if wait:
+        writer.flush()
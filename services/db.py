@@ -1,32 +1,120 @@
 from __future__ import annotations
 import os
 import sqlite3
+import threading
 from pathlib import Path
 from typing import Iterable, Tuple, Any, List, Dict
 
 DB_PATH = str(Path(os.getenv("EDGEKIT_DB_PATH", "data/edgekit.db")).resolve())
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+# Applied once per pooled connection, not per query
+CACHE_SIZE_KB = int(os.getenv("EDGEKIT_DB_CACHE_KB", "16384"))       # page cache per connection
+MMAP_SIZE = int(os.getenv("EDGEKIT_DB_MMAP_BYTES", str(256 << 20)))  # read via mmap instead of read()
+STATEMENT_CACHE = 256                                                # prepared statements kept per connection
+BUSY_TIMEOUT_MS = 5000
+
+
+def _tune(conn: sqlite3.Connection) -> sqlite3.Connection:
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys=ON;")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS};")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB};")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE};")
+    conn.execute("PRAGMA temp_store=MEMORY;")
     return conn
 
+
+def get_conn() -> sqlite3.Connection:
+    """A new writable connection owned by the caller (close it when done)."""
+    return _tune(sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE))
+
+
+class ConnectionPool:
+    """One reusable connection per thread for one database file.
+
+    Each thread's first get() opens and tunes its connection; later calls return
+    the same object, so PRAGMAs run once and sqlite3's per-connection statement
+    cache (STATEMENT_CACHE entries) keeps repeated dashboard queries prepared.
+    `readonly` connections open with mode=ro and query_only, so a dashboard
+    query can never take the write lock.
+    """
+
+    def __init__(self, path: str, readonly: bool = True):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: Dict[int, sqlite3.Connection] = {}  # thread ident -> connection
+        self.opened = 0
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"{Path(self.path).as_uri()}?mode=ro", uri=True,
+                                       cached_statements=STATEMENT_CACHE, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, cached_statements=STATEMENT_CACHE, check_same_thread=False)
+            _tune(conn)
+            if self.readonly:
+                conn.execute("PRAGMA query_only=ON;")
+            self._local.conn = conn
+            with self._lock:
+                # Streamlit runs every rerun on a fresh thread: drop connections of finished threads
+                alive = {t.ident for t in threading.enumerate()}
+                for ident in [i for i in self._conns if i not in alive]:
+                    self._conns.pop(ident).close()
+                self._conns[threading.get_ident()] = conn
+                self.opened += 1
+        return conn
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._conns)
+
+    def close_all(self) -> None:
+        """Close every thread's connection (threads reopen on their next get())."""
+        with self._lock:
+            conns = list(self._conns.values())
+            self._conns = {}
+        for c in conns:
+            c.close()
+        self._local = threading.local()
+
+
+_pools: Dict[Tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def pool(readonly: bool = True) -> ConnectionPool:
+    """The pool for the current DB_PATH (read-only by default)."""
+    key = (DB_PATH, readonly)
+    with _pools_lock:
+        p = _pools.get(key)
+        if p is None:
+            p = _pools[key] = ConnectionPool(DB_PATH, readonly)
+        return p
+
+
+def pooled(readonly: bool = True) -> sqlite3.Connection:
+    """This thread's pooled connection; do not close it."""
+    return pool(readonly).get()
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.close_all()
+
+
 def q_one(sql: str, params: Tuple[Any, ...] = ()) -> Any:
-    with get_conn() as conn:
-        cur = conn.execute(sql, params)
-        row = cur.fetchone()
-        return None if row is None else (row[0] if len(row.keys()) == 1 else dict(row))
+    row = pooled().execute(sql, params).fetchone()
+    return None if row is None else (row[0] if len(row.keys()) == 1 else dict(row))
 
 def q_all(sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
-    with get_conn() as conn:
-        cur = conn.execute(sql, params)
-        return [dict(r) for r in cur.fetchall()]
+    return [dict(r) for r in pooled().execute(sql, params).fetchall()]
 
 def q_iter(sql: str, params: Tuple[Any, ...] = ()) -> Iterable[sqlite3.Row]:
-    conn = get_conn()
-    try:
-        for row in conn.execute(sql, params):
-            yield row
-    finally:
-        conn.close()
+    yield from pooled().execute(sql, params)
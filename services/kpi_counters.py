@@ -0,0 +1,191 @@
+"""KPI counters kept current by triggers, so dashboards never COUNT(*) the fact tables.
+
+kpi_counters holds one row per (metric, device_id, day) plus a ('*', '*') grand
+total per metric. AFTER INSERT/DELETE/UPDATE triggers on the fact tables adjust
+both rows in the writer's own transaction, whichever script does the writing, so
+build_kpis() reads a handful of primary-key rows however large the tables grow.
+
+max_ts only moves forward: deleting the newest rows leaves it stale until
+repair() recomputes every counter from the fact tables.
+
+    python -m services.kpi_counters install   # create table + triggers, backfill (once)
+    python -m services.kpi_counters check     # drift between counters and COUNT(*)
+    python -m services.kpi_counters repair    # rebuild the counters from scratch
+
+Installing takes the write lock for a full recount, so it is an operator step
+(this CLI or `src/cli.py kpi-repair`), never done from a dashboard read; until
+then build_kpis() scans the fact tables.
+"""
+from __future__ import annotations
+import argparse, sqlite3
+from typing import Any, Dict, List, Optional
+
+# metric -> (fact table, row condition with {r} for NEW/OLD, or None)
+METRICS = {
+    "readings": ("sensor_readings", None),
+    "inferences": ("inference_events", None),
+    "anomalies": ("anomalies", None),
+    "quality": ("quality_results", None),
+    "quality_passed": ("quality_results", "{r}.passed = 1"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kpi_counters (
+  metric TEXT NOT NULL,
+  device_id TEXT NOT NULL,   -- '*' for the all-devices total
+  day TEXT NOT NULL,         -- YYYY-MM-DD of ts, '*' for the all-days total
+  n INTEGER NOT NULL DEFAULT 0,
+  max_ts TEXT,
+  PRIMARY KEY (metric, device_id, day)
+) WITHOUT ROWID;
+"""
+
+_KEYS = (("{r}.device_id", "substr({r}.ts, 1, 10)"), ("'*'", "'*'"))
+
+
+def _inc(metric: str, cond: Optional[str], r: str) -> str:
+    where = cond.format(r=r) if cond else "1"
+    return "".join(
+        f"INSERT INTO kpi_counters(metric, device_id, day, n, max_ts) "
+        f"SELECT '{metric}', {dev.format(r=r)}, {day.format(r=r)}, 1, {r}.ts WHERE {where} "
+        f"ON CONFLICT(metric, device_id, day) DO UPDATE SET n = n + 1, "
+        f"max_ts = max(COALESCE(max_ts, ''), COALESCE(excluded.max_ts, ''));\n"
+        for dev, day in _KEYS)
+
+
+def _dec(metric: str, cond: Optional[str], r: str) -> str:
+    extra = f" AND {cond.format(r=r)}" if cond else ""
+    return "".join(
+        f"UPDATE kpi_counters SET n = n - 1 WHERE metric = '{metric}' AND device_id = {dev.format(r=r)} "
+        f"AND day = {day.format(r=r)}{extra};\n"
+        for dev, day in _KEYS)
+
+
+def trigger_sql(metric: str, table: str, cond: Optional[str]) -> str:
+    watched = "ts, device_id" + (", passed" if cond and "passed" in cond else "")
+    return (f"CREATE TRIGGER IF NOT EXISTS kpi_{metric}_ins AFTER INSERT ON {table} BEGIN\n"
+            f"{_inc(metric, cond, 'NEW')}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS kpi_{metric}_del AFTER DELETE ON {table} BEGIN\n"
+            f"{_dec(metric, cond, 'OLD')}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS kpi_{metric}_upd AFTER UPDATE OF {watched} ON {table} BEGIN\n"
+            f"{_dec(metric, cond, 'OLD')}{_inc(metric, cond, 'NEW')}END;\n")
+
+
+def _columns(conn, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _tracked(conn) -> Dict[str, tuple]:
+    """Metrics whose fact table exists with the columns the triggers need."""
+    out = {}
+    for metric, (table, cond) in METRICS.items():
+        need = {"ts", "device_id"} | ({"passed"} if cond and "passed" in cond else set())
+        if need <= _columns(conn, table):
+            out[metric] = (table, cond)
+    return out
+
+
+def installed(conn) -> bool:
+    """True when kpi_counters and the triggers of every tracked metric exist."""
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE name GLOB 'kpi_*'")}
+    if "kpi_counters" not in names:
+        return False
+    return all(f"kpi_{metric}_{op}" in names for metric in _tracked(conn) for op in ("ins", "del", "upd"))
+
+
+def install(conn) -> None:
+    """Create kpi_counters and its triggers; backfills the counters the first time."""
+    fresh = not installed(conn)
+    with conn:
+        conn.executescript(SCHEMA)
+        for metric, (table, cond) in _tracked(conn).items():
+            conn.executescript(trigger_sql(metric, table, cond))
+    if fresh:
+        repair(conn)
+
+
+def repair(conn) -> Dict[str, int]:
+    """Recompute every counter from the fact tables in one write transaction."""
+    conn.executescript(SCHEMA)
+    tracked = _tracked(conn)
+    conn.execute("BEGIN IMMEDIATE")  # writers wait, so no trigger update is lost in between
+    try:
+        conn.execute("DELETE FROM kpi_counters")
+        for metric, (table, cond) in tracked.items():
+            where = f"WHERE {cond.format(r=table)}" if cond else ""
+            conn.execute(f"INSERT INTO kpi_counters(metric, device_id, day, n, max_ts) "
+                         f"SELECT '{metric}', device_id, substr(ts, 1, 10), COUNT(*), MAX(ts) FROM {table} {where} "
+                         f"GROUP BY 2, 3")
+            conn.execute("INSERT INTO kpi_counters(metric, device_id, day, n, max_ts) "
+                         "SELECT ?, '*', '*', COALESCE(SUM(n), 0), MAX(max_ts) FROM kpi_counters WHERE metric = ?",
+                         (metric, metric))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return totals(conn)
+
+
+def totals(conn) -> Dict[str, int]:
+    return {r[0]: r[1] for r in conn.execute(
+        "SELECT metric, n FROM kpi_counters WHERE device_id = '*' AND day = '*'")}
+
+
+def last_ts(conn, metric: str = "readings") -> Optional[str]:
+    row = conn.execute("SELECT max_ts FROM kpi_counters WHERE metric = ? AND device_id = '*' AND day = '*'",
+                       (metric,)).fetchone()
+    return row[0] if row else None
+
+
+def by_day(conn, metric: str, device_id: Optional[str] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-day counts of `metric` (one device, or summed over devices)."""
+    sql = ("SELECT day, SUM(n) AS n, MAX(max_ts) AS max_ts FROM kpi_counters "
+           "WHERE metric = ? AND day != '*' AND device_id != '*'")
+    params: list = [metric]
+    if device_id is not None:
+        sql += " AND device_id = ?"; params.append(device_id)
+    if since is not None:
+        sql += " AND day >= ?"; params.append(since)
+    return [dict(zip(("day", "n", "max_ts"), r)) for r in conn.execute(sql + " GROUP BY day ORDER BY day", params)]
+
+
+def check(conn) -> Dict[str, Dict[str, int]]:
+    """{metric: {"counter": n, "actual": COUNT(*)}} for every metric that drifted (a full scan)."""
+    have = totals(conn)
+    drift = {}
+    for metric, (table, cond) in _tracked(conn).items():
+        where = f"WHERE {cond.format(r=table)}" if cond else ""
+        actual = conn.execute(f"SELECT COUNT(*) FROM {table} {where}").fetchone()[0]
+        if have.get(metric) != actual:
+            drift[metric] = {"counter": have.get(metric), "actual": actual}
+    return drift
+
+
+def main(argv=None):
+    from services import db
+    ap = argparse.ArgumentParser(description="KPI counter maintenance")
+    ap.add_argument("action", choices=["install", "check", "repair"])
+    ap.add_argument("--db", default=None, help="Database file (default: services.db.DB_PATH)")
+    args = ap.parse_args(argv)
+    conn = sqlite3.connect(args.db or db.DB_PATH, isolation_level=None)
+    try:
+        if args.action == "install":
+            install(conn)
+            print(f"[kpi] installed: {totals(conn)}")
+        elif args.action == "check":
+            drift = check(conn)
+            print(f"[kpi] drift: {drift}" if drift else "[kpi] counters match the tables")
+            return 1 if drift else 0
+        elif not installed(conn):
+            install(conn)  # counters without their triggers would drift straight away
+            print(f"[kpi] installed: {totals(conn)}")
+        else:
+            before = check(conn)
+            print(f"[kpi] repaired: {repair(conn)}" + (f" (was off: {before})" if before else ""))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,7 +3,8 @@ from typing import Dict, Any, Optional, List
 import sqlite3
 from dataclasses import dataclass, asdict
 
-from services.db import get_conn
+from services import kpi_counters
+from services.db import pooled
 
 @dataclass
 class KpiReport:
@@ -21,9 +22,20 @@ class KpiReport:
         return asdict(self)
 
 
+def _counter_totals(cur) -> Optional[Dict[str, Any]]:
+    """Grand totals from kpi_counters; None to fall back to scans while the counters are
+    not installed (`python -m services.kpi_counters install` / `src/cli.py kpi-repair`)."""
+    if not kpi_counters.installed(cur.connection):
+        return None
+    cur.execute("SELECT metric, n, max_ts FROM kpi_counters WHERE device_id = '*' AND day = '*'")
+    rows = cur.fetchall()
+    out: Dict[str, Any] = {r[0]: r[1] for r in rows}
+    out["last_ingest_ts"] = next((r[2] for r in rows if r[0] == "readings"), None)
+    return out
+
+
 def build_kpis() -> KpiReport:
-    conn = get_conn()
-    cur = conn.cursor()
+    cur = pooled().cursor()  # this thread's read-only connection, reused across reruns
 
     def _fetch_one(sql: str, params=()):
         cur.execute(sql, params)
@@ -35,20 +47,28 @@ def build_kpis() -> KpiReport:
         SELECT COUNT(*) FROM devices
         WHERE last_seen_ts >= datetime('now', '-1 day')
     """) or 0
-    total_readings = _fetch_one("SELECT COUNT(*) FROM sensor_readings") or 0
-    total_inferences = _fetch_one("SELECT COUNT(*) FROM inference_events") or 0
-    total_anomalies = _fetch_one("SELECT COUNT(*) FROM anomalies") or 0
-    total_quality = _fetch_one("SELECT COUNT(*) FROM quality_results") or 0
-    passed = _fetch_one("SELECT COUNT(*) FROM quality_results WHERE passed=1") or 0
+    totals = _counter_totals(cur)
+    if totals is not None:
+        # O(1): the ('*', '*') rows kept current by the kpi_counters triggers
+        total_readings = totals.get("readings", 0)
+        total_inferences = totals.get("inferences", 0)
+        total_anomalies = totals.get("anomalies", 0)
+        total_quality = totals.get("quality", 0)
+        passed = totals.get("quality_passed", 0)
+        last_ingest_ts = totals.get("last_ingest_ts")
+    else:
+        total_readings = _fetch_one("SELECT COUNT(*) FROM sensor_readings") or 0
+        total_inferences = _fetch_one("SELECT COUNT(*) FROM inference_events") or 0
+        total_anomalies = _fetch_one("SELECT COUNT(*) FROM anomalies") or 0
+        total_quality = _fetch_one("SELECT COUNT(*) FROM quality_results") or 0
+        passed = _fetch_one("SELECT COUNT(*) FROM quality_results WHERE passed=1") or 0
+        last_ingest_ts = _fetch_one("SELECT MAX(ts) FROM sensor_readings")
 
     yield_rate = (passed / total_quality * 100.0) if total_quality else 0.0
-    last_ingest_ts = _fetch_one("SELECT MAX(ts) FROM sensor_readings")
 
     cur.execute("SELECT device_id FROM devices ORDER BY device_id LIMIT 5")
     sample_devices = [r[0] for r in cur.fetchall()]
 
-    conn.close()
-
     return KpiReport(
         total_devices=total_devices,
         active_devices_24h=active_devices_24h,
@@ -19,6 +19,53 @@ def main():
     p_batch.add_argument("--infile", default="data/collector/events.jsonl")
     p_batch.add_argument("--outdir", default="data/batches")
 
+    p_gate = sub.add_parser("bench-gate", help="Benchmark a model pack and fail on regression vs its baseline")
+    p_gate.add_argument("pack", help="Model pack directory (modelpack.yaml)")
+    p_gate.add_argument("--sizes", default="640", help="Comma-separated square input sizes")
+    p_gate.add_argument("--batches", default="1", help="Comma-separated batch sizes")
+    p_gate.add_argument("--threads", default="0", help="Comma-separated intra-op thread counts (0 = ORT default)")
+    p_gate.add_argument("--opt", default="all", help="Comma-separated graph optimization levels")
+    p_gate.add_argument("--trials", type=int, default=5, help="Independent trials per configuration (noise estimate)")
+    p_gate.add_argument("--warmup", type=int, default=5)
+    p_gate.add_argument("--repeats", type=int, default=30, help="Timed runs per trial")
+    p_gate.add_argument("--metrics", default="p50,p99", help="Percentiles to gate on (p50,p95,p99)")
+    p_gate.add_argument("--k", type=float, default=3.0, help="Allowed slowdown in combined trial standard deviations")
+    p_gate.add_argument("--min-rel", type=float, default=0.05, help="Slowdowns below this fraction always pass")
+    p_gate.add_argument("--min-abs-ms", type=float, default=0.1, help="Slowdowns below this many ms always pass")
+    p_gate.add_argument("--accept", action="store_true", help="Record this run as the pack's baseline")
+    p_gate.add_argument("--report", default=None, help="Write the comparison as JSON")
+    p_gate.add_argument("--device-id", default="local")
+    p_gate.add_argument("--no-record", action="store_true", help="Do not write runs to the benchmarks table")
+
+    p_infer = sub.add_parser("infer-dir", help="Score every image under a directory (resumable)")
+    p_infer.add_argument("root", help="Image directory (searched recursively)")
+    p_infer.add_argument("--model", required=True, help="Model pack directory (modelpack.yaml) or .onnx file")
+    p_infer.add_argument("--out", default="data/infer/results.sqlite", help="SQLite file or Parquet dataset directory")
+    p_infer.add_argument("--format", choices=["sqlite", "parquet"], default="sqlite")
+    p_infer.add_argument("--batch", type=int, default=8, help="Images per model call (a static model batch wins)")
+    p_infer.add_argument("--workers", type=int, default=None, help="Decode processes (default cores - 1; 0 = inline)")
+    p_infer.add_argument("--size", type=int, default=None, help="Square input size (default: the model's)")
+    p_infer.add_argument("--conf", type=float, default=0.5, help="Confidence threshold")
+    p_infer.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = ORT default)")
+    p_infer.add_argument("--opt", default="all", help="Graph optimization level")
+    p_infer.add_argument("--commit-every", type=int, default=1024, help="Images per committed checkpoint")
+    p_infer.add_argument("--limit", type=int, default=None, help="Stop after this many new images")
+    p_infer.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines")
+
+    p_kpi = sub.add_parser("kpi-repair", help="Install (first run) or recompute the KPI counters from the fact tables")
+    p_kpi.add_argument("--db", default=None, help="Database file (default: EDGEKIT_DB_PATH)")
+    p_kpi.add_argument("--check", action="store_true", help="Only report drift (exit 1 if any)")
+
+    p_roll = sub.add_parser("rollup-backfill", help="Rebuild the minute/hour/day inspection rollups")
+    p_roll.add_argument("--db", default=None, help="Database file (default: data/edge.db)")
+    p_roll.add_argument("--since", default=None, help="Only rebuild whole days from this date on")
+
+    p_part = sub.add_parser("sensor-retention", help="Maintain sensor_readings partitions and drop expired ones")
+    p_part.add_argument("--db", default=None, help="Database file (default: data/edge.db)")
+    p_part.add_argument("--keep-days", type=int, default=None,
+                        help="Drop partitions older than this many days (default EDGEKIT_SENSOR_KEEP_DAYS, else 0: keep everything)")
+    p_part.add_argument("--ahead", type=int, default=2, help="Upcoming partitions to pre-create")
+
     args = ap.parse_args()
     if args.cmd == "version":
         print("sintrones-edge-ai CLI (stub) v0.0.0")
@@ -30,6 +77,28 @@ def main():
         mod = importlib.import_module("src.batcher")
         sys.argv = ["batcher.py", "--infile", args.infile, "--outdir", args.outdir]
         mod.main()
+    elif args.cmd == "bench-gate":
+        mod = importlib.import_module("bench.regression_gate")
+        ints = lambda text: [int(v) for v in text.split(",") if v.strip()]
+        sys.exit(mod.run_gate(args.pack, ints(args.sizes), ints(args.batches), ints(args.threads),
+                              [o for o in args.opt.split(",") if o], args.trials, args.warmup, args.repeats,
+                              [m for m in args.metrics.split(",") if m], args.k, args.min_rel, args.min_abs_ms, args.accept,
+                              args.device_id, not args.no_record, args.report))
+    elif args.cmd == "infer-dir":
+        from bench.ort_benchmark import resolve_model
+        mod = importlib.import_module("ai_workflow.inference_kit")
+        mod.infer_dir(resolve_model(args.model), args.root, args.out, args.format, args.batch, args.workers,
+                      args.size, args.conf, args.threads, args.opt, args.commit_every, args.limit, args.report_every)
+    elif args.cmd == "kpi-repair":
+        mod = importlib.import_module("services.kpi_counters")
+        sys.exit(mod.main(["check" if args.check else "repair"] + (["--db", args.db] if args.db else [])))
+    elif args.cmd == "rollup-backfill":
+        mod = importlib.import_module("core.rollups")
+        sys.exit(mod.main(["backfill"] + (["--db", args.db] if args.db else []) + (["--since", args.since] if args.since else [])))
+    elif args.cmd == "sensor-retention":
+        mod = importlib.import_module("core.partitions")
+        sys.exit(mod.main(["maintain", "--ahead", str(args.ahead)] + (["--db", args.db] if args.db else [])
+                          + (["--keep-days", str(args.keep_days)] if args.keep_days is not None else [])))
     else:
         ap.print_help()
 
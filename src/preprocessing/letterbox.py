@@ -0,0 +1,65 @@
+# Letterbox preprocessor with preallocated canvas/blob buffers (same output as preprocess_bgr)
+from __future__ import annotations
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114
+_INV = np.float32(255.0)
+
+
+class _Buffers:
+    __slots__ = ("canvas", "blob", "region")
+
+    def __init__(self, size: Tuple[int, int]):
+        self.canvas = np.full((size[0], size[1], 3), PAD_VALUE, dtype=np.uint8)
+        self.blob = np.empty((1, 3, size[0], size[1]), dtype=np.float32)
+        self.region = (size[0], size[1])  # area last written by resize; padding is valid outside it
+
+
+class LetterboxPreprocessor:
+    """Resize-with-padding into reusable buffers.
+
+    Output is bit-identical to `preprocess_bgr` (BGR->RGB, NCHW, float32/255) but
+    nothing is allocated per frame: cv2.resize writes straight into the canvas and
+    the colour swap, transpose and normalisation are fused into one divide per channel.
+
+    The returned blob is a view of an internal buffer and is overwritten after
+    `pool` further calls; keep pool >= frames in flight (e.g. queue size + 2 when
+    the preprocess and infer stages run on different threads).
+    """
+
+    def __init__(self, size: Tuple[int, int] = (640, 640), pool: int = 1):
+        self.size = (int(size[0]), int(size[1]))
+        self.pool = max(1, int(pool))
+        self._sets: Dict[Tuple[int, int], List[_Buffers]] = {}
+        self._next = 0
+
+    def _buffers(self, size: Tuple[int, int]) -> _Buffers:
+        sets = self._sets.get(size)
+        if sets is None:
+            sets = self._sets[size] = [_Buffers(size) for _ in range(self.pool)]
+        buf = sets[self._next % self.pool]
+        self._next += 1
+        return buf
+
+    def __call__(self, img: np.ndarray, size: Tuple[int, int] = None, out: np.ndarray = None):
+        """Letterbox `img`; with `out` (a 3xHxW float32 view, e.g. one slot of a batch)
+        the normalised planes are written there instead of the internal blob."""
+        size = self.size if size is None else (int(size[0]), int(size[1]))
+        ih, iw = img.shape[:2]
+        scale = min(size[0]/ih, size[1]/iw)
+        nh, nw = int(ih*scale), int(iw*scale)
+        buf = self._buffers(size)
+        canvas = buf.canvas
+        if buf.region != (nh, nw):
+            # Source aspect changed: padding that used to be image must be reset
+            canvas.fill(PAD_VALUE)
+            buf.region = (nh, nw)
+        cv2.resize(img, (nw, nh), dst=canvas[:nh, :nw])
+        blob = buf.blob if out is None else out
+        planes = blob[0] if out is None else out
+        for c in range(3):
+            np.divide(canvas[:, :, 2 - c], _INV, out=planes[c])
+        return blob, scale
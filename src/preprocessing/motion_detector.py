@@ -1,5 +1,80 @@
+# Motion gating: skip inference on frames where the scene has not changed
+import time
 
-# Motion Detection Placeholder
-def detect_motion(frame):
-    # Dummy motion detection logic
-    return True  # or False if no motion
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap change detector on a downscaled, blurred grayscale copy of each frame.
+
+    The frame is compared against a running-average background (frame differencing
+    with memory, so slow drifts like lighting are absorbed). A frame passes when more
+    than `min_area` of its pixels differ by more than `pixel_threshold` grey levels.
+    `keepalive_s` forces one frame through at least that often even on a still scene,
+    so downstream consumers keep seeing fresh results.
+    """
+
+    def __init__(self, min_area=0.005, pixel_threshold=25, width=160, bg_alpha=0.05,
+                 keepalive_s=2.0, clock=time.monotonic):
+        self.min_area = float(min_area)
+        self.pixel_threshold = int(pixel_threshold)
+        self.width = int(width)
+        self.bg_alpha = float(bg_alpha)
+        self.keepalive_s = float(keepalive_s)
+        self.clock = clock
+        self._bg = None
+        self._last_pass = None
+        self.last_score = 0.0
+        self.counters = {"frames": 0, "passed": 0, "skipped": 0, "keepalive": 0}
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, int(round(h * self.width / w))))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def score(self, frame):
+        """Fraction of (downscaled) pixels that changed versus the background."""
+        gray = self._small_gray(frame)
+        if self._bg is None or self._bg.shape != gray.shape:
+            self._bg = gray.astype(np.float32)
+            return 1.0
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._bg))
+        changed = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        cv2.accumulateWeighted(gray, self._bg, self.bg_alpha)
+        return changed
+
+    def __call__(self, frame):
+        """True if the frame should go through inference."""
+        now = self.clock()
+        self.counters["frames"] += 1
+        self.last_score = self.score(frame)
+        keep = self.last_score >= self.min_area
+        if not keep and self.keepalive_s > 0 and (self._last_pass is None or now - self._last_pass >= self.keepalive_s):
+            keep = True
+            self.counters["keepalive"] += 1
+        if keep:
+            self.counters["passed"] += 1
+            self._last_pass = now
+        else:
+            self.counters["skipped"] += 1
+        return keep
+
+    def skip_ratio(self):
+        return self.counters["skipped"] / self.counters["frames"] if self.counters["frames"] else 0.0
+
+    def format_stats(self):
+        c = self.counters
+        return (f"[motion] frames={c['frames']} inferred={c['passed']} skipped={c['skipped']} "
+                f"keepalive={c['keepalive']} saved={100.0 * self.skip_ratio():.1f}%")
+
+
+def detect_motion(frame, prev_frame=None, min_area=0.005, pixel_threshold=25):
+    """Stateless check between two frames; True when there is no reference frame."""
+    if prev_frame is None:
+        return True
+    gate = MotionGate(min_area=min_area, pixel_threshold=pixel_threshold, bg_alpha=0.0, keepalive_s=0)
+    gate.score(prev_frame)
+    return gate.score(frame) >= min_area
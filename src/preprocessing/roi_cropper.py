@@ -1,4 +1,76 @@
-
 # Region of Interest Cropper
+import os
+
+import numpy as np
+import yaml
+
+from src.preprocessing.letterbox import LetterboxPreprocessor
+
+
 def crop_roi(frame, x=100, y=100, w=300, h=300):
     return frame[y:y+h, x:x+w]
+
+
+def _read_yaml(path):
+    if not path or not os.path.exists(path): return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_rois(camera=None, cameras_path="config/cameras.yaml", recipe_path="recipes/pipeline.yaml"):
+    """ROI set for a camera: `rois` on its entry in config/cameras.yaml, else
+    `preprocess.rois` from the pipeline recipe. Each ROI is {name, x, y, w, h}."""
+    rois = None
+    for cam in (_read_yaml(cameras_path).get("cameras") or []):
+        if camera is not None and cam.get("id") == camera and cam.get("rois"):
+            rois = cam["rois"]
+    if rois is None:
+        rois = (_read_yaml(recipe_path).get("preprocess") or {}).get("rois") or []
+    out = []
+    for i, r in enumerate(rois):
+        out.append({"name": str(r.get("name", f"roi{i}")), "x": int(r["x"]), "y": int(r["y"]),
+                    "w": int(r["w"]), "h": int(r["h"])})
+    return out
+
+
+class ROIBatcher:
+    """Crop every ROI of a frame and letterbox it into one preallocated NxCxHxW batch.
+
+    Crops are views of the frame (no copy); each ROI keeps its own canvas so the
+    padding is only reset when the ROI geometry changes. The batch is reused on
+    every call, with `pool` rotating copies for pipelined use.
+    """
+
+    def __init__(self, rois, size=(640, 640), pool=1):
+        if not rois:
+            raise ValueError("ROIBatcher needs at least one ROI")
+        self.rois = list(rois)
+        self.size = (int(size[0]), int(size[1]))
+        self._pre = [LetterboxPreprocessor(self.size) for _ in self.rois]
+        self._batches = [np.empty((len(self.rois), 3) + self.size, dtype=np.float32) for _ in range(max(1, int(pool)))]
+        self._next = 0
+
+    def clip(self, roi, frame_shape):
+        fh, fw = frame_shape[:2]
+        x0, y0 = min(max(roi["x"], 0), fw - 1), min(max(roi["y"], 0), fh - 1)
+        x1, y1 = min(roi["x"] + roi["w"], fw), min(roi["y"] + roi["h"], fh)
+        return x0, y0, max(x1 - x0, 1), max(y1 - y0, 1)
+
+    def __call__(self, frame):
+        """Returns (batch, meta); meta holds (x0, y0, scale) per ROI for mapping back."""
+        batch = self._batches[self._next % len(self._batches)]; self._next += 1
+        meta = []
+        for i, roi in enumerate(self.rois):
+            x, y, w, h = self.clip(roi, frame.shape)
+            _, scale = self._pre[i](crop_roi(frame, x, y, w, h), out=batch[i])
+            meta.append((x, y, scale))
+        return batch, meta
+
+    def to_frame(self, per_roi_dets, meta):
+        """Shift ROI-local detections (already divided by scale) into frame coordinates."""
+        dets = []
+        for roi, (x0, y0, _), roi_dets in zip(self.rois, meta, per_roi_dets):
+            for d in roi_dets:
+                b = d["bbox"]
+                dets.append(dict(d, bbox=[b[0] + x0, b[1] + y0, b[2], b[3]], roi=roi["name"]))
+        return dets
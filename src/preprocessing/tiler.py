@@ -0,0 +1,74 @@
+# Tiled inference for high-resolution / line-scan frames
+import numpy as np
+
+from src.preprocessing.roi_cropper import ROIBatcher
+from vision_runtime.postprocess import merge_detections, split_outputs
+
+
+def tile_origins(length, tile, stride):
+    """Start offsets along one axis; the last tile is pinned to the far edge."""
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def tile_grid(h, w, tile=640, overlap=0.2):
+    """Overlapping tile rectangles covering an h x w frame, as ROI dicts."""
+    stride = max(1, int(round(tile * (1.0 - overlap))))
+    return [{"name": f"tile{r}_{c}", "x": x, "y": y, "w": min(tile, w), "h": min(tile, h)}
+            for r, y in enumerate(tile_origins(h, tile, stride))
+            for c, x in enumerate(tile_origins(w, tile, stride))]
+
+
+class TileBatcher:
+    """Split a frame into overlapping tiles at native resolution and batch them.
+
+    Tiles smaller than `tile` (frame edge) are letterboxed; everything else is a
+    1:1 crop, so small defects keep their pixels. Batch buffers are cached per
+    frame size.
+    """
+
+    def __init__(self, tile=640, overlap=0.2, pool=1):
+        if not 0.0 <= overlap < 1.0:
+            raise ValueError("tile overlap must be in [0, 1)")
+        self.tile = int(tile)
+        self.overlap = float(overlap)
+        self.pool = pool
+        self._batchers = {}
+
+    def _batcher(self, shape):
+        key = shape[:2]
+        if key not in self._batchers:
+            self._batchers[key] = ROIBatcher(tile_grid(key[0], key[1], self.tile, self.overlap),
+                                             (self.tile, self.tile), pool=self.pool)
+        return self._batchers[key]
+
+    def __call__(self, frame):
+        batcher = self._batcher(frame.shape)
+        batch, meta = batcher(frame)
+        return batch, (batcher, meta)
+
+    def to_frame(self, per_tile_dets, ctx, iou_th=0.45, topk=None):
+        """Shift per-tile detections into frame coordinates and run cross-tile NMS."""
+        batcher, meta = ctx
+        dets = [{k: v for k, v in d.items() if k != "roi"} for d in batcher.to_frame(per_tile_dets, meta)]
+        return merge_detections(dets, iou_th=iou_th, topk=topk)
+
+
+def run_chunked(run_model, max_batch):
+    """Wrap run_model(frame_id, blob) so large tile batches go through in chunks of
+    `max_batch`; per-row outputs are re-assembled along axis 0."""
+    if not max_batch or max_batch <= 0:
+        return run_model
+
+    def run(frame_id, blob):
+        if blob.shape[0] <= max_batch:
+            return run_model(frame_id, blob)
+        rows = []
+        for start in range(0, blob.shape[0], max_batch):
+            chunk = blob[start:start + max_batch]
+            rows.extend(split_outputs(run_model(frame_id, chunk), [1] * chunk.shape[0]))
+        return [np.concatenate([r[j] for r in rows], axis=0) for j in range(len(rows[0]))]
+    return run
@@ -0,0 +1,52 @@
+import json
+import sqlite3
+
+from modules.runtime_autotuner.autotuner import DbDecisionLog, LatencyAutotuner
+
+
+def _feed(tuner, ms, frames):
+    return [d for d in (tuner.observe(ms) for _ in range(frames)) if d is not None]
+
+
+def test_degrades_in_order_then_recovers_with_headroom():
+    applied = []
+    tuner = LatencyAutotuner(40, resolutions=(960, 640, 480), threads=(2, 4), strides=(1, 2),
+                             window=10, patience=2, settle=0, apply=applied.append)
+    assert (tuner.state.resolution, tuner.state.threads, tuner.state.stride) == (960, 2, 1)
+    down = _feed(tuner, 80.0, 40)
+    assert [(d.knob, getattr(d.after, d.knob)) for d in down] == [("threads", 4), ("resolution", 640),
+                                                                  ("resolution", 480), ("stride", 2)]
+    assert _feed(tuner, 80.0, 10) == []  # every ladder exhausted
+    assert _feed(tuner, 35.0, 30) == []  # inside budget but no headroom
+    up = _feed(tuner, 10.0, 40)
+    assert [d.knob for d in up] == ["stride", "resolution"]
+    assert applied[-1] == tuner.state and tuner.should_process(1)
+
+
+def test_failed_upgrade_doubles_patience():
+    tuner = LatencyAutotuner(40, resolutions=(960, 640), window=5, patience=1, settle=0, strides=(1,))
+    _feed(tuner, 80.0, 5)
+    assert _feed(tuner, 10.0, 5)[0].action == "upgrade"
+    assert _feed(tuner, 80.0, 5)[0].action == "degrade"
+    assert _feed(tuner, 10.0, 5) == []  # patience for resolution is now 2 windows
+    assert _feed(tuner, 10.0, 5)[0].knob == "resolution"
+
+
+def test_decisions_are_logged_to_events_and_benchmarks(tmp_path, monkeypatch):
+    import core.db
+    monkeypatch.setattr(core.db, "DB_PATH", tmp_path / "edge.db")
+    from core import ingest
+    log = DbDecisionLog(device_id="cam-A")
+    tuner = LatencyAutotuner(40, resolutions=(640, 480), window=5, settle=0, strides=(1,), log=log)
+    _feed(tuner, 90.0, 5)
+    assert log.writer is ingest.get_writer() and log.writer.flush(timeout=5)
+    con = sqlite3.connect(tmp_path / "edge.db")
+    sev, msg, meta = con.execute("SELECT severity, message, meta_json FROM events WHERE type='autotune'").fetchone()
+    assert sev == "warning" and msg.startswith("degrade resolution: 640 -> 480")
+    assert json.loads(meta)["after"]["resolution"] == 480
+    size, lat, hw, notes = con.execute("SELECT input_size, latency_ms, input_hw, notes FROM benchmarks").fetchone()
+    assert size == "640" and lat > 40 and hw.startswith("cpu:") and json.loads(notes)["source"] == "autotune"
+    # live controller windows are not benchmark runs
+    from bench.benchmark_matrix import best_engine, run_matrix
+    assert best_engine("cam-A") is None and run_matrix(["640"], [], device_id="cam-A") == []
+    ingest.close_all()
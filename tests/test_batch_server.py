@@ -0,0 +1,29 @@
+import threading
+import types
+import numpy as np
+from vision_runtime.batch_server import BatchingInferenceServer
+
+class _EchoSession:
+    """Returns each item's first pixel so results can be matched back to frames."""
+    def __init__(self):
+        self.calls = []
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="input", shape=["N", 3, 4, 4])]
+    def run(self, _names, feeds):
+        x = feeds["input"]; self.calls.append(x.shape[0])
+        return [x[:, 0, 0, 0].reshape(-1, 1)]
+
+def test_batches_are_coalesced_and_scattered_by_frame():
+    sess = _EchoSession()
+    server = BatchingInferenceServer(sess, max_batch=4, max_wait_ms=50).start()
+    results = {}
+    def cam(i):
+        blob = np.full((1, 3, 4, 4), float(i), np.float32)
+        results[i] = server.infer(f"f{i}", blob, timeout=5)[0]
+    threads = [threading.Thread(target=cam, args=(i,)) for i in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    server.stop()
+    assert all(float(results[i][0, 0]) == i for i in range(8))
+    assert max(sess.calls) > 1
+    assert server.stats()["frames"] == 8
@@ -0,0 +1,105 @@
+import sys
+import time
+import uuid
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from multi_camera_support.camera_manager import CameraManager, assign_cores, infer_command
+from multi_camera_support.frame_grabber_interface import Backoff, should_reconnect
+
+
+def _video(path, n=20):
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+    for i in range(n):
+        out.write(np.full((24, 32, 3), i * 10, np.uint8))
+    out.release()
+    return str(path)
+
+
+def test_backoff_doubles_up_to_cap_and_resets():
+    b = Backoff(0.5, 3.0)
+    assert [b.next() for _ in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    b.reset()
+    assert b.next() == 0.5
+
+
+def test_reconnect_defaults_and_core_assignment(tmp_path):
+    assert should_reconnect({"url": "rtsp://cam"}) and should_reconnect({"url": 0})
+    assert not should_reconnect({"url": _video(tmp_path / "a.avi", 2)})
+    cams = [{"id": "a", "cpu": 2}, {"id": "b"}, {"id": "c", "cpu": [0, 1]}]
+    assert assign_cores(cams) == {"a": [2], "c": [0, 1]}
+    assert set(assign_cores(cams, "auto")) == {"a", "b", "c"}
+    assert infer_command({"id": "a"}) is None
+    cmd = infer_command({"id": "a", "infer": "--model m.onnx --pipeline"}, "--model other.onnx")
+    assert cmd[cmd.index("--ring") + 1] == "a" and cmd[-3:] == ["--model", "m.onnx", "--pipeline"]
+
+
+def test_manager_reconnects_dropped_stream_and_counts(tmp_path):
+    video = _video(tmp_path / "loop.avi")
+    cid = f"mgr{uuid.uuid4().hex[:6]}"
+    # reconnect=True on a file: every end-of-file looks like a dropped stream
+    mgr = CameraManager([{"id": cid, "url": video, "reconnect": True, "backoff_s": 0.05}], log=lambda *_: None).start()
+    try:
+        deadline = time.monotonic() + 20.0
+        while time.monotonic() < deadline and mgr.stats()[cid]["reconnects"] < 2:
+            mgr.poll(); time.sleep(0.05)
+        s = mgr.stats()[cid]
+        assert s["reconnects"] >= 2 and s["drops"] >= 2 and s["frames"] >= 40 and s["alive"]
+        assert f"{cid}[up]" in mgr.format_stats()
+    finally:
+        mgr.stop()
+
+
+def test_manager_supervises_inference_workers(tmp_path):
+    video = _video(tmp_path / "loop.avi")
+    cid = f"inf{uuid.uuid4().hex[:6]}"
+    flag = tmp_path / "crashed"
+    # First run crashes, the restarted one reads the ring until the manager stops the grabber
+    script = (f"import os, pathlib, sys; sys.path.insert(0, {str(Path(__file__).resolve().parents[1])!r})\n"
+              f"from multi_camera_support.frame_ring import RingCapture\n"
+              f"flag = pathlib.Path({str(flag)!r})\n"
+              f"if not flag.exists(): flag.touch(); sys.exit(3)\n"
+              f"cap = RingCapture.open({cid!r}, reattach_s=0.05)\n"
+              f"ok = cap.read()[0]; flag.write_text('reading')\n"
+              f"while ok: ok = cap.read()[0]\n")
+    mgr = CameraManager([{"id": cid, "url": video, "reconnect": True, "backoff_s": 0.05, "infer_cpu": 0}],
+                        restart_backoff_s=0.05, log=lambda *_: None,
+                        infer_cmd=lambda cam: [sys.executable, "-c", script]).start()
+    try:
+        assert mgr.infer_cores == {cid: [0]}
+        deadline = time.monotonic() + 20.0
+        while time.monotonic() < deadline and not (flag.exists() and flag.read_text() == "reading"):
+            mgr.poll(); time.sleep(0.05)
+        assert mgr.infer_restarts[cid] == 1 and mgr.stats()[cid]["infer_alive"]
+        assert "infer[up]" in mgr.format_stats()
+    finally:
+        mgr.stop()
+    assert mgr._infer[cid].returncode == 0  # ended ring -> clean exit, not terminated
+
+
+def test_inference_worker_that_ends_before_its_grabber_is_not_restarted(tmp_path):
+    video = _video(tmp_path / "clip.avi")
+    cid = f"end{uuid.uuid4().hex[:6]}"
+    script = (f"import sys; sys.path.insert(0, {str(Path(__file__).resolve().parents[1])!r})\n"
+              f"from multi_camera_support.frame_ring import RingCapture\n"
+              f"cap = RingCapture.open({cid!r}, attach_timeout=10, reattach_s=0.05)\n"
+              f"while cap.read()[0]: pass\n")
+    # linger_s keeps the grabber alive after it marks the ring ended, so the reader exits first
+    mgr = CameraManager([{"id": cid, "url": video, "linger_s": 1.0}], restart_backoff_s=0.05, log=lambda *_: None,
+                        infer_cmd=lambda cam: [sys.executable, "-c", script]).start()
+    try:
+        deadline = time.monotonic() + 20.0
+        while time.monotonic() < deadline and mgr._infer[cid].poll() is None:
+            time.sleep(0.02)
+        assert mgr._infer[cid].returncode == 0 and mgr._procs[cid].is_alive()
+        mgr.poll()
+        assert cid in mgr.infer_finished
+        while time.monotonic() < deadline and mgr.alive():
+            mgr.poll(); time.sleep(0.05)
+        mgr.poll()
+        assert not mgr.alive() and mgr.infer_restarts[cid] == 0 and cid in mgr.finished
+    finally:
+        mgr.stop()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from vision_runtime.det_publisher import DetectionPublisher, decode_batch
+
+DETS = [{"cls": "1", "score": 0.9, "bbox": [10.0, 20.0, 30.0, 40.0]}]
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    def publish(self, topic, payload, qos=0):
+        self.sent.append((topic, payload))
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_default_mode_is_one_json_message_per_frame():
+    cli = FakeClient()
+    pub = DetectionPublisher(cli, "factory/vision/detections")
+    pub("cam", "f_1", [], "")
+    pub("cam", "f_2", DETS, "/x/f_2.jpg")
+    assert [t for t, _ in cli.sent] == ["factory/vision/detections"] * 2
+    msg = json.loads(cli.sent[1][1])
+    assert msg["frame_id"] == "f_2" and msg["detections"] == DETS and msg["image_path"] == "file:///x/f_2.jpg"
+
+
+@pytest.mark.parametrize("encoding", ["json", "struct"])
+def test_window_coalesces_and_round_trips(encoding):
+    cli, clock = FakeClient(), Clock()
+    pub = DetectionPublisher(cli, "det", encoding=encoding, window_ms=500, clock=clock)
+    for i in range(5):
+        clock.t += 0.1
+        pub("cam", f"f_{i}", DETS, f"/x/{i}.jpg")
+    assert cli.sent == []
+    clock.t += 0.5
+    pub("cam", "f_5", DETS, "")
+    assert len(cli.sent) == 1 and cli.sent[0][0] == f"det/batch/{encoding}"
+    payloads, empty = decode_batch(cli.sent[0][1], encoding)
+    assert [p["frame_id"] for p in payloads] == [f"f_{i}" for i in range(6)] and empty == 0
+    assert payloads[0]["detections"][0]["bbox"] == pytest.approx(DETS[0]["bbox"])
+    assert payloads[0]["image_path"] == "file:///x/0.jpg"
+
+
+@pytest.mark.parametrize("encoding", ["json", "struct"])
+def test_batches_keep_roi_names(encoding):
+    cli, clock = FakeClient(), Clock()
+    pub = DetectionPublisher(cli, "det", encoding=encoding, window_ms=100, clock=clock)
+    pub("cam", "f_0", [dict(DETS[0], roi="connector"), DETS[0]], "")
+    pub.flush()
+    dets = decode_batch(cli.sent[0][1], encoding)[0][0]["detections"]
+    assert dets[0]["roi"] == "connector" and "roi" not in dets[1]
+
+
+def test_empty_frames_become_heartbeat_counts():
+    cli, clock = FakeClient(), Clock()
+    pub = DetectionPublisher(cli, "det", encoding="struct", window_ms=100, empty="heartbeat", heartbeat_s=5.0, clock=clock)
+    for _ in range(60):
+        clock.t += 0.1
+        pub("cam", "f", [], "")
+    assert len(cli.sent) == 1  # one heartbeat after 5 s instead of 60 messages
+    pub.flush()
+    counts = [decode_batch(data, "struct") for _, data in cli.sent]
+    assert all(payloads == [] for payloads, _ in counts) and sum(n for _, n in counts) == 60
+    assert pub.stats()["suppressed"] == 60
+
+
+def test_drop_policy_sends_nothing_for_empty_frames():
+    cli, clock = FakeClient(), Clock()
+    pub = DetectionPublisher(cli, "det", encoding="struct", window_ms=100, empty="drop", clock=clock)
+    for _ in range(10):
+        clock.t += 1.0
+        pub("cam", "f", [], "")
+    pub.close()
+    assert cli.sent == [] and pub.counters["frames"] == 10
@@ -0,0 +1,99 @@
+import os
+import uuid
+
+import cv2
+import numpy as np
+
+from multi_camera_support.frame_grabber_interface import GrabberPool
+from multi_camera_support.frame_ring import FrameRing, RingCapture, ring_name
+from multi_camera_support.multi_cam_streamer import latest_frames
+
+
+def _name():
+    return f"edgekit_test_{uuid.uuid4().hex[:8]}"
+
+
+def test_readers_see_writer_frames_without_copy():
+    ring = FrameRing.create(_name(), (4, 6, 3), slots=3)
+    reader = FrameRing.attach(ring.shm.name)
+    try:
+        assert reader.latest() is None
+        seq = ring.write(np.full((4, 6, 3), 7, np.uint8), ts=1.5)
+        got_seq, ts, view = reader.latest()
+        assert (got_seq, ts) == (seq, 1.5)
+        assert view.base is not None and int(view[0, 0, 0]) == 7
+        ring.write(np.full((4, 6, 3), 9, np.uint8))
+        assert reader.wait_next(seq, timeout=0.1)[2][0, 0, 0] == 9
+    finally:
+        view = None
+        reader.close(); ring.close()
+
+
+def test_wrap_around_invalidates_old_sequence():
+    ring = FrameRing.create(_name(), (2, 2), slots=2)
+    try:
+        first = ring.write(np.zeros((2, 2), np.uint8))
+        assert ring.is_valid(first)
+        ring.write(np.ones((2, 2), np.uint8)); ring.write(np.ones((2, 2), np.uint8))
+        assert not ring.is_valid(first) and ring.get(first) is None
+        assert ring.dropped_since(first) == 1
+    finally:
+        ring.close()
+
+
+def test_capture_reattaches_to_recreated_ring_and_stops_when_ended():
+    name = _name()
+    ring = FrameRing.create(name, (2, 2), slots=2)
+    cap = RingCapture(FrameRing.attach(name), timeout=5.0, reattach_s=0.05)
+    try:
+        ring.write(np.zeros((2, 2), np.uint8))
+        assert cap.read()[0]
+        ring.close()  # grabber restarted: same name, new block
+        ring = FrameRing.create(name, (2, 2), slots=2)
+        ring.write(np.full((2, 2), 5, np.uint8))
+        ok, frame = cap.read()
+        assert ok and int(frame[0, 0]) == 5 and cap.reattached == 1
+        ring.mark_ended()
+        assert cap.read() == (False, None)
+    finally:
+        frame = None
+        cap.release(); ring.close()
+
+
+def test_copied_frame_is_revalidated_after_the_copy():
+    name = _name()
+    ring = FrameRing.create(name, (2, 2), slots=2)
+    cap = RingCapture(FrameRing.attach(name), copy=True, timeout=5.0)
+    real = cap.ring.is_valid
+    def lapped_during_copy(seq):  # the grabber writes two frames while the reader copies
+        if seq == 1:
+            ring.write(np.full((2, 2), 2, np.uint8)); ring.write(np.full((2, 2), 3, np.uint8))
+        return real(seq)
+    cap.ring.is_valid = lapped_during_copy
+    try:
+        ring.write(np.full((2, 2), 1, np.uint8))
+        ok, frame = cap.read()
+        assert ok and int(frame[0, 0]) == 3 and cap.seq == 3 and cap.skipped == 0
+    finally:
+        cap.release(); ring.close()
+
+
+def test_grabber_pool_publishes_video_frames(tmp_path):
+    video = str(tmp_path / "clip.avi")
+    out = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(40):
+        out.write(np.full((48, 64, 3), i * 5, np.uint8))
+    out.release()
+    cid = f"test{uuid.uuid4().hex[:6]}"
+    pool = GrabberPool([{"id": cid, "url": video, "width": 32, "height": 24, "linger_s": 1.0}]).start()
+    try:
+        cap = RingCapture(pool.rings(timeout=20.0)[cid], copy=True, timeout=2.0)
+        ok, frame = cap.read()
+        assert ok and frame.shape == (24, 32, 3)
+        assert cid in latest_frames([cid, "missing"])
+        while cap.read()[0]:
+            pass
+        cap.release()
+    finally:
+        pool.stop()
+    assert not os.path.exists(f"/dev/shm/{ring_name(cid)}")
@@ -0,0 +1,65 @@
+import sqlite3
+
+import cv2
+import numpy as np
+import pytest
+
+from ai_workflow import inference_kit
+from src.preprocessing.letterbox import LetterboxPreprocessor
+from vision_runtime import session_cache
+
+MODEL = "models/defect_detector.onnx"
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_cache, "CACHE_DIR", tmp_path / "ort_cache")
+    rng = np.random.default_rng(0)
+    for i in range(12):
+        d = tmp_path / "imgs" / f"lot{i % 3}"
+        d.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(d / f"{i:03d}.png"), rng.integers(0, 255, (120, 200, 3), dtype=np.uint8))
+    (tmp_path / "imgs" / "lot0" / "broken.jpg").write_bytes(b"not an image")
+    (tmp_path / "imgs" / "notes.txt").write_text("skip me")
+    return tmp_path / "imgs"
+
+
+def test_two_stage_letterbox_matches_preprocessor():
+    img = np.random.default_rng(1).integers(0, 255, (300, 500, 3), dtype=np.uint8)
+    want, want_scale = LetterboxPreprocessor((640, 640))(img)
+    canvas, scale = inference_kit.letterbox_u8(img, (640, 640))
+    got = np.empty((3, 640, 640), dtype=np.float32)
+    inference_kit.to_planes(canvas, got)
+    assert scale == want_scale and np.array_equal(got, want[0])
+
+
+def test_infer_dir_resumes_from_committed_rows(images, tmp_path):
+    out = str(tmp_path / "res.sqlite")
+    first = inference_kit.infer_dir(MODEL, str(images), out, batch=4, workers=0, limit=5, commit_every=4,
+                                    log=lambda *_: None)
+    assert first["images"] == 5
+    rest = inference_kit.infer_dir(MODEL, str(images), out, batch=4, workers=1, log=lambda *_: None)
+    assert rest["skipped"] == 5 and rest["images"] == 8 and rest["images_per_s"] > 0
+    con = sqlite3.connect(out)
+    assert con.execute("SELECT COUNT(*), COUNT(DISTINCT path) FROM infer_results").fetchone() == (13, 13)
+    assert con.execute("SELECT error FROM infer_results WHERE path LIKE '%broken.jpg'").fetchone()[0]
+    assert con.execute("SELECT COUNT(*) FROM infer_results WHERE n_dets IS NOT NULL").fetchone()[0] == 12
+
+
+def test_infer_dir_parquet_parts(images, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "res.parquet"
+    # batches of 8 then 5: a part is committed after each batch that crosses a multiple of 5
+    inference_kit.infer_dir(MODEL, str(images), str(out), fmt="parquet", batch=8, workers=0, commit_every=5,
+                            log=lambda *_: None)
+    (out / "part-000099.parquet.tmp").write_bytes(b"half written")
+    again = inference_kit.infer_dir(MODEL, str(images), str(out), fmt="parquet", workers=0, log=lambda *_: None)
+    assert again["images"] == 0 and again["skipped"] == 13
+    parts = sorted(p.name for p in out.iterdir())
+    assert parts == ["part-000000.parquet", "part-000001.parquet"]
+    assert sum(pq.read_table(str(out / p)).num_rows for p in parts) == 13
+
+
+def test_run_inference_single_image(images):
+    res = inference_kit.run_inference(MODEL, next(inference_kit.iter_images(str(images))))
+    assert res["result"] in ("OK", "NG") and isinstance(res["detections"], list)
@@ -0,0 +1,127 @@
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import core.db
+from core import ingest
+from core.ingest import IngestWriter, get_writer
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.db, "DB_PATH", tmp_path / "edge.db")
+    con = core.db.connect(); core.db.migrate(con); con.close()
+    return tmp_path / "edge.db"
+
+
+def _count(db, table="events"):
+    return sqlite3.connect(db).execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _event(i):
+    return {"ts": ingest.utc_now(), "device_id": "cam", "severity": "info", "type": "t", "message": str(i)}
+
+
+def test_group_commits_on_size_and_flush(db):
+    w = IngestWriter(max_batch=50, max_delay_ms=10_000)
+    threads = [threading.Thread(target=lambda p=p: [w.insert("events", _event(p * 100 + i)) for i in range(60)])
+               for p in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert w.flush(timeout=5)
+    s = w.stats()
+    assert _count(db) == 240 and s["written"] == 240 and s["errors"] == 0
+    assert s["batches"] <= 240 // 50 + 4  # grouped, not one transaction per row
+    w.close()
+
+
+def test_time_trigger_commits_without_flush(db):
+    w = IngestWriter(max_batch=10_000, max_delay_ms=20)
+    w.insert("events", _event(1))
+    for _ in range(100):
+        if _count(db):
+            break
+        threading.Event().wait(0.01)
+    assert _count(db) == 1
+    w.close()
+
+
+def test_bad_row_is_isolated(db):
+    w = IngestWriter(max_batch=100, max_delay_ms=10_000)
+    w.insert("events", _event(1))
+    w.insert("events", {"no_such_column": 1})
+    w.insert("events", _event(2))
+    w.flush()
+    assert _count(db) == 2
+    assert w.stats()["errors"] == 1 and "no_such_column" in w.last_error
+    w.close()
+
+
+def test_producers_go_through_the_shared_writer(db):
+    from bench.benchmark_matrix import record_benchmark
+    from gateway import bridge
+    from quality.triage import add_triage_item
+
+    add_triage_item("U1", 0.9, "scratch")
+    record_benchmark("dev", engine="onnxruntime", input_size="640", fps=10, latency_ms=5)
+    w = get_writer()
+    msg = type("Msg", (), {"payload": json.dumps({"device_id": "cam-7"}).encode()})
+    bridge.on_message(None, {"writer": w}, msg)
+    w.flush()
+    con = core.db.connect()
+    assert [r["type"] for r in con.execute("SELECT type FROM events ORDER BY rowid")] == ["triage_add", "forward"]
+    assert con.execute("SELECT json_extract(meta_json, '$.ack') FROM events WHERE type='forward'").fetchone()[0] == "ack:ok"
+    assert _count(db, "benchmarks") == 1
+
+
+def test_writer_failures_raise_instead_of_hanging(db, monkeypatch):
+    def broken():
+        raise sqlite3.OperationalError("unable to open database file")
+    with pytest.raises(ingest.WriterStopped, match="could not start"):
+        IngestWriter(connect=broken)
+
+    w = IngestWriter(max_delay_ms=0)
+    def crash(con, rows):
+        raise MemoryError("boom")  # not an sqlite3.Error: kills the writer thread
+    monkeypatch.setattr(w, "_commit", crash)
+    w.insert("events", _event(1))
+    with pytest.raises(ingest.WriterStopped, match="boom"):
+        w.flush(timeout=5.0)
+    with pytest.raises(ingest.WriterStopped):
+        w.insert("events", _event(2))
+
+
+def test_housekeeping_runs_between_batches(db):
+    calls = []
+    def chore(con):
+        calls.append(con.execute("SELECT COUNT(*) FROM events").fetchone()[0])
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+    w = IngestWriter(max_delay_ms=0, housekeeping=chore, housekeeping_s=0.01)
+    w.insert("events", _event(1))
+    for _ in range(200):
+        if len(calls) >= 2:
+            break
+        threading.Event().wait(0.01)
+    assert len(calls) >= 2 and w.alive
+    assert "database is locked" in w.last_error
+    w.insert("events", _event(2))
+    assert w.flush(timeout=5)
+    w.close()
+
+
+def test_get_writer_rejects_conflicting_settings_and_leaves_housekeeping_off(db):
+    w = get_writer(max_batch=100)
+    try:
+        assert w.housekeeping is None  # only the long-running owner opts in
+        assert get_writer() is w and get_writer(max_batch=100) is w
+        with pytest.raises(ValueError, match="max_batch"):
+            get_writer(max_batch=10)
+        with pytest.raises(ValueError, match="housekeeping"):
+            get_writer(housekeeping=core.db.housekeeping)
+    finally:
+        ingest.close_all()
@@ -0,0 +1,74 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import services.db as sdb
+from services import kpi_counters, kpis
+
+
+@pytest.fixture
+def edgekit(tmp_path, monkeypatch):
+    path = tmp_path / "edgekit.db"
+    shutil.copy("data/edgekit.db", path)
+    monkeypatch.setattr(sdb, "DB_PATH", str(path))
+    yield path
+    sdb.close_pools()
+
+
+def _scan(conn):
+    one = lambda sql: conn.execute(sql).fetchone()[0]
+    return {"readings": one("SELECT COUNT(*) FROM sensor_readings"),
+            "inferences": one("SELECT COUNT(*) FROM inference_events"),
+            "anomalies": one("SELECT COUNT(*) FROM anomalies"),
+            "quality": one("SELECT COUNT(*) FROM quality_results"),
+            "quality_passed": one("SELECT COUNT(*) FROM quality_results WHERE passed=1")}
+
+
+def test_triggers_track_inserts_deletes_and_updates(edgekit):
+    conn = sqlite3.connect(edgekit)
+    kpi_counters.install(conn)
+    assert kpi_counters.totals(conn) == _scan(conn)
+
+    conn.execute("INSERT INTO sensor_readings(ts, device_id, sensor_type, value) "
+                  "VALUES ('2099-01-02 03:04:05', 'dev-x', 'temp', 1.0)")
+    conn.execute("INSERT INTO quality_results(ts, device_id, reading_id, passed) VALUES ('2099-01-02 00:00:00', 'dev-x', 1, 1)")
+    conn.execute("UPDATE quality_results SET passed = 0 WHERE id = (SELECT MIN(id) FROM quality_results WHERE passed = 1)")
+    conn.execute("DELETE FROM anomalies WHERE id IN (SELECT id FROM anomalies LIMIT 3)")
+    conn.commit()
+
+    assert kpi_counters.totals(conn) == _scan(conn)
+    assert kpi_counters.check(conn) == {}
+    assert kpi_counters.last_ts(conn) == "2099-01-02 03:04:05"
+    assert kpi_counters.by_day(conn, "readings", device_id="dev-x") == [
+        {"day": "2099-01-02", "n": 1, "max_ts": "2099-01-02 03:04:05"}]
+
+
+def test_repair_fixes_drift(edgekit):
+    conn = sqlite3.connect(edgekit)
+    kpi_counters.install(conn)
+    conn.execute("UPDATE kpi_counters SET n = n + 7 WHERE metric = 'readings'"); conn.commit()
+    assert kpi_counters.check(conn)["readings"]["counter"] == 1007
+    assert kpi_counters.main(["check", "--db", str(edgekit)]) == 1
+    assert kpi_counters.main(["repair", "--db", str(edgekit)]) == 0
+    assert kpi_counters.check(conn) == {}
+    per_day = sum(r["n"] for r in kpi_counters.by_day(conn, "readings"))
+    assert per_day == 1000
+
+
+def test_build_kpis_scans_until_counters_are_installed(edgekit):
+    before = kpis.build_kpis()
+    conn = sqlite3.connect(edgekit)
+    assert not kpi_counters.installed(conn)  # a dashboard read never installs them
+    scan = _scan(conn)
+    assert (before.total_readings, before.total_quality_checks) == (scan["readings"], scan["quality"])
+    assert before.yield_rate_pct == round(scan["quality_passed"] / scan["quality"] * 100.0, 2)
+    assert before.last_ingest_ts == conn.execute("SELECT MAX(ts) FROM sensor_readings").fetchone()[0]
+
+    assert kpi_counters.main(["repair", "--db", str(edgekit)]) == 0  # first run installs
+    assert kpi_counters.installed(conn)
+    conn.execute("INSERT INTO anomalies(ts, device_id, reading_id, severity) VALUES ('2099-01-01', 'dev-x', 1, 'high')")
+    conn.execute("UPDATE kpi_counters SET n = n + 7 WHERE metric = 'readings' AND device_id = '*'"); conn.commit()
+    after = kpis.build_kpis()
+    assert after.total_anomalies == before.total_anomalies + 1
+    assert after.total_readings == before.total_readings + 7  # read from the counters, not scanned
@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+
+from vision_runtime.latency import LatencyHistogram, StageTimer
+
+
+def test_histogram_percentiles_within_bucket_error():
+    samples = np.random.default_rng(0).lognormal(mean=1.5, sigma=0.6, size=5000)
+    h = LatencyHistogram()
+    for v in samples:
+        h.record(float(v))
+    for q in (50, 95, 99):
+        exact = float(np.percentile(samples, q))
+        assert abs(h.percentile(q) - exact) / exact < 0.03
+    assert h.summary()["n"] == 5000 and h.max_ms == float(samples.max())
+
+
+def test_timer_rolls_windows_into_totals_and_traces_frames(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    timer = StageTimer(str(trace))
+    for i in range(3):
+        timer.record("infer", 2.0, f"f_{i}")
+        timer.record("save", 1.0, f"f_{i}")
+        timer.end_frame(f"f_{i}")
+    timer.record("infer", 9.0, "gated")
+    timer.drop_frame("gated")
+    assert timer.roll()["infer"]["n"] == 4
+    timer.record("infer", 4.0)
+    assert timer.roll()["infer"]["n"] == 1 and timer.stats()["infer"]["n"] == 5
+    assert "infer[n=5" in timer.format_stats()
+    timer.close()
+    lines = [json.loads(l) for l in trace.read_text().splitlines()]
+    assert [l["frame_id"] for l in lines] == ["f_0", "f_1", "f_2"]
+    assert lines[0]["infer_ms"] == 2.0 and lines[0]["save_ms"] == 1.0
+
+
+def test_unfinished_frames_are_capped(tmp_path):
+    timer = StageTimer(str(tmp_path / "trace.jsonl"), max_pending=8)
+    for i in range(100):
+        timer.record("decode", 1.0, f"lost_{i}")  # never ended nor dropped
+    assert len(timer._frames) == 8 and "lost_99" in timer._frames
+    timer.close()
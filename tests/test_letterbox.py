@@ -0,0 +1,16 @@
+import numpy as np
+from examples.vision_inspection.camera_infer import preprocess_bgr
+from src.preprocessing.letterbox import LetterboxPreprocessor
+
+def test_letterbox_matches_reference_and_reuses_buffers():
+    rng = np.random.default_rng(1)
+    pre = LetterboxPreprocessor((320, 320))
+    first = None
+    for shape in [(240, 320, 3), (300, 200, 3), (240, 320, 3)]:
+        img = rng.integers(0, 255, shape, dtype=np.uint8)
+        ref_blob, ref_scale = preprocess_bgr(img, (320, 320))
+        blob, scale = pre(img)
+        assert scale == ref_scale
+        assert np.array_equal(blob, ref_blob)
+        first = blob if first is None else first
+        assert blob is first
@@ -0,0 +1,36 @@
+import json, os, time
+import types
+import numpy as np
+from ota.model_switcher import HotSwapModel
+
+class _Sess:
+    def __init__(self, path):
+        if "broken" in path: raise RuntimeError("cannot load")
+        self.path = path
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="x", shape=["N", 3, "H", "W"])]
+    def run(self, _names, feeds):
+        if "slow" in self.path: time.sleep(0.02)
+        if min(feeds["x"].shape[2:]) < 32: raise RuntimeError("stride 32 needs at least 32x32")
+        return [np.array([[len(self.path)]], np.float32)]
+
+def _write(cfg_path, version, model, bump):
+    cfg_path.write_text(json.dumps({"version": version, "onnx_model_path": model}))
+    os.utime(cfg_path, ns=(bump, bump))
+
+def test_swap_accepts_good_model_and_keeps_old_on_failure(tmp_path):
+    cfg = tmp_path / "update_control.json"
+    _write(cfg, "1.0", "a.onnx", 10**9)
+    model = HotSwapModel(str(cfg), session_factory=_Sess, warmup_runs=2, log=lambda *_: None)
+    _write(cfg, "1.0.1", "dyn.onnx", 10**9 + 1)  # no frame seen yet: dynamic H/W warm up at 640, not 1x1
+    assert model.check() and model.version == "1.0.1"
+    blob = np.zeros((1, 3, 64, 64), np.float32)
+    model("f1", blob)
+    _write(cfg, "1.1", "bb.onnx", 2 * 10**9)
+    assert model.check() and model.version == "1.1"
+    _write(cfg, "1.2", "broken.onnx", 3 * 10**9)
+    assert not model.check() and model.version == "1.1"
+    _write(cfg, "1.3", "slow.onnx", 4 * 10**9)
+    assert not model.check() and model.version == "1.1"
+    assert [r["version"] for r in model.rejected] == ["1.2", "1.3"]
+    assert model("f2", blob)[0][0, 0] == len("bb.onnx")
@@ -0,0 +1,17 @@
+import numpy as np
+from src.preprocessing.motion_detector import MotionGate, detect_motion
+
+def test_gate_skips_still_scene_and_honours_keepalive():
+    now = [0.0]
+    gate = MotionGate(keepalive_s=1.0, clock=lambda: now[0])
+    still = np.full((240, 320, 3), 80, np.uint8)
+    moved = still.copy(); moved[60:180, 100:220] = 250
+    assert gate(still)            # first frame primes the background
+    now[0] = 0.1; assert not gate(still)
+    now[0] = 0.2; assert gate(moved)
+    now[0] = 1.5; assert gate(still) and gate.counters["keepalive"] == 1
+    assert gate.counters["skipped"] == 1
+
+def test_detect_motion_between_frames():
+    a = np.zeros((120, 160, 3), np.uint8); b = a.copy(); b[:60] = 255
+    assert detect_motion(a) and detect_motion(b, a) and not detect_motion(a, a)
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import core.db
+from bench import ort_benchmark
+from bench.benchmark_matrix import best_engine, record_benchmark, run_matrix
+from vision_runtime import session_cache
+
+MODEL = "models/defect_detector.onnx"
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.db, "DB_PATH", tmp_path / "edge.db")
+    monkeypatch.setattr(session_cache, "CACHE_DIR", tmp_path / "ort_cache")
+    return tmp_path / "edge.db"
+
+
+def test_sweep_records_raw_samples_and_percentiles(db):
+    rows = ort_benchmark.run_sweep(MODEL, sizes=[640, 320], batches=[1, 2], threads=[1], graph_opts=["basic"],
+                                   warmup=1, repeats=4, log=lambda *_: None)
+    # the model's H/W are fixed at 640, so 320 cannot be measured and is not recorded
+    assert [(r["size"], r["batch"]) for r in rows] == [("640", 1), ("640", 2)]
+    con = core.db.connect()
+    recs = con.execute("SELECT notes, samples_json, n_samples, latency_ms, p50_ms, p95_ms, p99_ms FROM benchmarks "
+                       "WHERE engine='onnxruntime'").fetchall()
+    assert len(recs) == 2 and json.loads(recs[0]["notes"])["batch"] == 1
+    assert len(json.loads(recs[0]["samples_json"])) == recs[0]["n_samples"] == 4
+    assert recs[0]["p50_ms"] <= recs[0]["p95_ms"] <= recs[0]["p99_ms"]
+    assert recs[0]["latency_ms"] == pytest.approx(sum(json.loads(recs[0]["samples_json"])) / 4, abs=2e-3)  # mean
+
+
+def test_matrix_measures_missing_sizes_and_never_invents_rows(db):
+    assert run_matrix(["640"], ["onnxruntime", "tensorrt"]) == []
+    rows = run_matrix(["640"], ["onnxruntime", "tensorrt"], device_id="local", model=MODEL,
+                      warmup=1, repeats=3, log=lambda *_: None)
+    assert [(r["engine"], r["size"]) for r in rows] == [("onnxruntime", "640")]
+    assert rows[0]["fps"] > 0 and rows[0]["p50_ms"] <= rows[0]["p99_ms"]
+
+
+def test_best_engine_selects_on_p99_under_deadline(db):
+    # a: faster on average but with a 60 ms tail; b: slower but tight
+    record_benchmark("dev", engine="a", input_size="640", fps=120, latency_ms=8, samples_ms=[8] * 95 + [60] * 5)
+    record_benchmark("dev", engine="b", input_size="640", fps=60, latency_ms=16, samples_ms=[16] * 100)
+    record_benchmark("dev", engine="legacy", input_size="640", fps=200, latency_ms=5)  # no distribution
+    assert best_engine("dev", max_latency_ms=20)["engine"] == "legacy"
+    best = best_engine("dev", metric="p99", deadline_ms=40)
+    assert best["engine"] == "b" and best["p99_ms"] == 16
+    assert best_engine("dev", metric="p99", deadline_ms=10) is None
+
+
+def test_best_engine_compares_latest_run_per_configuration(db):
+    record_benchmark("dev", engine="a", input_size="640", fps=100, latency_ms=10, samples_ms=[90] * 10,
+                     batch=1, threads=2, graph_opt="all")  # one noisy run...
+    record_benchmark("dev", engine="a", input_size="640", fps=100, latency_ms=10, samples_ms=[10] * 10,
+                     batch=1, threads=2, graph_opt="all")  # ...superseded by a clean re-run
+    record_benchmark("dev", engine="a", input_size="640", fps=400, latency_ms=80, samples_ms=[80] * 10,
+                     batch=8, threads=2, graph_opt="all")
+    best = best_engine("dev", metric="p99", deadline_ms=40)
+    assert (best["engine"], best["batch"], best["p99_ms"], best["fps"]) == ("a", 1, 10, 100)
+    assert best_engine("dev", metric="p99", deadline_ms=100, batch=8)["fps"] == 400
+    rows = run_matrix(["640"], ["a"], device_id="dev")
+    assert [(r["batch"], r["fps"]) for r in rows] == [(1, 100), (8, 400)]
+
+    # a pre-migration row (no configuration recorded) is the same config as batch 1 / auto threads / "all"
+    record_benchmark("dev", engine="b", input_size="640", fps=500, latency_ms=5, samples_ms=[5] * 10)
+    record_benchmark("dev", engine="b", input_size="640", fps=500, latency_ms=90, samples_ms=[90] * 10,
+                     batch=1, threads=0, graph_opt="all")
+    assert best_engine("dev", metric="p99", deadline_ms=40)["engine"] == "a"
+    assert [r["threads"] for r in run_matrix(["640"], ["b"], device_id="dev")] == [0]
+
+
+def test_percentile_columns_are_added_to_old_tables(db):
+    import sqlite3
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE benchmarks (ts TEXT, device_id TEXT, model TEXT, input_size TEXT, fps REAL, "
+                "latency_ms REAL, accuracy REAL, notes TEXT)")
+    con.execute("INSERT INTO benchmarks VALUES ('2024-01-01 00:00:00', 'dev', 'onnxruntime', '640', 5, 200, NULL, "
+                "'{\"batch\": 4, \"threads\": 2, \"graph_opt\": \"all\"}')")
+    con.commit(); con.close()
+    record_benchmark("dev", engine="onnxruntime", input_size="640", fps=10, latency_ms=5, samples_ms=[4, 5, 6])
+    rows = core.db.connect().execute("SELECT model, p99_ms, n_samples, batch, graph_opt FROM benchmarks ORDER BY ts").fetchall()
+    assert (rows[0]["batch"], rows[0]["graph_opt"]) == (4, "all")  # backfilled from notes
+    assert rows[1]["model"] == "onnxruntime" and rows[1]["n_samples"] == 3 and rows[1]["p99_ms"] > 5
+
+
+def test_resolve_model_reads_pack_artifact(tmp_path):
+    (tmp_path / "modelpack.yaml").write_text("model_id: d\nversion: '1'\nartifacts: {onnx: m.onnx}\n")
+    with pytest.raises(FileNotFoundError):
+        ort_benchmark.resolve_model(str(tmp_path))
+    (tmp_path / "m.onnx").write_bytes(b"")
+    assert ort_benchmark.resolve_model(str(tmp_path)).endswith("m.onnx")
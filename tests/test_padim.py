@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+import pytest
+
+from anomaly import padim_infer
+from anomaly.padim_infer import PadimModel, PatchFeatures, PatchGaussians
+
+
+def texture(rng, defect=False):
+    img = cv2.GaussianBlur(rng.normal(128, 20, (128, 160, 3)).clip(0, 255).astype(np.uint8), (5, 5), 0)
+    if defect:
+        cv2.line(img, (30, 40), (90, 50), (20, 20, 20), 3)
+    return img
+
+
+def test_streaming_statistics_match_full_covariance():
+    x = np.random.default_rng(0).normal(5.0, 2.0, size=(53, 6, 4))
+    g = PatchGaussians(6, 4)
+    for i in range(0, len(x), 8):
+        g.update(x[i:i + 8])
+    assert g.count == 53
+    assert np.allclose(g.mean, x.mean(axis=0))
+    assert np.allclose(g.covariance(eps=0.0), np.stack([np.cov(x[:, n].T) for n in range(6)]))
+
+
+def test_vectorized_distance_matches_per_patch_formula():
+    rng = np.random.default_rng(1)
+    model = PadimModel(PatchFeatures(size=64, stride=8)).fit([texture(rng) for _ in range(12)], batch=5)
+    feats = model.extractor([texture(rng)]).reshape(1, 64, -1)
+    want = [np.sqrt((f - m) @ ic @ (f - m)) for f, m, ic in zip(feats[0], model.mean, model.inv_cov)]
+    assert np.allclose(model.mahalanobis(feats)[0], want, rtol=1e-4)
+
+
+def test_scratch_scores_above_calibrated_threshold(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    model = PadimModel(PatchFeatures(size=128, stride=8)).fit((texture(rng) for _ in range(40)))
+    model.calibrate([texture(rng) for _ in range(10)])
+    good, bad = model.predict(texture(rng)), model.predict(texture(rng, defect=True))
+    assert not good["is_anomaly"] and bad["is_anomaly"]
+    assert bad["anomaly_map"].shape == (128, 160)
+    ys, xs = np.unravel_index(bad["anomaly_map"].argmax(), bad["anomaly_map"].shape)
+    assert 20 <= xs <= 100 and 25 <= ys <= 65  # the peak sits on the scratch
+
+    path = tmp_path / "padim.npz"
+    model.save(str(path))
+    monkeypatch.setattr(padim_infer, "DEFAULT_MODEL_PATH", str(path))
+    monkeypatch.setattr(padim_infer, "_default", None)
+    res = padim_infer.detect_anomalies(texture(rng, defect=True))
+    assert res["is_anomaly"] and res["anomaly_score"] == pytest.approx(bad["anomaly_score"], rel=0.5)
+
+
+def test_detect_anomalies_without_model(monkeypatch, tmp_path):
+    monkeypatch.setattr(padim_infer, "DEFAULT_MODEL_PATH", str(tmp_path / "missing.npz"))
+    monkeypatch.setattr(padim_infer, "_default", None)
+    with pytest.raises(FileNotFoundError):
+        padim_infer.detect_anomalies(np.zeros((8, 8, 3), np.uint8))
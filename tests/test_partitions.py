@@ -0,0 +1,149 @@
+import datetime as dt
+import sqlite3
+
+import pytest
+
+import core.db
+from core import partitions
+from core.ingest import IngestWriter
+
+
+@pytest.fixture
+def con(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.db, "DB_PATH", tmp_path / "edge.db")
+    con = core.db.connect(); core.db.migrate(con)
+    yield con
+    con.close()
+
+
+def _reading(ts, sensor="t1", value=1.0):
+    return {"ts": ts, "device_id": "E1", "sensor_id": sensor, "metric": "temp", "value": value, "unit": "C"}
+
+
+def _count(con, table="sensor_readings"):
+    return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_rows_land_in_their_day_partition_behind_the_view(con):
+    rows = [_reading(f"2025-09-{d:02d}T{h:02d}:00:00", value=d) for d in (20, 21, 22) for h in range(0, 24, 6)]
+    assert partitions.insert_readings(con, rows) == 12
+    assert [p[0] for p in partitions.partitions(con)][:3] == [
+        "sensor_readings_p20250920", "sensor_readings_p20250921", "sensor_readings_p20250922"]
+    assert _count(con, "sensor_readings_p20250921") == 4 and _count(con) == 12
+
+    # plain INSERT INTO the view is routed by the trigger, conflict clause included
+    con.execute("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) "
+                "VALUES ('2025-09-22 23:59:59', 'E1', 't1', 'temp', 5)")
+    con.execute("INSERT OR REPLACE INTO sensor_readings(ts, device_id, sensor_id, metric, value) "
+                "VALUES ('2025-09-22T00:00:00', 'E1', 't1', 'temp', 99)")
+    con.execute("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) "
+                "VALUES ('2025-10-01T00:00:00', 'E1', 't1', 'temp', 1)")
+    assert _count(con, "sensor_readings_p20250922") == 5
+    assert con.execute("SELECT value FROM sensor_readings WHERE ts = '2025-09-22T00:00:00'").fetchone()[0] == 99
+    assert _count(con, partitions.DEFAULT) == 1
+
+    w = IngestWriter(max_batch=10)
+    w.insert("sensor_readings", _reading("2025-09-20T12:30:00", sensor="t2"))
+    w.flush(); w.close()
+    assert _count(con, "sensor_readings_p20250920") == 5
+
+
+def test_range_sql_touches_only_overlapping_partitions(con):
+    partitions.insert_readings(con, [_reading(f"2025-09-{d:02d}T08:00:00", value=d) for d in range(1, 31)])
+    sql, params = partitions.range_sql(con, "2025-09-10T12:00:00", "2025-09-12", columns=("ts", "value"))
+    assert sql.count("UNION ALL") == 2  # default, p20250910, p20250911
+    assert "p20250912" not in sql and "p20250909" not in sql
+    assert con.execute(f"SELECT SUM(value) FROM ({sql})", params).fetchone()[0] == 11
+    assert con.execute("SELECT COUNT(*) FROM sensor_readings WHERE ts >= '2025-09-10' AND ts < '2025-09-12'"
+                       ).fetchone()[0] == 2
+
+    # the view's trigger only routes to the newest partitions; a late row waits in the default, still visible
+    con.execute("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) "
+                "VALUES ('2025-09-11T09:00:00', 'E1', 't1', 'temp', 100)")
+    assert _count(con, partitions.DEFAULT) == 1
+    assert con.execute(f"SELECT SUM(value) FROM ({sql})", params).fetchone()[0] == 111
+
+
+def test_retention_drops_whole_partitions_and_maintain_drains_default(con):
+    partitions.insert_readings(con, [_reading(f"2025-09-{d:02d}T08:00:00") for d in range(1, 31)])
+    con.execute("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) "
+                "VALUES ('2025-10-02T01:00:00', 'E1', 't1', 'temp', 1)")
+    now = dt.datetime(2025, 10, 1, 6, tzinfo=dt.timezone.utc)
+    out = partitions.maintain(con, keep_days=7, ahead=2, now=now)
+    assert out["moved"] == 1 and _count(con, partitions.DEFAULT) == 0
+    assert out["created"] == ["sensor_readings_p20251001", "sensor_readings_p20251002", "sensor_readings_p20251003"]
+    assert len(out["dropped"]) == 23  # Sept 1..23 end on or before Sept 24
+    assert partitions.partitions(con)[0][0] == "sensor_readings_p20250924"
+    assert not con.execute("SELECT 1 FROM sqlite_master WHERE name = 'sensor_readings_p20250923'").fetchone()
+    assert _count(con) == 7 + 1
+
+
+def test_install_converts_a_plain_table_and_keeps_weekly_width(tmp_path):
+    con = sqlite3.connect(tmp_path / "old.db", isolation_level=None)
+    con.execute("CREATE TABLE sensor_readings (ts TEXT, device_id TEXT, sensor_id TEXT, metric TEXT, value REAL, "
+                "unit TEXT, quality TEXT, raw_json TEXT, PRIMARY KEY (ts, device_id, sensor_id, metric))")
+    con.execute("CREATE VIEW latest AS SELECT MAX(ts) AS ts FROM sensor_readings")
+    con.executemany("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) VALUES (?, 'E1', 's', 'm', 1)",
+                    [(f"2025-09-{d:02d} 10:00:00",) for d in range(1, 15)] + [(None,)])
+    assert partitions.install(con, period="week", ahead=0, now=dt.datetime(2025, 9, 14, tzinfo=dt.timezone.utc))
+    assert [p[1:] for p in partitions.partitions(con)] == [
+        ("2025-09-01", "2025-09-08"), ("2025-09-08", "2025-09-15")]
+    assert _count(con) == 15 and _count(con, partitions.DEFAULT) == 1
+    assert con.execute("SELECT ts FROM latest").fetchone()[0] == "2025-09-14 10:00:00"
+    partitions.insert_readings(con, [_reading("2025-09-17T00:00:00")])
+    assert partitions.partitions(con)[-1][1:] == ("2025-09-15", "2025-09-22")
+
+    legacy = sqlite3.connect(tmp_path / "legacy.db")
+    legacy.execute("CREATE TABLE sensor_readings (id INTEGER PRIMARY KEY, ts TEXT, sensor_type TEXT)")
+    assert not partitions.install(legacy)
+
+
+def test_partition_cap_falls_back_to_default_and_expiry_frees_room(con, monkeypatch):
+    live = partitions.partitions(con)  # today's and the upcoming ones, from install()
+    monkeypatch.setattr(partitions, "MAX_PARTITIONS", len(live) + 6)  # room for the default + 5
+    rows = [_reading(f"2025-09-{d:02d}T08:00:00") for d in range(1, 8)]
+    assert partitions.insert_readings(con, rows) == 7
+    assert [p[1] for p in partitions.partitions(con) if p not in live] == [
+        f"2025-09-{d:02d}" for d in range(3, 8)]  # newest kept
+    assert _count(con, partitions.DEFAULT) == 2 and _count(con) == 7
+    partitions.insert_readings(con, [_reading("2025-09-08T08:00:00")])  # at the cap: no error, waits in the default
+    assert _count(con, partitions.DEFAULT) == 3
+
+    # expiry runs before the upcoming partitions are created, so they fit
+    out = partitions.maintain(con, keep_days=3, ahead=1, now=dt.datetime(2025, 9, 8, 6, tzinfo=dt.timezone.utc))
+    assert out["dropped"] == ["sensor_readings_p20250903", "sensor_readings_p20250904"]
+    assert out["created"] == ["sensor_readings_p20250908", "sensor_readings_p20250909"]
+    assert out["moved"] == 1 and _count(con, partitions.DEFAULT) == 0
+    assert _count(con) == 4  # Sept 5..8
+
+
+def test_fresh_install_partitions_live_rows_and_housekeeping_maintains(con):
+    today = dt.datetime.now(dt.timezone.utc).date()
+    assert [p[1] for p in partitions.partitions(con)] == [str(today + dt.timedelta(days=i)) for i in range(3)]
+    now = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    con.execute("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) VALUES (?, 'E1', 't1', 'temp', 1)",
+                (now,))
+    assert _count(con, partitions.partition_name(today)) == 1 and _count(con, partitions.DEFAULT) == 0
+
+    w = IngestWriter(max_batch=10)
+    w.insert("sensor_readings", _reading("2025-09-20T12:30:00"))  # no partition yet: the writer creates it
+    w.insert("sensor_readings", _reading("not a timestamp"))
+    w.flush(); w.close()
+    assert _count(con, "sensor_readings_p20250920") == 1
+    assert w.stats()["errors"] == 1 and "isoformat" in w.last_error
+
+    con.execute("INSERT INTO sensor_readings(ts, device_id, sensor_id, metric, value) "
+                "VALUES ('2025-09-21T00:00:00', 'E1', 't1', 'temp', 1)")  # older than the routed partitions
+    core.db.housekeeping(con)  # what the ingest owner runs every minute
+    assert _count(con, partitions.DEFAULT) == 0 and _count(con, "sensor_readings_p20250921") == 1
+
+
+def test_housekeeping_only_expires_when_retention_is_configured(con, monkeypatch):
+    partitions.insert_readings(con, [_reading(f"2025-{m:02d}-01T08:00:00") for m in range(1, 10)])
+    for _ in range(2):
+        core.db.housekeeping(con)
+    assert _count(con) == 9 and len(partitions.partitions(con)) == 9 + 3
+
+    monkeypatch.setattr(partitions, "KEEP_DAYS", 30)  # EDGEKIT_SENSOR_KEEP_DAYS=30
+    core.db.housekeeping(con)
+    assert _count(con) == 0 and len(partitions.partitions(con)) == 3
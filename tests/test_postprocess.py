@@ -0,0 +1,24 @@
+import numpy as np
+from vision_runtime.postprocess import decode_detections, nms
+
+def _rows():
+    rng = np.random.default_rng(0)
+    rows = np.zeros((500, 6), np.float32)
+    rows[:, :2] = rng.uniform(0, 640, (500, 2)); rows[:, 2:4] = rng.uniform(10, 80, (500, 2))
+    rows[:, 4] = rng.uniform(0, 1, 500); rows[:, 5] = rng.integers(0, 3, 500)
+    return rows
+
+def test_without_nms_matches_row_loop():
+    rows = _rows()
+    expected = [{"cls": str(int(r[5])), "score": float(r[4]), "bbox": [float(v / 0.5) for v in r[:4]]}
+                for r in rows if r[4] >= 0.5]
+    assert decode_detections([rows], 0.5, conf_th=0.5, nms_enabled=False, topk=None) == expected
+
+def test_class_aware_nms_and_topk():
+    rows = np.array([[100, 100, 50, 50, 0.9, 0], [102, 101, 50, 50, 0.8, 0],
+                     [101, 100, 50, 50, 0.7, 1], [400, 400, 20, 20, 0.6, 0]], np.float32)
+    dets = decode_detections([rows[None]], 1.0, conf_th=0.5, iou_th=0.5, topk=100)
+    assert [(d["cls"], round(d["score"], 1)) for d in dets] == [("0", 0.9), ("1", 0.7), ("0", 0.6)]
+    assert len(decode_detections([rows], 1.0, conf_th=0.5, topk=2)) == 2
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11]], np.float32)
+    assert nms(boxes, np.array([0.5, 0.9], np.float32), 0.5).tolist() == [1]
@@ -0,0 +1,54 @@
+import shutil
+
+import pytest
+
+import core.db
+from bench import regression_gate
+from orchestration.model_pack import load_bench_baseline, load_model_pack, save_model_pack
+from vision_runtime import session_cache
+
+
+@pytest.fixture
+def pack(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.db, "DB_PATH", tmp_path / "edge.db")
+    monkeypatch.setattr(session_cache, "CACHE_DIR", tmp_path / "ort_cache")
+    d = tmp_path / "pack"
+    d.mkdir()
+    shutil.copy("models/defect_detector.onnx", d / "model.onnx")
+    save_model_pack(str(d), {"model_id": "defect", "version": "1", "artifacts": {"onnx": "model.onnx"}})
+    return str(d)
+
+
+def test_compare_uses_noise_and_relative_floor():
+    base = {"p50_ms": 10.0, "p50_noise_ms": 0.1, "p99_ms": 20.0, "p99_noise_ms": 2.0}
+    # p50 +8% is above the 5% floor and 3 sigma; p99 +20% is inside its 3 sigma noise band
+    r = regression_gate.compare(base, {"p50_ms": 10.8, "p50_noise_ms": 0.1, "p99_ms": 24.0, "p99_noise_ms": 2.0})
+    assert r["status"] == "regressed"
+    assert r["metrics"]["p50"]["verdict"] == "regressed" and r["metrics"]["p99"]["verdict"] == "ok"
+    # quiet trials still do not fail on a 3% wobble
+    assert regression_gate.compare(base, {"p50_ms": 10.3, "p99_ms": 20.5})["status"] == "ok"
+    assert regression_gate.compare(base, {"p50_ms": 8.0, "p99_ms": 20.0})["status"] == "improved"
+
+
+def test_trial_stats_median_and_spread():
+    s = regression_gate.trial_stats([[1.0] * 10, [2.0] * 10, [3.0] * 10])
+    assert s["trials"] == 3 and s["p50_ms"] == 2.0 and s["p50_noise_ms"] == 1.0
+
+
+def test_gate_accepts_baseline_then_flags_slowdown(pack):
+    hw = regression_gate.input_hw()
+    kw = dict(trials=2, warmup=1, repeats=3, log=lambda *_: None)
+    assert regression_gate.run_gate(pack, **kw) == regression_gate.EXIT_NO_BASELINE
+    assert regression_gate.run_gate(pack, accept=True, **kw) == regression_gate.EXIT_OK
+    base = load_bench_baseline(pack, hw)
+    (key, entry), = base.items()
+    assert key == "onnxruntime/640/b1/t0/all" and entry["trials"] == 2 and entry["p50_ms"] > 0
+    assert "benchmarks" in load_model_pack(pack)
+
+    # pretend the accepted run was faster than anything this box can do; with no tolerance left it must fail
+    doc = load_model_pack(pack)
+    for m in ("p50", "p95", "p99"):
+        doc["bench_baseline"][hw][key][f"{m}_ms"] = 0.0
+        doc["bench_baseline"][hw][key][f"{m}_noise_ms"] = 0.0
+    save_model_pack(pack, doc)
+    assert regression_gate.run_gate(pack, k=0.0, min_abs_ms=0.0, **kw) == regression_gate.EXIT_REGRESSION
@@ -0,0 +1,23 @@
+import numpy as np
+import yaml
+from examples.vision_inspection.camera_infer import preprocess_bgr
+from src.preprocessing.roi_cropper import ROIBatcher, load_rois
+
+def test_load_rois_prefers_camera_entry(tmp_path):
+    cams = tmp_path / "cameras.yaml"; recipe = tmp_path / "pipeline.yaml"
+    cams.write_text(yaml.safe_dump({"cameras": [{"id": "cam1", "rois": [{"x": 1, "y": 2, "w": 3, "h": 4}]}]}))
+    recipe.write_text(yaml.safe_dump({"preprocess": {"rois": [{"name": "r", "x": 0, "y": 0, "w": 5, "h": 5}]}}))
+    assert load_rois("cam1", str(cams), str(recipe)) == [{"name": "roi0", "x": 1, "y": 2, "w": 3, "h": 4}]
+    assert load_rois("other", str(cams), str(recipe))[0]["name"] == "r"
+
+def test_batch_matches_per_crop_letterbox_and_maps_back():
+    frame = np.random.default_rng(2).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    rois = [{"name": "a", "x": 10, "y": 20, "w": 100, "h": 60}, {"name": "b", "x": 600, "y": 400, "w": 100, "h": 100}]
+    batcher = ROIBatcher(rois, (160, 160))
+    batch, meta = batcher(frame)
+    assert batch.shape == (2, 3, 160, 160)
+    ref, scale = preprocess_bgr(frame[20:80, 10:110], (160, 160))
+    assert np.array_equal(batch[0:1], ref) and meta[0] == (10, 20, scale)
+    assert meta[1][:2] == (600, 400)  # clipped to the frame edge
+    dets = batcher.to_frame([[{"cls": "0", "score": 0.9, "bbox": [5.0, 5.0, 2.0, 2.0]}], []], meta)
+    assert dets == [{"cls": "0", "score": 0.9, "bbox": [15.0, 25.0, 2.0, 2.0], "roi": "a"}]
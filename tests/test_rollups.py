@@ -0,0 +1,99 @@
+import io
+import random
+
+import pytest
+
+import core.db
+from core import rollups
+
+
+@pytest.fixture
+def con(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.db, "DB_PATH", tmp_path / "edge.db")
+    con = core.db.connect(); core.db.migrate(con)
+    yield con
+    con.close()
+
+
+def _seed(con, n=2000, seed=0, unit="U"):
+    rng = random.Random(seed)
+    rows = [(f"2025-09-{20 + i // 1000:02d}T{(i // 60) % 24:02d}:{i % 60:02d}:{rng.randint(0, 59):02d}",
+             rng.choice(["E1", "E2"]), rng.choice(["ST01", "ST02"]), rng.choice(["A", "B", None]), f"{unit}{i:05d}",
+             "PASS" if rng.random() < 0.9 else "FAIL", rng.random(), rng.choice(["v1", "v2"])) for i in range(n)]
+    con.executemany("INSERT INTO inspections(ts, device_id, station, shift, unit_id, result, score, model_ver) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _raw(con, length, where="1"):
+    return {r[0]: (r[1], r[2]) for r in con.execute(
+        f"SELECT replace(substr(ts, 1, {length}), 'T', ' '), SUM(result='PASS'), SUM(result='FAIL') "
+        f"FROM inspections WHERE {where} GROUP BY 1")}
+
+
+def _series(rows):
+    return {r["bucket"]: (r["pass_cnt"], r["fail_cnt"]) for r in rows}
+
+
+def test_triggers_keep_every_tier_equal_to_a_scan(con):
+    _seed(con)
+    con.execute("DELETE FROM inspections WHERE unit_id IN ('U00001', 'U00002')")
+    con.execute("UPDATE inspections SET result = 'FAIL' WHERE unit_id = 'U00010'")
+    row = con.execute("SELECT ts, device_id FROM inspections WHERE unit_id = 'U00020'").fetchone()
+    con.execute("INSERT OR REPLACE INTO inspections(ts, device_id, unit_id, result, station) VALUES (?, ?, 'U00020', 'FAIL', 'ST09')",
+                tuple(row))
+    for tier, length in rollups.TIERS:
+        assert _series(rollups.yield_series(con, resolution=tier)) == _raw(con, length)
+    assert rollups.dimension_values(con, "station") == ["ST01", "ST02", "ST09"]
+    assert rollups.dimension_values(con, "shift") == ["", "A", "B"]
+
+
+def test_coarsest_aligned_tier_is_queried(con):
+    assert rollups.pick_tier() == "day"
+    assert rollups.pick_tier("2025-09-20", "2025-09-21T00:00:00") == "day"
+    assert rollups.pick_tier("2025-09-20 05:00", "2025-09-21") == "hour"
+    assert rollups.pick_tier("2025-09-20 05:07:00", None) == "minute"
+    assert rollups.pick_tier("2025-09-20", None, resolution="hour") == "hour"
+
+    _seed(con)
+    got = rollups.yield_series(con, "2025-09-20 05:00", "2025-09-21 02:00", resolution="day", station=["ST01"])
+    assert _series(got) == _raw(con, 10, "ts >= '2025-09-20T05' AND ts < '2025-09-21T02' AND station = 'ST01'")
+    latest = rollups.yield_series(con, resolution="hour", by=["model_ver"], latest=3)
+    assert [r["bucket"] for r in latest][::2] == ["2025-09-21 21", "2025-09-21 22", "2025-09-21 23"]
+    with pytest.raises(ValueError):
+        rollups.yield_series(con, by=["device_id"])
+
+
+def test_backfill_reconciles_writes_that_skipped_triggers(con):
+    _seed(con)
+    con.execute("DROP TRIGGER inspection_rollup_ins")
+    _seed(con, n=1500, seed=1, unit="V")
+    con.execute("INSERT INTO inspections(ts, device_id, unit_id, result) VALUES ('2025-09-25T01:00:00', 'E1', 'X', 'FAIL')")
+    assert _series(rollups.yield_series(con)) != _raw(con, 10)
+    con.executescript(rollups.trigger_sql(rollups._columns(con)))
+    # 09-25 holds the newest hour, so it is still served from the minute tier
+    assert rollups.backfill(con, since="2025-09-20T12:00:00")["day"] == 2 * 2 * 3 * 2
+    assert rollups.watermark(con) == "2025-09-25 01:00"
+    for tier, length in rollups.TIERS:
+        assert _series(rollups.yield_series(con, resolution=tier)) == _raw(con, length)
+    buf = io.StringIO()
+    assert rollups.export_csv(con, buf, start="2025-09-21") == 2
+    assert buf.getvalue().splitlines()[0] == "bucket,n,pass_cnt,fail_cnt,yield_pct,mean_score"
+
+
+def test_fold_rolls_completed_hours_up_and_late_rows_still_count(con):
+    _seed(con)
+    assert con.execute(f"SELECT COUNT(*) FROM {rollups.table('hour')}").fetchone()[0] == 0  # only minutes are live
+    assert rollups.fold(con) == "2025-09-21 23:00"
+    assert rollups.fold(con) == "2025-09-21 23:00"  # idempotent
+    assert con.execute(f"SELECT MAX(bucket) FROM {rollups.table('hour')}").fetchone()[0] == "2025-09-21 22"
+    con.execute("INSERT INTO inspections(ts, device_id, unit_id, result) VALUES ('2025-09-20T03:30:00', 'E1', 'L1', 'FAIL')")
+    con.execute("UPDATE inspections SET result = 'FAIL' WHERE unit_id = 'U00100'")
+    con.execute("DELETE FROM inspections WHERE unit_id = 'U01990'")
+    con.execute("INSERT INTO inspections(ts, device_id, unit_id, result) VALUES ('2025-09-22T00:10:00', 'E1', 'N1', 'PASS')")
+    for tier, length in rollups.TIERS:
+        assert _series(rollups.yield_series(con, resolution=tier)) == _raw(con, length)
+    assert rollups.fold(con) == "2025-09-22 00:00"
+    for tier, length in rollups.TIERS:
+        assert _series(rollups.yield_series(con, resolution=tier)) == _raw(con, length)
+        assert _series(rollups.yield_series(con, resolution=tier, latest=2)) == dict(
+            sorted(_raw(con, length).items())[-2:])
@@ -0,0 +1,48 @@
+import shutil
+import sqlite3
+import threading
+
+import pytest
+
+import services.db as sdb
+from services.kpis import build_kpis
+
+
+@pytest.fixture
+def edgekit(tmp_path, monkeypatch):
+    path = tmp_path / "edgekit.db"
+    shutil.copy("data/edgekit.db", path)
+    monkeypatch.setattr(sdb, "DB_PATH", str(path))
+    yield path
+    sdb.close_pools()
+
+
+def test_one_tuned_readonly_connection_per_thread(edgekit):
+    a, b = sdb.pooled(), sdb.pooled()
+    assert a is b
+    assert a.execute("PRAGMA cache_size").fetchone()[0] == -sdb.CACHE_SIZE_KB
+    assert a.execute("PRAGMA query_only").fetchone()[0] == 1
+    with pytest.raises(sqlite3.OperationalError):
+        a.execute("DELETE FROM devices")
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(sdb.pooled()))
+    t.start(); t.join()
+    assert other[0] is not a
+    # the finished thread's connection is closed when the next thread opens one
+    t = threading.Thread(target=sdb.pooled)
+    t.start(); t.join()
+    assert sdb.pool().size() == 2 and sdb.pool().opened == 3
+
+
+def test_query_helpers_and_kpis_reuse_the_pool(edgekit):
+    assert sdb.q_one("SELECT COUNT(*) FROM devices") == 10
+    assert len(sdb.q_all("SELECT device_id FROM devices LIMIT 3")) == 3
+    assert sum(1 for _ in sdb.q_iter("SELECT device_id FROM devices")) == 10
+    report = build_kpis()
+    assert report.total_devices == 10 and report.total_quality_checks == 500
+    assert sdb.pool().opened == 1
+
+    w = sdb.pooled(readonly=False)
+    w.execute("INSERT INTO devices(device_id) VALUES ('new')"); w.commit()
+    assert sdb.q_one("SELECT COUNT(*) FROM devices") == 11  # readers see committed writes
@@ -0,0 +1,16 @@
+from vision_runtime import session_cache
+
+MODEL = "models/defect_detector.onnx"
+
+def test_session_shared_in_process_and_cached_on_disk(tmp_path):
+    session_cache.clear_memory_cache()
+    a = session_cache.get_session(MODEL, cache_dir=tmp_path)
+    assert session_cache.last_load["tier"] == "miss"
+    assert list(tmp_path.glob("*.onnx"))
+    assert session_cache.get_session(MODEL, cache_dir=tmp_path) is a
+    assert session_cache.last_load["tier"] == "memory"
+    session_cache.get_session(MODEL, cache_dir=tmp_path, share=False)
+    assert session_cache.last_load["tier"] == "disk"
+    session_cache.get_session(MODEL, cache_dir=tmp_path, intra_op_threads=1, share=False)
+    assert session_cache.last_load["tier"] == "miss"
+    session_cache.clear_memory_cache()
@@ -0,0 +1,33 @@
+import time
+from vision_runtime.stages import StagedPipeline, BLOCK, DROP_OLDEST
+
+def _source(n):
+    it = iter(range(n))
+    return lambda: next(it, None)
+
+def test_block_policy_delivers_every_item():
+    seen = []
+    pipe = StagedPipeline(_source(50), [("double", lambda x: x * 2), ("sink", seen.append)],
+                          queue_size=2, drop_policy=BLOCK)
+    pipe.run()
+    assert seen == [x * 2 for x in range(50)]
+    assert pipe.stats()["double"]["dropped"] == 0
+
+def test_drop_oldest_keeps_newest_under_slow_stage():
+    seen = []
+    def slow(x):
+        time.sleep(0.002); seen.append(x)
+    pipe = StagedPipeline(_source(200), [("slow", slow)], queue_size=2, drop_policy=DROP_OLDEST)
+    pipe.run()
+    stats = pipe.stats()["slow"]
+    assert seen[-1] == 199
+    assert stats["dropped"] + stats["processed"] == 200
+
+def test_evicted_items_are_reported_to_on_drop():
+    seen, evicted = [], []
+    def slow(x):
+        time.sleep(0.002); seen.append(x)
+    pipe = StagedPipeline(_source(200), [("slow", slow)], queue_size=2, drop_policy=DROP_OLDEST,
+                          on_drop=evicted.append)
+    pipe.run()
+    assert evicted and sorted(seen + evicted) == list(range(200))
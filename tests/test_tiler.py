@@ -0,0 +1,26 @@
+import numpy as np
+from src.preprocessing.tiler import TileBatcher, run_chunked, tile_grid
+
+def test_grid_covers_frame_with_overlap():
+    tiles = tile_grid(1000, 2500, tile=640, overlap=0.25)
+    assert {t["x"] for t in tiles} == {0, 480, 960, 1440, 1860}
+    assert {t["y"] for t in tiles} == {0, 360}
+    assert max(t["x"] + t["w"] for t in tiles) == 2500
+
+def test_cross_tile_duplicates_are_merged():
+    frame = np.zeros((300, 600, 3), np.uint8)
+    tiler = TileBatcher(tile=320, overlap=0.5)
+    batch, ctx = tiler(frame)
+    assert batch.shape[0] == 3
+    # the same object seen by tile 0 (x0=0) and tile 1 (x0=160)
+    dets = [[{"cls": "0", "score": 0.9, "bbox": [200.0, 50.0, 40.0, 40.0]}],
+            [{"cls": "0", "score": 0.8, "bbox": [42.0, 50.0, 40.0, 40.0]}], []]
+    merged = tiler.to_frame(dets, ctx)
+    assert len(merged) == 1 and merged[0]["score"] == 0.9
+
+def test_run_chunked_limits_batch():
+    sizes = []
+    def run_model(_fid, blob):
+        sizes.append(blob.shape[0]); return [blob[:, 0, 0, :1]]
+    out = run_chunked(run_model, 2)("f", np.arange(5, dtype=np.float32).reshape(5, 1, 1, 1))
+    assert sizes == [2, 2, 1] and out[0].ravel().tolist() == [0, 1, 2, 3, 4]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# batch_server.py - One shared ONNX session that coalesces per-camera requests into batches
+"""Shared inference server with dynamic batching.
+
+Cameras submit preprocessed NCHW blobs (batch 1) tagged with a frame_id. A single
+worker thread gathers up to `max_batch` requests or waits at most `max_wait_ms`
+after the first one, runs one `sess.run`, and scatters the outputs back per frame_id.
+
+In-process:   server = BatchingInferenceServer(sess); fut = server.submit(fid, blob)
+Cross-process: python vision_runtime/batch_server.py --model m.onnx --port 6001
+               client = BatchClient(("localhost", 6001)); client.infer(fid, blob)
+"""
+from __future__ import annotations
+import argparse, collections, pathlib, queue, sys, threading, time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from vision_runtime.postprocess import split_outputs
+
+DEFAULT_AUTHKEY = b"sintrones-edge"
+
+
+def _percentile(samples, q):
+    return float(np.percentile(np.asarray(samples), q)) if samples else 0.0
+
+
+class BatchingInferenceServer:
+    def __init__(self, sess, max_batch: int = 8, max_wait_ms: float = 5.0, max_pending: int = 256):
+        self.sess = sess
+        self.input_name = sess.get_inputs()[0].name
+        batch_dim = sess.get_inputs()[0].shape[0]
+        # A model exported with a fixed batch of 1 cannot be coalesced
+        self.max_batch = 1 if batch_dim == 1 else max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._q: "queue.Queue[Tuple[str, np.ndarray, float, Future]]" = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batch_sizes: Dict[int, int] = collections.Counter()
+        self._qdelay_ms: Deque[float] = collections.deque(maxlen=4096)
+        self._run_ms: Deque[float] = collections.deque(maxlen=4096)
+        self.frames = 0
+
+    # ---- lifecycle ----
+    def start(self) -> "BatchingInferenceServer":
+        self._thread = threading.Thread(target=self._loop, name="batch-infer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    # ---- API ----
+    def submit(self, frame_id: str, blob: np.ndarray) -> Future:
+        """Queue a preprocessed blob (NxCxHxW or CxHxW); resolves to the list of outputs for its rows."""
+        fut: Future = Future()
+        if blob.ndim == 3:
+            blob = blob[None]
+        self._q.put((frame_id, blob, time.perf_counter(), fut))
+        return fut
+
+    def infer(self, frame_id: str, blob: np.ndarray, timeout: Optional[float] = None) -> List[np.ndarray]:
+        return self.submit(frame_id, blob).result(timeout)
+
+    # ---- worker ----
+    def _gather(self) -> List[Tuple[str, np.ndarray, float, Future]]:
+        try:
+            first = self._q.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        rows = first[1].shape[0]
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                req = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(req); rows += req[1].shape[0]
+        return batch
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            batch = self._gather()
+            if not batch:
+                continue
+            t0 = time.perf_counter()
+            # Group by input shape so mixed resolutions never share a tensor
+            groups: Dict[Tuple[int, ...], List[Tuple[str, np.ndarray, float, Future]]] = {}
+            for req in batch:
+                groups.setdefault(req[1].shape[1:], []).append(req)
+            for reqs in groups.values():
+                self._run_group(reqs, t0)
+        # Fail whatever is still queued so callers never wait forever
+        while True:
+            try:
+                self._q.get_nowait()[3].set_exception(RuntimeError("batch server stopped"))
+            except queue.Empty:
+                break
+
+    def _run_group(self, reqs, t0: float) -> None:
+        counts = [r[1].shape[0] for r in reqs]  # a request may carry several rows (e.g. ROI crops)
+        n = sum(counts)
+        try:
+            x = reqs[0][1] if len(reqs) == 1 else np.concatenate([r[1] for r in reqs], axis=0)
+            outputs = self.sess.run(None, {self.input_name: x})
+        except Exception as e:
+            for r in reqs:
+                r[3].set_exception(e)
+            return
+        run_ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.batch_sizes[n] += 1
+            self.frames += n
+            self._run_ms.append(run_ms)
+            for r in reqs:
+                self._qdelay_ms.append((t0 - r[2]) * 1000.0)
+        for r, per in zip(reqs, split_outputs(outputs, counts)):
+            r[3].set_result(per)
+
+    # ---- reporting ----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+            qd = list(self._qdelay_ms); rm = list(self._run_ms); frames = self.frames
+        runs = sum(sizes.values())
+        return {
+            "frames": frames,
+            "batches": runs,
+            "mean_batch": round(frames / runs, 2) if runs else 0.0,
+            "batch_size_hist": sizes,
+            "queue_delay_ms": {"p50": round(_percentile(qd, 50), 2), "p95": round(_percentile(qd, 95), 2),
+                               "max": round(max(qd), 2) if qd else 0.0},
+            "run_ms": {"p50": round(_percentile(rm, 50), 2), "p95": round(_percentile(rm, 95), 2)},
+            "pending": self._q.qsize(),
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"[batch-server] frames={s['frames']} batches={s['batches']} mean_batch={s['mean_batch']} "
+                f"hist={s['batch_size_hist']} qdelay_ms(p50/p95)={s['queue_delay_ms']['p50']}/"
+                f"{s['queue_delay_ms']['p95']} run_ms(p50)={s['run_ms']['p50']} pending={s['pending']}")
+
+
+# ---- cross-process transport ----
+# Blobs travel as raw bytes (send_bytes) with a small header, never as pickled arrays.
+
+def _handle_client(conn, server: BatchingInferenceServer) -> None:
+    try:
+        while True:
+            frame_id, shape, dtype = conn.recv()
+            blob = np.frombuffer(conn.recv_bytes(), dtype=dtype).reshape(shape)
+            try:
+                conn.send(("ok", server.infer(frame_id, blob)))
+            except Exception as e:
+                conn.send(("error", repr(e)))
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def serve(server: BatchingInferenceServer, host: str = "localhost", port: int = 6001,
+          authkey: bytes = DEFAULT_AUTHKEY, stats_every: float = 10.0) -> None:
+    listener = Listener((host, port), authkey=authkey)
+    server.start()
+
+    def _report():
+        while stats_every > 0:
+            time.sleep(stats_every); print(server.format_stats(), flush=True)
+    threading.Thread(target=_report, daemon=True).start()
+    print(f"[batch-server] listening on {host}:{port} max_batch={server.max_batch} "
+          f"max_wait_ms={server.max_wait * 1000:.1f}", flush=True)
+    try:
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_client, args=(conn, server), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close(); server.stop()
+
+
+class BatchClient:
+    """Camera-side handle to a remote BatchingInferenceServer (one connection per camera)."""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes = DEFAULT_AUTHKEY):
+        self._conn = Client(address, authkey=authkey)
+
+    def infer(self, frame_id: str, blob: np.ndarray) -> List[np.ndarray]:
+        blob = np.ascontiguousarray(blob)
+        self._conn.send((frame_id, blob.shape, blob.dtype.str))
+        self._conn.send_bytes(memoryview(blob).cast("B"))
+        status, res = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"batch server failed on {frame_id}: {res}")
+        return res
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def parse_address(s: str) -> Tuple[str, int]:
+    host, _, port = s.rpartition(":")
+    return (host or "localhost", int(port))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Shared ONNX inference server with dynamic batching")
+    ap.add_argument("--model", required=True, help="ONNX model path")
+    ap.add_argument("--host", default="localhost")
+    ap.add_argument("--port", type=int, default=6001)
+    ap.add_argument("--max-batch", type=int, default=8, help="Largest batch handed to sess.run")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0, help="Max time to hold the first request for company")
+    ap.add_argument("--stats-every", type=float, default=10.0, help="Print batching stats every N seconds (0 = off)")
+    ap.add_argument("--threads", type=int, default=0, help="ORT intra-op threads (0 = runtime default)")
+    args = ap.parse_args()
+
+    from vision_runtime.session_cache import get_session
+    sess = get_session(args.model, intra_op_threads=args.threads)
+    serve(BatchingInferenceServer(sess, args.max_batch, args.max_wait_ms),
+          args.host, args.port, stats_every=args.stats_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# det_publisher.py - Coalesced, compact detection publishing over MQTT
+"""Publish detections per frame (legacy JSON) or as windowed batches.
+
+Legacy mode (encoding="json", window_ms=0, empty="send") publishes exactly what
+camera_infer.py always sent: one JSON payload per frame on `topic`.
+
+Batched modes collect frames for `window_ms` (or until `max_frames`) and publish one
+message on `<topic>/batch/<encoding>`:
+
+    json / msgpack   {"v": 1, "source": str, "t0": epoch s, "empty": int,
+                      "frames": [{"id": str, "dt_ms": int, "img": str,
+                                  "dets": [[cls, score, b0, b1, b2, b3(, roi)], ...]}]}
+    struct           the same fields packed little-endian (see _pack_struct)
+
+b0..b3 is the detection's "bbox" exactly as in the legacy payload, i.e. in the
+model's box format (cx, cy, w, h for the default decoder), not converted to
+corners. Detections from camera_infer.py --rois carry the ROI name as a 7th element.
+
+Frames without detections can be sent like any other ("send"), dropped ("drop") or
+only counted in the batch's "empty" field ("heartbeat"); in heartbeat mode a batch
+carrying just the count goes out every `heartbeat_s` even when nothing was found.
+decode_batch() turns any batch back into legacy-style payload dicts.
+"""
+from __future__ import annotations
+import json, struct, threading, time
+from typing import Any, Callable, Dict, List, Optional
+
+ENCODINGS = ("json", "msgpack", "struct")
+EMPTY_POLICIES = ("send", "drop", "heartbeat")
+
+_MAGIC = b"EDB1"
+_HEAD = struct.Struct("<4sBHIdH")   # magic, version, n_frames, n_empty, t0, len(source)
+_ROIS = struct.Struct("<B")         # v2: number of ROI names, each then as len (B) + utf-8
+_FRAME = struct.Struct("<BIHH")     # len(frame_id), dt_ms, len(image_path), n_dets
+_DET = struct.Struct("<H5f")        # v1: cls, score, b0, b1, b2, b3
+_DET2 = struct.Struct("<H5fB")      # v2: ... plus roi (0 = none, i + 1 = ROI name i)
+
+
+def legacy_payload(source, frame_id, dets, img_path, ts=None):
+    return {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)),
+        "source": source,
+        "frame_id": frame_id,
+        "detections": dets,
+        "image_path": f"file://{img_path}" if img_path else ""
+    }
+
+
+def _rows(dets):
+    return [[int(d["cls"]), round(float(d["score"]), 4)] + [round(float(v), 1) for v in d["bbox"]]
+            + ([str(d["roi"])] if d.get("roi") is not None else []) for d in dets]
+
+
+def _pack_struct(batch):
+    src = batch["source"].encode("utf-8")
+    rois = sorted({r[6] for f in batch["frames"] for r in f["dets"] if len(r) > 6})
+    if len(rois) > 254:
+        raise ValueError(f"too many ROI names in one batch: {len(rois)}")
+    index = {name: i + 1 for i, name in enumerate(rois)}
+    parts = [_HEAD.pack(_MAGIC, 2, len(batch["frames"]), batch["empty"], batch["t0"], len(src)), src,
+             _ROIS.pack(len(rois))]
+    for name in rois:
+        raw = name.encode("utf-8")
+        parts += [_ROIS.pack(len(raw)), raw]
+    for f in batch["frames"]:
+        fid, img = f["id"].encode("utf-8"), f["img"].encode("utf-8")
+        parts.append(_FRAME.pack(len(fid), f["dt_ms"], len(img), len(f["dets"])))
+        parts += [fid, img]
+        parts += [_DET2.pack(*r[:6], index[r[6]] if len(r) > 6 else 0) for r in f["dets"]]
+    return b"".join(parts)
+
+
+def _unpack_struct(data):
+    magic, version, n_frames, empty, t0, n_src = _HEAD.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError("not a packed detection batch")
+    off = _HEAD.size
+    batch = {"v": 1, "source": data[off:off + n_src].decode("utf-8"), "t0": t0, "empty": empty, "frames": []}
+    off += n_src
+    rois = []
+    if version >= 2:
+        (n_rois,) = _ROIS.unpack_from(data, off); off += _ROIS.size
+        for _ in range(n_rois):
+            (n,) = _ROIS.unpack_from(data, off); off += _ROIS.size
+            rois.append(data[off:off + n].decode("utf-8")); off += n
+    det = _DET2 if version >= 2 else _DET
+    for _ in range(n_frames):
+        n_id, dt_ms, n_img, n_dets = _FRAME.unpack_from(data, off); off += _FRAME.size
+        fid = data[off:off + n_id].decode("utf-8"); off += n_id
+        img = data[off:off + n_img].decode("utf-8"); off += n_img
+        dets = []
+        for _ in range(n_dets):
+            row = list(det.unpack_from(data, off)); off += det.size
+            if version >= 2:
+                roi = row.pop()
+                if roi:
+                    row.append(rois[roi - 1])
+            dets.append(row)
+        batch["frames"].append({"id": fid, "dt_ms": dt_ms, "img": img, "dets": dets})
+    return batch
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("encoding='msgpack' needs the msgpack package (pip install msgpack)") from e
+    return msgpack
+
+
+def encode_batch(batch, encoding):
+    if encoding == "json":
+        return json.dumps(batch, separators=(",", ":")).encode("utf-8")
+    if encoding == "msgpack":
+        return _msgpack().packb(batch, use_bin_type=True)
+    return _pack_struct(batch)
+
+
+def decode_batch(data, encoding):
+    """Batch message -> (list of legacy-style payloads, number of empty frames)."""
+    if encoding == "json":
+        batch = json.loads(data)
+    elif encoding == "msgpack":
+        batch = _msgpack().unpackb(data, raw=False)
+    else:
+        batch = _unpack_struct(data)
+    out = []
+    for f in batch["frames"]:
+        dets = [dict({"cls": str(int(r[0])), "score": float(r[1]), "bbox": [float(v) for v in r[2:6]]},
+                     **({"roi": r[6]} if len(r) > 6 else {})) for r in f["dets"]]
+        out.append(legacy_payload(batch["source"], f["id"], dets, f["img"], batch["t0"] + f["dt_ms"] / 1000.0))
+    return out, int(batch["empty"])
+
+
+class DetectionPublisher:
+    """publish(source, frame_id, dets, img_path) front-end over an MQTT client.
+
+    Counts messages, bytes, frames and suppressed empty frames so the broker load of
+    each mode can be compared (format_stats()).
+    """
+
+    def __init__(self, client, topic: str, encoding: str = "json", window_ms: float = 0.0, max_frames: int = 64,
+                 empty: str = "send", heartbeat_s: float = 5.0, qos: int = 0,
+                 clock: Callable[[], float] = time.time):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding} (expected one of {ENCODINGS})")
+        if empty not in EMPTY_POLICIES:
+            raise ValueError(f"Unknown empty-frame policy: {empty} (expected one of {EMPTY_POLICIES})")
+        if encoding == "msgpack":
+            _msgpack()
+        self.client = client
+        self.topic = topic
+        self.encoding = encoding
+        self.window_s = max(0.0, float(window_ms)) / 1000.0
+        self.max_frames = max(1, int(max_frames))
+        self.empty = empty
+        self.heartbeat_s = heartbeat_s
+        self.qos = qos
+        self.clock = clock
+        self.legacy = encoding == "json" and self.window_s == 0.0 and empty == "send"
+        self._lock = threading.Lock()
+        self._frames: List[Dict[str, Any]] = []
+        self._source = ""
+        self._t0: Optional[float] = None
+        self._n_empty = 0
+        self._last_sent = clock()
+        self._started = clock()
+        self._timer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.counters = {"frames": 0, "messages": 0, "bytes": 0, "suppressed": 0}
+
+    @property
+    def batch_topic(self):
+        return f"{self.topic}/batch/{self.encoding}"
+
+    def __call__(self, source, frame_id, dets, img_path, ts=None):
+        ts = self.clock() if ts is None else ts
+        if self.legacy:
+            self._send(self.topic, json.dumps(legacy_payload(source, frame_id, dets, img_path, ts)).encode("utf-8"), frames=1)
+            return
+        with self._lock:
+            self.counters["frames"] += 1
+            self._source = source
+            if not dets and self.empty != "send":
+                self.counters["suppressed"] += 1
+                if self.empty == "drop":
+                    return
+                self._n_empty += 1
+            if self._t0 is None:
+                self._t0 = ts
+            if dets or self.empty == "send":
+                self._frames.append({"id": frame_id, "dt_ms": max(0, int(round((ts - self._t0) * 1000.0))),
+                                     "img": img_path or "", "dets": _rows(dets)})
+        self.poll(ts)
+
+    def poll(self, now=None):
+        """Flush the pending batch if its window elapsed, it is full, or a heartbeat is due."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            if self._t0 is None:
+                return
+            if self._frames:
+                due = len(self._frames) >= self.max_frames or now - self._t0 >= self.window_s
+            else:
+                due = self._n_empty > 0 and now - self._last_sent >= self.heartbeat_s
+            if not due:
+                return
+            batch = self._take()
+        self._publish(batch, now)
+
+    def _take(self):
+        batch = {"v": 1, "source": self._source, "t0": self._t0, "empty": self._n_empty, "frames": self._frames}
+        self._frames, self._t0, self._n_empty = [], None, 0
+        return batch
+
+    def _publish(self, batch, now):
+        self._last_sent = now
+        self._send(self.batch_topic, encode_batch(batch, self.encoding), frames=0)
+
+    def _send(self, topic, data, frames):
+        # frames: how many frames this message accounts for that __call__ has not counted yet
+        self.client.publish(topic, data, qos=self.qos)
+        with self._lock:
+            self.counters["messages"] += 1
+            self.counters["bytes"] += len(data)
+            self.counters["frames"] += frames
+
+    def flush(self):
+        """Publish whatever is pending (frames or an empty-frame count)."""
+        with self._lock:
+            if self._t0 is None or (not self._frames and not self._n_empty):
+                return
+            batch = self._take()
+        self._publish(batch, self.clock())
+
+    def start(self):
+        """Poll from a timer thread so windows and heartbeats close even when no frames
+        arrive (e.g. a motion gate skipping a still scene)."""
+        if self.legacy:
+            return self
+        interval = max(0.01, min(self.window_s or self.heartbeat_s, self.heartbeat_s) / 2.0)
+
+        def tick():
+            while not self._stop.wait(interval):
+                self.poll()
+        self._timer = threading.Thread(target=tick, name="det-publisher", daemon=True)
+        self._timer.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join(timeout=2.0)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(1e-9, self.clock() - self._started)
+        c = dict(self.counters)
+        c.update(msgs_per_s=round(c["messages"] / elapsed, 2), bytes_per_s=round(c["bytes"] / elapsed, 1),
+                 bytes_per_frame=round(c["bytes"] / c["frames"], 1) if c["frames"] else 0.0)
+        return c
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        mode = "legacy-json" if self.legacy else f"{self.encoding} window={self.window_s * 1000:.0f}ms empty={self.empty}"
+        return (f"[mqtt] {mode} frames={s['frames']} messages={s['messages']} suppressed={s['suppressed']} "
+                f"msgs/s={s['msgs_per_s']:.1f} bytes/s={s['bytes_per_s']:.0f} bytes/frame={s['bytes_per_frame']:.0f}")
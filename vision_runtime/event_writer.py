@@ -0,0 +1,134 @@
+# event_writer.py - Background JPEG/WebP encoding + file writes for defect event frames
+from __future__ import annotations
+import collections, os, pathlib, queue, threading, time
+from typing import Any, Deque, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+FORMATS = {"jpg": cv2.IMWRITE_JPEG_QUALITY, "webp": cv2.IMWRITE_WEBP_QUALITY}
+OVERLOAD_POLICIES = ("drop", "downsample")
+
+
+def _pct(samples, q):
+    return round(float(np.percentile(np.asarray(samples), q)), 2) if samples else 0.0
+
+
+class EventFrameWriter:
+    """Bounded writer pool so a burst of defects never stalls the inference loop.
+
+    submit() returns the final file path straight away (so it can go into the MQTT
+    payload) and the encode + write happens on a worker thread. Files are written
+    to a temp name and renamed, so readers never see a partial image. The frame
+    is copied on submit, since callers may pass views (a shared-memory ring slot)
+    that are overwritten before a worker encodes them.
+
+    Overload handling once the queue passes `high_water` (fraction of capacity):
+      drop        -> the frame is not saved and submit() returns ""
+      downsample  -> the frame is halved before queueing (cheaper to encode);
+                     it is only dropped when the queue is completely full
+    """
+
+    def __init__(self, media_dir, fmt: str = "jpg", quality: int = 90, workers: int = 2,
+                 max_queue: int = 32, overload: str = "downsample", high_water: float = 0.5):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown image format: {fmt} (expected one of {tuple(FORMATS)})")
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy: {overload} (expected one of {OVERLOAD_POLICIES})")
+        self.media_dir = pathlib.Path(media_dir); self.media_dir.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.params = [FORMATS[fmt], int(quality)]
+        self.overload = overload
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._high = max(1, int(self._q.maxsize * high_water))
+        self._lock = threading.Lock()
+        self._latency_ms: Deque[float] = collections.deque(maxlen=4096)
+        self._write_ms: Deque[float] = collections.deque(maxlen=4096)
+        self.counters = {"submitted": 0, "written": 0, "dropped": 0, "downsampled": 0, "errors": 0}
+        self._workers: List[threading.Thread] = [
+            threading.Thread(target=self._run, name=f"event-writer-{i}", daemon=True) for i in range(max(1, int(workers)))
+        ]
+        for t in self._workers:
+            t.start()
+
+    def path_for(self, frame_id: str) -> str:
+        return str((self.media_dir / f"{frame_id}.{self.fmt}").resolve())
+
+    def submit(self, frame: np.ndarray, frame_id: str) -> str:
+        """Queue `frame` for writing; returns the path it will have, or "" if dropped."""
+        path = self.path_for(frame_id)
+        depth = self._q.qsize()
+        with self._lock:
+            self.counters["submitted"] += 1
+        if depth >= self._high:
+            if self.overload == "drop":
+                return self._dropped()
+            frame = cv2.resize(frame, (frame.shape[1] // 2, frame.shape[0] // 2), interpolation=cv2.INTER_AREA)
+            with self._lock:
+                self.counters["downsampled"] += 1
+        else:
+            frame = frame.copy()  # (the resize above already made a private copy)
+        try:
+            self._q.put_nowait((frame, path, time.perf_counter()))
+        except queue.Full:
+            return self._dropped()
+        return path
+
+    def _dropped(self) -> str:
+        with self._lock:
+            self.counters["dropped"] += 1
+        return ""
+
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is None:
+                self._q.task_done(); return
+            frame, path, t_submit = item
+            t0 = time.perf_counter()
+            try:
+                ok, buf = cv2.imencode(f".{self.fmt}", frame, self.params)
+                if not ok:
+                    raise RuntimeError(f"imencode failed for {path}")
+                tmp = f"{path}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(buf.tobytes())
+                os.replace(tmp, path)
+                t1 = time.perf_counter()
+                with self._lock:
+                    self.counters["written"] += 1
+                    self._write_ms.append((t1 - t0) * 1000.0)
+                    self._latency_ms.append((t1 - t_submit) * 1000.0)
+            except Exception as e:
+                with self._lock:
+                    self.counters["errors"] += 1
+                print(f"[event-writer] {e}")
+            finally:
+                self._q.task_done()
+
+    def flush(self) -> None:
+        """Block until everything queued so far is on disk."""
+        self._q.join()
+
+    def close(self) -> None:
+        self.flush()
+        for _ in self._workers:
+            self._q.put(None)
+        for t in self._workers:
+            t.join(timeout=2.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = list(self._latency_ms); wr = list(self._write_ms); counters = dict(self.counters)
+        counters.update({
+            "queue_depth": self._q.qsize(),
+            "write_ms": {"p50": _pct(wr, 50), "p95": _pct(wr, 95)},
+            "latency_ms": {"p50": _pct(lat, 50), "p95": _pct(lat, 95), "p99": _pct(lat, 99)},
+        })
+        return counters
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"[event-writer] written={s['written']} dropped={s['dropped']} downsampled={s['downsampled']} "
+                f"errors={s['errors']} q={s['queue_depth']} write_ms(p50/p95)={s['write_ms']['p50']}/"
+                f"{s['write_ms']['p95']} latency_ms(p95)={s['latency_ms']['p95']}")
@@ -0,0 +1,179 @@
+# latency.py - Per-stage latency histograms and per-frame trace records for the vision loop
+"""Cheap enough to leave on in production.
+
+LatencyHistogram is HDR-style: log2 buckets split into SUB_BUCKETS linear
+sub-buckets, so any percentile is within ~1.6% of the true value and recording is
+one frexp + one list increment (no allocation, no sorting). StageTimer keeps one
+histogram per stage for the whole run plus one for the current reporting interval,
+and can append one JSON line per frame_id to a trace file.
+"""
+from __future__ import annotations
+import json, math, threading, time
+from typing import Any, Dict, List, Optional
+
+SUB_BUCKETS = 32
+_MAX_EXP = 40  # 2**40 us ~ 12 days
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of durations in milliseconds (microsecond resolution)."""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * ((_MAX_EXP + 1) * SUB_BUCKETS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    @staticmethod
+    def _index(ms: float) -> int:
+        us = ms * 1000.0
+        if us < 1.0:
+            return 0
+        m, e = math.frexp(us)  # us = m * 2**e, 0.5 <= m < 1
+        return min(e, _MAX_EXP) * SUB_BUCKETS + int((m - 0.5) * 2 * SUB_BUCKETS)
+
+    @staticmethod
+    def _value(idx: int) -> float:
+        e, sub = divmod(idx, SUB_BUCKETS)
+        if e == 0:
+            return 0.0
+        # midpoint of the bucket, in ms
+        return math.ldexp(0.5 + (sub + 0.5) / (2 * SUB_BUCKETS), e) / 1000.0
+
+    def record(self, ms: float) -> None:
+        self.counts[self._index(ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, int(math.ceil(self.count * q / 100.0)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self._value(i), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {"n": self.count, "mean": round(self.total_ms / self.count, 3) if self.count else 0.0,
+                "p50": round(self.percentile(50), 3), "p95": round(self.percentile(95), 3),
+                "p99": round(self.percentile(99), 3), "max": round(self.max_ms, 3)}
+
+
+class StageTimer:
+    """Per-stage latency recorder shared by the capture/infer/output threads.
+
+        t = timer.start()
+        ...decode...
+        t = timer.lap("decode", t, frame_id)
+        ...infer...
+        t = timer.lap("infer", t, frame_id)
+        timer.end_frame(frame_id)   # writes the frame's trace line, if tracing
+
+    `trace_path`: append {"frame_id", "ts", "<stage>_ms"...} per frame as JSON lines.
+    Frames that never reach end_frame() should be dropped with drop_frame(); as a
+    backstop at most `max_pending` unfinished frames are kept (oldest forgotten first).
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, trace_every: int = 1, max_pending: int = 1024):
+        self.total: Dict[str, LatencyHistogram] = {}
+        self.window: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, "a", buffering=1 << 16) if trace_path else None
+        self.trace_every = max(1, int(trace_every))
+        self._frames: Dict[str, Dict[str, Any]] = {}
+        self.max_pending = max(1, int(max_pending))
+        self._n_frames = 0
+
+    start = staticmethod(time.perf_counter)
+
+    def lap(self, stage: str, t0: float, frame_id: Optional[str] = None) -> float:
+        """Record `stage` as taking from t0 until now; returns now (the next stage's t0)."""
+        now = time.perf_counter()
+        self.record(stage, (now - t0) * 1000.0, frame_id)
+        return now
+
+    def record(self, stage: str, ms: float, frame_id: Optional[str] = None) -> None:
+        with self._lock:
+            h = self.window.get(stage)
+            if h is None:
+                h = self.window[stage] = LatencyHistogram()
+                self.total.setdefault(stage, LatencyHistogram())
+            h.record(ms)
+            if self._trace is not None and frame_id is not None:
+                rec = self._frames.get(frame_id)
+                if rec is None:
+                    if len(self._frames) >= self.max_pending:
+                        del self._frames[next(iter(self._frames))]
+                    rec = self._frames[frame_id] = {}
+                rec[f"{stage}_ms"] = round(ms, 3)
+
+    def end_frame(self, frame_id: str) -> None:
+        if self._trace is None:
+            return
+        with self._lock:
+            rec = self._frames.pop(frame_id, None)
+            self._n_frames += 1
+            if rec is None or self._n_frames % self.trace_every:
+                return
+            rec["frame_id"] = frame_id
+            rec["ts"] = round(time.time(), 3)
+            self._trace.write(json.dumps(rec) + "\n")
+
+    def drop_frame(self, frame_id: str) -> None:
+        """Forget a frame that was filtered out before end_frame()."""
+        if self._trace is not None:
+            with self._lock:
+                self._frames.pop(frame_id, None)
+
+    def roll(self) -> Dict[str, Dict[str, float]]:
+        """Summaries for the interval since the last roll(), folded into the run totals."""
+        with self._lock:
+            window, self.window = self.window, {}
+            for stage, h in window.items():
+                self.total[stage].merge(h)
+            if self._trace is not None:
+                self._trace.flush()
+        return {stage: h.summary() for stage, h in window.items()}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Run-to-date summaries (includes the current interval)."""
+        with self._lock:
+            out = {}
+            for stage, h in self.total.items():
+                merged = LatencyHistogram(); merged.merge(h)
+                if stage in self.window:
+                    merged.merge(self.window[stage])
+                out[stage] = merged.summary()
+        return out
+
+    @staticmethod
+    def format(summaries: Dict[str, Dict[str, float]], label: str = "latency") -> str:
+        parts = [f"{stage}[n={s['n']} p50={s['p50']:.2f} p95={s['p95']:.2f} p99={s['p99']:.2f}]"
+                 for stage, s in summaries.items() if s["n"]]
+        return f"[{label} ms] " + " ".join(parts)
+
+    def format_window(self) -> str:
+        return self.format(self.roll())
+
+    def format_stats(self) -> str:
+        return self.format(self.stats(), "latency total")
+
+    def close(self) -> None:
+        if self._trace is not None:
+            with self._lock:
+                self._trace.close(); self._trace = None
@@ -0,0 +1,117 @@
+# postprocess.py - Vectorized detection decoding with class-aware NMS
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_IOU = 0.45
+MAX_NMS_CANDIDATES = 30000  # highest-scoring boxes considered by NMS
+
+
+def to_rows(outputs) -> Optional[np.ndarray]:
+    """Flatten a model output (list/tuple or array, any leading dims) to an (N, C) array."""
+    out = outputs[0] if isinstance(outputs, (list, tuple)) else outputs
+    if out is None:
+        return None
+    out = np.asarray(out)
+    if out.ndim == 0 or out.shape[-1] < 6:
+        return None
+    return out.reshape(-1, out.shape[-1])
+
+
+def split_outputs(outputs, counts: List[int]) -> List[list]:
+    """Scatter batched outputs back to requests that contributed `counts` rows each.
+
+    Arrays whose leading dimension equals the total batch are sliced; anything else
+    (e.g. a fixed [1, 6] head) is shared unchanged by every request.
+    """
+    total = sum(counts)
+    if len(counts) == 1:
+        return [list(outputs)]
+    bounds = np.cumsum([0] + list(counts))
+    return [[o[a:b] if isinstance(o, np.ndarray) and o.ndim and o.shape[0] == total else o for o in outputs]
+            for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def xyxy(boxes: np.ndarray, box_format: str = "cxcywh") -> np.ndarray:
+    """Convert (N,4) x,y,w,h boxes to corner form; x,y are centres for YOLO-style heads."""
+    x, y, w, h = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    if box_format == "cxcywh":
+        x1, y1 = x - w / 2, y - h / 2
+    elif box_format == "xywh":
+        x1, y1 = x, y
+    else:
+        raise ValueError(f"Unknown box format: {box_format}")
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_th: float = DEFAULT_IOU,
+        classes: Optional[np.ndarray] = None, max_keep: Optional[int] = None) -> np.ndarray:
+    """Greedy NMS on corner boxes; returns kept indices ordered by score.
+
+    With `classes`, boxes are shifted by class id * (coordinate span + 1) so boxes of
+    different classes never overlap and one pass does class-aware suppression.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    if classes is not None:
+        span = float(boxes.max() - boxes.min()) + 1.0
+        boxes = boxes + (classes.astype(boxes.dtype) * span)[:, None]
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind="stable")
+    keep: List[int] = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        if max_keep is not None and len(keep) >= max_keep:
+            break
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_th]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_detections(outputs, scale: float, conf_th: float = 0.5, nms_enabled: bool = True,
+                      iou_th: float = DEFAULT_IOU, topk: Optional[int] = 100,
+                      box_format: str = "cxcywh") -> List[Dict[str, Any]]:
+    """Decode rows of [x, y, w, h, score, cls, ...] into detection dicts.
+
+    Thresholding, scale correction, NMS and top-k all run on arrays; dicts are
+    only built for the survivors. With nms_enabled=False and topk=None the output
+    matches the old row-by-row loop, in the model's row order.
+    """
+    rows = to_rows(outputs)
+    if rows is None:
+        return []
+    rows = rows[rows[:, 4] >= conf_th]
+    if not len(rows):
+        return []
+    if nms_enabled or topk:
+        if len(rows) > MAX_NMS_CANDIDATES:
+            rows = rows[np.argpartition(-rows[:, 4], MAX_NMS_CANDIDATES)[:MAX_NMS_CANDIDATES]]
+        if nms_enabled:
+            keep = nms(xyxy(rows[:, :4], box_format), rows[:, 4], iou_th,
+                       classes=rows[:, 5].astype(np.int64), max_keep=topk or None)
+        else:
+            keep = np.argsort(-rows[:, 4], kind="stable")[:topk]
+        rows = rows[keep]
+    bboxes = (rows[:, :4] / scale).tolist()
+    scores = rows[:, 4].tolist()
+    classes = rows[:, 5].astype(np.int64).tolist()
+    return [{"cls": str(c), "score": s, "bbox": b} for c, s, b in zip(classes, scores, bboxes)]
+
+
+def merge_detections(dets: List[Dict[str, Any]], iou_th: float = DEFAULT_IOU, topk: Optional[int] = None,
+                     box_format: str = "cxcywh") -> List[Dict[str, Any]]:
+    """Class-aware NMS over detection dicts that came from different tiles/crops."""
+    if len(dets) < 2:
+        return dets
+    boxes = np.asarray([d["bbox"] for d in dets], dtype=np.float32)
+    scores = np.asarray([d["score"] for d in dets], dtype=np.float32)
+    classes = np.asarray([int(d["cls"]) for d in dets], dtype=np.int64)
+    keep = nms(xyxy(boxes, box_format), scores, iou_th, classes=classes, max_keep=topk or None)
+    return [dets[i] for i in keep]
@@ -0,0 +1,116 @@
+# session_cache.py - Content-addressed onnxruntime session factory with an optimized-graph cache
+"""Build InferenceSessions once per (model sha256, providers, options).
+
+* In-process: sessions are shared, so every camera thread / OTA check that asks for
+  the same model and options gets the same object.
+* On disk: the first build saves ORT's optimized graph to CACHE_DIR/<key>.onnx; later
+  processes load that file with graph optimization disabled and skip the expensive
+  optimization pass.
+* Warm-up: `warmup_runs` inferences on a zero tensor so the first real frame does not
+  pay for lazy allocations.
+"""
+from __future__ import annotations
+import hashlib, json, os, platform, threading, time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+CACHE_DIR = Path(os.getenv("EDGEKIT_ORT_CACHE", "data/ort_cache"))
+GRAPH_OPT_LEVELS = ("disable", "basic", "extended", "all")
+
+_sessions: Dict[str, Any] = {}
+_hashes: Dict[Tuple[str, int, int], str] = {}
+_lock = threading.Lock()
+last_load: Dict[str, Any] = {}
+
+
+def model_sha256(path: str) -> str:
+    """sha256 of the model file, memoised on (path, size, mtime)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if key not in _hashes:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for c in iter(lambda: f.read(1 << 20), b""):
+                h.update(c)
+        _hashes[key] = h.hexdigest()
+    return _hashes[key]
+
+
+def cache_key(sha: str, providers: Sequence[str], intra_op_threads: int, graph_opt: str) -> str:
+    import onnxruntime as ort
+    spec = {"sha256": sha, "providers": list(providers), "intra_op_threads": int(intra_op_threads),
+            "graph_opt": graph_opt, "ort": ort.__version__, "machine": platform.machine()}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def _level(ort, name: str):
+    return {"disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL}[name]
+
+
+def warm_up(sess, runs: int = 1) -> float:
+    """Run `runs` zero-input inferences (dynamic dims -> 1); returns total ms."""
+    if runs <= 0:
+        return 0.0
+    feeds = {}
+    for inp in sess.get_inputs():
+        shape = [d if isinstance(d, int) and d > 0 else 1 for d in inp.shape]
+        dtype = np.float16 if "float16" in inp.type else (np.int64 if "int64" in inp.type else np.float32)
+        feeds[inp.name] = np.zeros(shape, dtype=dtype)
+    t = time.perf_counter()
+    for _ in range(runs):
+        sess.run(None, feeds)
+    return (time.perf_counter() - t) * 1000.0
+
+
+def get_session(model_path: str, providers: Sequence[str] = ("CPUExecutionProvider",), intra_op_threads: int = 0,
+                graph_opt: str = "all", warmup_runs: int = 1, cache_dir: Optional[Path] = None, share: bool = True):
+    """Return a (possibly shared) InferenceSession for `model_path`.
+
+    `last_load` describes the most recent call: cache tier used (memory/disk/miss),
+    load and warm-up milliseconds.
+    """
+    import onnxruntime as ort
+    if graph_opt not in GRAPH_OPT_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {graph_opt} (expected one of {GRAPH_OPT_LEVELS})")
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    t0 = time.perf_counter()
+    key = cache_key(model_sha256(model_path), providers, intra_op_threads, graph_opt)
+    with _lock:
+        if share and key in _sessions:
+            last_load.clear(); last_load.update(key=key, tier="memory", load_ms=(time.perf_counter() - t0) * 1000.0,
+                                                warmup_ms=0.0)
+            return _sessions[key]
+
+        so = ort.SessionOptions()
+        if intra_op_threads:
+            so.intra_op_num_threads = int(intra_op_threads)
+        cached = cache_dir / f"{key}.onnx"
+        if cached.exists():
+            so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            sess = ort.InferenceSession(str(cached), so, providers=list(providers))
+            tier = "disk"
+        else:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = cache_dir / f"{key}.{os.getpid()}.tmp.onnx"
+            so.graph_optimization_level = _level(ort, graph_opt)
+            so.optimized_model_filepath = str(tmp)
+            sess = ort.InferenceSession(model_path, so, providers=list(providers))
+            if tmp.exists():
+                os.replace(tmp, cached)  # atomic publish for concurrent processes
+            tier = "miss"
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        warmup_ms = warm_up(sess, warmup_runs)
+        if share:
+            _sessions[key] = sess
+        last_load.clear(); last_load.update(key=key, tier=tier, load_ms=load_ms, warmup_ms=warmup_ms)
+        return sess
+
+
+def clear_memory_cache() -> None:
+    with _lock:
+        _sessions.clear()
@@ -0,0 +1,218 @@
+# stages.py - Threaded capture -> preprocess -> infer -> output pipeline with bounded queues
+from __future__ import annotations
+import queue, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DROP_OLDEST = "drop-oldest"
+BLOCK = "block"
+DROP_POLICIES = (DROP_OLDEST, BLOCK)
+
+_EOS = object()  # end-of-stream marker, never dropped
+
+
+class StageQueue:
+    """Bounded hand-off queue in front of a stage.
+
+    `drop-oldest` evicts the stalest item when full (live cameras: always work on
+    the newest frame); `block` back-pressures the producer (video files: no loss).
+    `on_drop(item)` is called for every item evicted, so per-item state kept
+    elsewhere (e.g. a StageTimer trace) can be released.
+    """
+
+    def __init__(self, name: str, maxsize: int = 4, policy: str = DROP_OLDEST,
+                 on_drop: Optional[Callable[[Any], None]] = None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy} (expected one of {DROP_POLICIES})")
+        self.name = name
+        self.policy = policy
+        self.maxsize = max(1, int(maxsize))
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=self.maxsize)
+        self.on_drop = on_drop
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def _evict(self) -> None:
+        item = self._q.get_nowait()
+        self.dropped += 1
+        if self.on_drop is not None and item is not _EOS:
+            self.on_drop(item)
+
+    def depth(self) -> int:
+        return self._q.qsize()
+
+    def put(self, item: Any, stop: threading.Event) -> bool:
+        """Enqueue `item`; returns False if the pipeline stopped while blocked.
+        The end-of-stream marker is never dropped."""
+        if self.policy == BLOCK:
+            while True:
+                try:
+                    self._q.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    if not stop.is_set():
+                        continue
+                    if item is not _EOS:
+                        return False
+                    try:  # stopping: make room so EOS always gets through
+                        self._evict()
+                    except queue.Empty:
+                        pass
+        else:
+            while True:
+                try:
+                    self._q.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self._evict()
+                    except queue.Empty:
+                        pass
+        self.put_count += 1
+        self.max_depth = max(self.max_depth, self._q.qsize())
+        return True
+
+    def get(self, timeout: float = 0.1) -> Any:
+        return self._q.get(timeout=timeout)
+
+
+class StagedPipeline:
+    """Run a source and a chain of stages on separate threads.
+
+    source()    -> item, or None at end of stream
+    stage(item) -> item for the next stage, or None to filter it out
+    The last stage is the sink; its return value is discarded.
+    on_drop(item) is called for items a drop-oldest queue evicts.
+    """
+
+    def __init__(self, source: Callable[[], Any], stages: List[Tuple[str, Callable[[Any], Any]]],
+                 queue_size: int = 4, drop_policy: str = DROP_OLDEST, source_name: str = "capture",
+                 on_drop: Optional[Callable[[Any], None]] = None):
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        self.source = source
+        self.source_name = source_name
+        self.stages = list(stages)
+        self.queues = [StageQueue(name, queue_size, drop_policy, on_drop) for name, _ in self.stages]
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._counters: Dict[str, Dict[str, float]] = {
+            n: {"processed": 0, "busy_s": 0.0} for n in [source_name] + [s[0] for s in self.stages]
+        }
+        self._t0 = 0.0
+        self.error: Optional[BaseException] = None
+
+    # ---- threads ----
+    def _fail(self, exc: BaseException) -> None:
+        if self.error is None:
+            self.error = exc
+        self._stop.set()
+
+    def _run_source(self) -> None:
+        c = self._counters[self.source_name]; out = self.queues[0]
+        try:
+            while not self._stop.is_set():
+                t = time.perf_counter()
+                item = self.source()
+                c["busy_s"] += time.perf_counter() - t
+                if item is None:
+                    break
+                c["processed"] += 1
+                if not out.put(item, self._stop):
+                    break
+        except BaseException as e:  # surfaced from run()
+            self._fail(e)
+        finally:
+            out.put(_EOS, self._stop)
+
+    def _run_stage(self, idx: int) -> None:
+        name, fn = self.stages[idx]
+        c = self._counters[name]
+        inq = self.queues[idx]
+        outq = self.queues[idx + 1] if idx + 1 < len(self.queues) else None
+        try:
+            while True:
+                try:
+                    item = inq.get()
+                except queue.Empty:
+                    if self._stop.is_set() and self.error is not None:
+                        break
+                    continue
+                if item is _EOS:
+                    break
+                t = time.perf_counter()
+                res = fn(item)
+                c["busy_s"] += time.perf_counter() - t
+                c["processed"] += 1
+                if outq is not None and res is not None:
+                    outq.put(res, self._stop)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if outq is not None:
+                outq.put(_EOS, self._stop)
+
+    # ---- control ----
+    def start(self) -> "StagedPipeline":
+        self._t0 = time.perf_counter()
+        self._threads = [threading.Thread(target=self._run_source, name=f"stage-{self.source_name}", daemon=True)]
+        for i, (name, _) in enumerate(self.stages):
+            self._threads.append(threading.Thread(target=self._run_stage, args=(i,), name=f"stage-{name}", daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self) -> None:
+        """Ask the source to stop; queued items still drain through the stages."""
+        self._stop.set()
+
+    def alive(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for t in self._threads:
+            t.join(timeout)
+
+    def run(self, report_every: float = 0.0, report: Callable[[str], None] = print) -> None:
+        """Start, block until the stream ends, and optionally print stats every N seconds."""
+        self.start()
+        last = time.perf_counter()
+        try:
+            while self.alive():
+                time.sleep(0.05)
+                if report_every > 0 and time.perf_counter() - last >= report_every:
+                    report(self.format_stats()); last = time.perf_counter()
+        except KeyboardInterrupt:
+            self.stop()
+        self.join()
+        if report_every > 0:
+            report(self.format_stats())
+        if self.error is not None:
+            raise self.error
+
+    # ---- reporting ----
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage counters: input queue depth/max/dropped, items processed, busy %."""
+        elapsed = max(time.perf_counter() - self._t0, 1e-9) if self._t0 else 0.0
+        out: Dict[str, Dict[str, Any]] = {}
+        c = self._counters[self.source_name]
+        out[self.source_name] = {"processed": int(c["processed"]),
+                                 "busy_pct": round(100.0 * c["busy_s"] / elapsed, 1) if elapsed else 0.0}
+        for (name, _), q in zip(self.stages, self.queues):
+            c = self._counters[name]
+            out[name] = {
+                "depth": q.depth(), "max_depth": q.max_depth, "capacity": q.maxsize,
+                "dropped": q.dropped, "processed": int(c["processed"]),
+                "busy_pct": round(100.0 * c["busy_s"] / elapsed, 1) if elapsed else 0.0,
+            }
+        return out
+
+    def format_stats(self) -> str:
+        parts = []
+        for name, s in self.stats().items():
+            if "depth" in s:
+                parts.append(f"{name}[q={s['depth']}/{s['capacity']} max={s['max_depth']} "
+                             f"drop={s['dropped']} n={s['processed']} busy={s['busy_pct']}%]")
+            else:
+                parts.append(f"{name}[n={s['processed']} busy={s['busy_pct']}%]")
+        return "[pipeline] " + " ".join(parts)